@@ -0,0 +1,238 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Awaitable, Callable, Hashable, Iterator
+from app.graph_cache import GraphSnapshot
+from app.singleflight import SingleFlight
+import asyncio
+import math
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Control de admisión para los endpoints de algoritmos (por worker):
+# - Agrupación: peticiones concurrentes idénticas (misma versión del grafo y
+#   mismos parámetros) comparten un solo cálculo y no ocupan cupo
+# - Presupuesto global: cada cálculo cuesta unidades según el tamaño del
+#   grafo (1 por cada ADMISSION_COST_UNIT_EDGES aristas, por el peso del
+#   endpoint) y en total corren a lo sumo ADMISSION_BUDGET unidades; el
+#   resto espera en una cola FIFO de ADMISSION_MAX_QUEUE lugares
+# - Por usuario: a lo sumo ADMISSION_MAX_PER_USER cálculos a la vez
+# Cola llena o espera de más de ADMISSION_QUEUE_TIMEOUT_SECONDS -> 503, y
+# usuario sobre su límite -> 429, ambos con Retry-After.
+# ADMISSION_ENABLED=false quita los límites; la agrupación se mantiene.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_BUDGET = int(os.getenv("ADMISSION_BUDGET", "16"))
+ADMISSION_COST_UNIT_EDGES = int(os.getenv("ADMISSION_COST_UNIT_EDGES", "250000"))
+ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+
+def graph_cost(graph: GraphSnapshot, weight: int = 1) -> int:
+    """Unidades del presupuesto para un cálculo sobre este grafo"""
+    units = max(1, math.ceil(graph.edge_count / max(ADMISSION_COST_UNIT_EDGES, 1)))
+    return units * max(weight, 1)
+
+class UserLimitExceeded(HTTPException):
+    """429 de un usuario sobre su límite (no aplica a los demás de su grupo)"""
+
+    def __init__(self, user: str, detail: str, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.user = user
+
+class AdmissionController:
+    """
+    Semáforo ponderado con cola FIFO acotada y límite por usuario. Un
+    cálculo más caro que todo el presupuesto corre solo (se acota al total).
+    """
+
+    def __init__(self, budget: int, max_per_user: int, max_queue: int, queue_timeout: float):
+        self.budget = max(budget, 1)
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._used = 0
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+        self._per_user: dict[str, int] = {}
+        # Duración media de los cálculos (EWMA), para estimar Retry-After
+        self._service_seconds = 0.1
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_user = 0
+        self.rejected_overload = 0
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se libere lugar para la cola actual"""
+        rounds = (len(self._waiters) + 1) * self._service_seconds
+        return max(1, math.ceil(rounds))
+
+    def _reject(self, status_code: int, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    async def acquire(self, user: str, cost: int) -> int:
+        """Reserva el cupo (o lanza 429/503); retorna el costo a pasar a release()"""
+        cost = min(max(cost, 1), self.budget)
+        if self.max_per_user > 0 and self._per_user.get(user, 0) >= self.max_per_user:
+            self.rejected_user += 1
+            raise UserLimitExceeded(
+                user,
+                f"Demasiados cálculos en curso para el usuario (máximo {self.max_per_user})",
+                self.retry_after()
+            )
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+        try:
+            await self._reserve(cost)
+        except BaseException:
+            self._leave(user)
+            raise
+        self.admitted += 1
+        return cost
+
+    async def _reserve(self, cost: int) -> None:
+        # FIFO estricto: con gente esperando nadie se adelanta
+        if not self._waiters and self._used + cost <= self.budget:
+            self._used += cost
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_overload += 1
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "El servidor está saturado, intente de nuevo más tarde"
+            )
+
+        self.queued += 1
+        waiter = (cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter[1].done() and not waiter[1].cancelled():
+                # Se le asignó el cupo justo al vencer: devolverlo
+                self._release_units(cost)
+            else:
+                waiter[1].cancel()
+                self._waiters.remove(waiter)
+                self._wake()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected_overload += 1
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "El servidor está saturado, intente de nuevo más tarde"
+            )
+
+    def release(self, user: str, cost: int, seconds: float) -> None:
+        self._service_seconds += 0.2 * (seconds - self._service_seconds)
+        self._release_units(cost)
+        self._leave(user)
+
+    def _leave(self, user: str) -> None:
+        remaining = self._per_user.get(user, 0) - 1
+        if remaining > 0:
+            self._per_user[user] = remaining
+        else:
+            self._per_user.pop(user, None)
+
+    def _release_units(self, cost: int) -> None:
+        self._used -= cost
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._used + self._waiters[0][0] <= self.budget:
+            cost, future = self._waiters.popleft()
+            self._used += cost
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, user: str, cost: int):
+        cost = await self.acquire(user, cost)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(user, cost, time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "budget": self.budget,
+            "in_use": self._used,
+            "waiting": len(self._waiters),
+            "active_users": len(self._per_user),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_user": self.rejected_user,
+            "rejected_overload": self.rejected_overload,
+            "coalesced": _computations.coalesced,
+            "avg_service_ms": round(self._service_seconds * 1000, 3),
+        }
+
+admission = AdmissionController(
+    ADMISSION_BUDGET, ADMISSION_MAX_PER_USER, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
+
+_computations = SingleFlight()
+
+async def run_admitted(key: Hashable, user: str, cost: int, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Ejecuta fn con cupo, agrupando las llamadas concurrentes con la misma
+    clave: solo la primera reserva cupo; las demás esperan su resultado
+    (o su 503). Si el líder era otro usuario sobre su límite, las demás
+    reintentan y una pasa a ser el líder con su propio cupo.
+    """
+    if not ADMISSION_ENABLED:
+        return await _computations.do(key, fn)
+
+    async def admitted():
+        async with admission.slot(user, cost):
+            return await fn()
+
+    while True:
+        try:
+            return await _computations.do(key, admitted)
+        except UserLimitExceeded as e:
+            if e.user == user:
+                raise
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Libera el cupo al terminar la respuesta, también si el cliente se desconecta antes del cuerpo"""
+
+    def __init__(self, content: Iterator[bytes], release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+async def admitted_stream(user: str, cost: int, chunks: Iterator[bytes], media_type: str) -> StreamingResponse:
+    """
+    Respuesta en streaming con cupo: se reserva ya (el 429/503 sale antes
+    del primer byte) y se libera cuando la respuesta termina por cualquier causa
+    """
+    if not ADMISSION_ENABLED:
+        return StreamingResponse(chunks, media_type=media_type)
+    cost = await admission.acquire(user, cost)
+    started = time.perf_counter()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(user, cost, time.perf_counter() - started)
+
+    return _AdmittedStreamingResponse(chunks, release, media_type=media_type)
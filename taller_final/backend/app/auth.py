@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
-import bcrypt
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from jose import jwt
 from datetime import datetime, timedelta
-from app.db import get_session
+from app.db import get_async_session
 from app.models import User
 from app.schemas import UserIn, UserOut, TokenOut
 from app.deps import get_current_user
+from app.hashing import needs_rehash, hash_password_async, verify_password_async, password_hasher
 import os
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,39 +22,43 @@ JWT_SECRET = os.getenv("JWT_SECRET", "secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRES_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRES_MINUTES", "60"))
 
-# Debug
-print(f"🔑 JWT_SECRET cargado: {JWT_SECRET}")
-
-def hash_password(password: str) -> str:
-    """Hashea una contraseña usando bcrypt directamente"""
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica una contraseña contra su hash"""
-    password_bytes = plain_password.encode('utf-8')
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
-
-def create_access_token(user_id: int) -> str:
-    """Crea un JWT token para el usuario"""
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRES_MINUTES)
-    to_encode = {"sub": str(user_id), "exp": expire}  # ← CONVERTIR A STRING
+def create_access_token(user: User) -> str:
+    """
+    Crea un JWT token para el usuario
+    - Incluye el username para que las peticiones no necesiten consultar la BD
+    - jti/iat identifican el token en la caché de usuarios verificados
+    """
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRES_MINUTES)
+    to_encode = {
+        "sub": str(user.id),  # ← CONVERTIR A STRING
+        "username": user.username,
+        "iat": now,
+        "jti": uuid.uuid4().hex,
+        "exp": expire,
+    }
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def _get_user_by_username(session: AsyncSession, username: str):
+    statement = select(User).where(User.username == username)
+    return (await session.exec(statement)).first()
+
+async def _save_user(session: AsyncSession, user: User) -> User:
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserIn, session: Session = Depends(get_session)):
+async def register(user_in: UserIn, session: AsyncSession = Depends(get_async_session)):
     """
     Registra un nuevo usuario
     - Username debe ser único
-    - Password se hashea antes de guardar
+    - Password se hashea antes de guardar (en el pool de hashing)
     """
     # Verificar si el username ya existe
-    statement = select(User).where(User.username == user_in.username)
-    existing_user = session.exec(statement).first()
+    existing_user = await _get_user_by_username(session, user_in.username)
     
     if existing_user:
         raise HTTPException(
@@ -61,43 +67,51 @@ def register(user_in: UserIn, session: Session = Depends(get_session)):
         )
     
     # Crear nuevo usuario
-    hashed_password = hash_password(user_in.password)
+    hashed_password = await hash_password_async(user_in.password)
     new_user = User(username=user_in.username, password_hash=hashed_password)
     
-    session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
-    
-    return new_user
+    return await _save_user(session, new_user)
 
 @router.post("/login", response_model=TokenOut)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Login de usuario
     - Retorna un JWT token si las credenciales son válidas
+    - Si el hash usa un costo de bcrypt distinto al configurado, se regenera
     """
     # Buscar usuario por username
-    statement = select(User).where(User.username == form_data.username)
-    user = session.exec(statement).first()
+    user = await _get_user_by_username(session, form_data.username)
     
     # Verificar usuario y contraseña
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username o password incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Rehash transparente si cambió BCRYPT_ROUNDS
+    if needs_rehash(user.password_hash):
+        user.password_hash = await hash_password_async(form_data.password)
+        user = await _save_user(session, user)
+    
     # Crear token
-    access_token = create_access_token(user.id)
+    access_token = create_access_token(user)
     
     return TokenOut(access_token=access_token, token_type="bearer")
 
+@router.get("/hash-stats")
+async def hash_stats(current_user: UserOut = Depends(get_current_user)):
+    """
+    Métricas del pool de hashing de contraseñas (requiere autenticación)
+    """
+    return password_hasher.stats()
+
 @router.get("/me", response_model=UserOut)
-def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: UserOut = Depends(get_current_user)):
     """
     Retorna información del usuario autenticado
     - Requiere JWT token válido
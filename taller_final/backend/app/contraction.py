@@ -0,0 +1,329 @@
+from array import array
+from threading import Lock, Thread
+from typing import Optional
+from app.graph_cache import GraphSnapshot, _build_csr
+import heapq
+import logging
+import math
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Índice de contraction hierarchies (opcional). Se construye en segundo plano
+# a partir del snapshot del grafo y solo se usa mientras su versión coincida
+# con la del grafo; si está desactualizado se usa Dijkstra.
+CH_ENABLED = os.getenv("CH_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Límite de nodos asentados en cada búsqueda de testigos durante la contracción
+CH_WITNESS_SETTLE_LIMIT = int(os.getenv("CH_WITNESS_SETTLE_LIMIT", "500"))
+
+class CHIndex:
+    """
+    Índice de contraction hierarchies
+
+    - rank[i]: orden de contracción del nodo con índice denso i
+    - up_*: CSR con las aristas hacia nodos de mayor rango (búsqueda hacia adelante)
+    - down_*: CSR con las aristas que llegan desde nodos de mayor rango,
+      invertidas (búsqueda hacia atrás desde el destino)
+    - middle[(u, v)]: nodo contraído que representa el atajo u -> v
+    """
+
+    __slots__ = (
+        "version", "rank", "up_offsets", "up_targets", "up_weights",
+        "down_offsets", "down_targets", "down_weights", "middle", "shortcut_count",
+    )
+
+    def __init__(self, version, rank, up, down, middle):
+        self.version = version
+        self.rank = rank
+        self.up_offsets, self.up_targets, self.up_weights = up
+        self.down_offsets, self.down_targets, self.down_weights = down
+        self.middle = middle
+        self.shortcut_count = len(middle)
+
+# ========== PREPROCESAMIENTO ==========
+
+def _witness_distances(out, src: int, targets, skip: int, limit: float) -> dict:
+    """
+    Búsqueda local de Dijkstra desde src en el grafo restante (sin pasar por
+    skip). Se detiene al asentar todos los targets, al superar limit o al
+    asentar CH_WITNESS_SETTLE_LIMIT nodos.
+    Retorna las distancias encontradas (posiblemente tentativas).
+    """
+    distances = {src: 0.0}
+    pending = set(targets)
+    visited = set()
+    pq = [(0.0, src)]
+    while pq and pending and len(visited) < CH_WITNESS_SETTLE_LIMIT:
+        current_dist, current = heapq.heappop(pq)
+        if current in visited:
+            continue
+        if current_dist > limit:
+            break
+        visited.add(current)
+        pending.discard(current)
+        for neighbor, weight in out[current].items():
+            if neighbor == skip:
+                continue
+            distance = current_dist + weight
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                heapq.heappush(pq, (distance, neighbor))
+    return distances
+
+def _shortcuts_needed(out, inn, node: int) -> list:
+    """Calcula los atajos (u, w, peso) necesarios al contraer node"""
+    shortcuts = []
+    out_edges = out[node]
+    if not out_edges:
+        return shortcuts
+    max_out = max(out_edges.values())
+    for u, w_in in inn[node].items():
+        targets = [w for w in out_edges if w != u]
+        if not targets:
+            continue
+        # Una sola búsqueda de testigos desde u cubre todos los destinos
+        witness = _witness_distances(out, u, targets, node, w_in + max_out)
+        for w in targets:
+            candidate = w_in + out_edges[w]
+            if witness.get(w, math.inf) > candidate:
+                shortcuts.append((u, w, candidate))
+    return shortcuts
+
+def build_ch(graph: GraphSnapshot) -> CHIndex:
+    """Construye el índice de contraction hierarchies a partir del snapshot"""
+    n = graph.node_count
+
+    # Grafo restante como dicts, conservando el menor peso entre aristas paralelas
+    out = [dict() for _ in range(n)]
+    inn = [dict() for _ in range(n)]
+    for u in range(n):
+        for k in range(graph.offsets[u], graph.offsets[u + 1]):
+            v, weight = graph.targets[k], graph.weights[k]
+            if v == u:
+                continue
+            if weight < out[u].get(v, math.inf):
+                out[u][v] = weight
+                inn[v][u] = weight
+
+    middle = {}
+    contracted_neighbors = [0] * n
+
+    def priority(node: int, shortcuts: list) -> int:
+        # Diferencia de aristas + vecinos ya contraídos (reparte la contracción)
+        return len(shortcuts) - len(out[node]) - len(inn[node]) + contracted_neighbors[node]
+
+    pq = [(priority(node, _shortcuts_needed(out, inn, node)), node) for node in range(n)]
+    heapq.heapify(pq)
+
+    rank = array("q", [0]) * n
+    up_edges = []
+    down_edges = []
+    next_rank = 0
+
+    while pq:
+        _, node = heapq.heappop(pq)
+
+        # Actualización perezosa: si la prioridad empeoró, reinsertar
+        shortcuts = _shortcuts_needed(out, inn, node)
+        current = priority(node, shortcuts)
+        if pq and current > pq[0][0]:
+            heapq.heappush(pq, (current, node))
+            continue
+
+        for u, w, weight in shortcuts:
+            if weight < out[u].get(w, math.inf):
+                out[u][w] = weight
+                inn[w][u] = weight
+                middle[(u, w)] = node
+
+        # Las aristas que quedan conectan con nodos de mayor rango
+        for v, weight in out[node].items():
+            up_edges.append((node, v, weight))
+            del inn[v][node]
+            contracted_neighbors[v] += 1
+        for u, weight in inn[node].items():
+            down_edges.append((node, u, weight))
+            del out[u][node]
+            contracted_neighbors[u] += 1
+        out[node] = {}
+        inn[node] = {}
+
+        rank[node] = next_rank
+        next_rank += 1
+
+    up = _build_csr(n, up_edges, len(up_edges))[:3]
+    down = _build_csr(n, down_edges, len(down_edges))[:3]
+    return CHIndex(graph.version, rank, up, down, middle)
+
+# ========== CONSULTAS ==========
+
+def _unpack(index: CHIndex, u: int, v: int, path: list) -> None:
+    """Expande recursivamente el atajo u -> v agregando los nodos tras u"""
+    stack = [(u, v)]
+    while stack:
+        a, b = stack.pop()
+        mid = index.middle.get((a, b))
+        if mid is None:
+            path.append(b)
+        else:
+            # Procesar primero (a, mid) y luego (mid, b)
+            stack.append((mid, b))
+            stack.append((a, mid))
+
+def ch_shortest_path(index: CHIndex, graph: GraphSnapshot, src_id: int, dst_id: int):
+    """
+    Consulta punto a punto: búsquedas hacia arriba desde el origen y desde el
+    destino; el mejor nodo de encuentro define el camino, que luego se
+    desempaqueta a aristas originales
+    """
+    src, dst = graph.index[src_id], graph.index[dst_id]
+    if src == dst:
+        return [src_id], 0.0
+
+    sides = (
+        (index.up_offsets, index.up_targets, index.up_weights),
+        (index.down_offsets, index.down_targets, index.down_weights),
+    )
+    distances = ({src: 0.0}, {dst: 0.0})
+    previous = ({src: None}, {dst: None})
+    visited = (set(), set())
+    queues = ([(0.0, src)], [(0.0, dst)])
+
+    best = math.inf
+    meeting = None
+
+    while queues[0] or queues[1]:
+        for side in (0, 1):
+            pq = queues[side]
+            if not pq:
+                continue
+            if pq[0][0] >= best:
+                # Este lado ya no puede mejorar el resultado
+                pq.clear()
+                continue
+
+            offsets, targets, weights = sides[side]
+            dist, prev, done = distances[side], previous[side], visited[side]
+            current_dist, current = heapq.heappop(pq)
+            if current in done:
+                continue
+            done.add(current)
+
+            # Stall-on-demand: si un nodo de mayor rango ya alcanzado llega a
+            # este con menor costo, su distancia no es óptima y no se expande
+            stall_offsets, stall_targets, stall_weights = sides[1 - side]
+            stalled = False
+            for k in range(stall_offsets[current], stall_offsets[current + 1]):
+                if dist.get(stall_targets[k], math.inf) + stall_weights[k] < current_dist:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+
+            other = distances[1 - side]
+            if current in other and current_dist + other[current] < best:
+                best = current_dist + other[current]
+                meeting = current
+
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                distance = current_dist + weights[k]
+                if distance < dist.get(neighbor, math.inf):
+                    dist[neighbor] = distance
+                    prev[neighbor] = current
+                    heapq.heappush(pq, (distance, neighbor))
+
+    if meeting is None:
+        return None
+
+    # Secuencia de nodos en la jerarquía: origen -> encuentro -> destino
+    up_chain = []
+    current = meeting
+    while current is not None:
+        up_chain.append(current)
+        current = previous[0][current]
+    up_chain.reverse()
+    current = previous[1][meeting]
+    while current is not None:
+        up_chain.append(current)
+        current = previous[1][current]
+
+    # Desempaquetar atajos a aristas originales
+    path = [up_chain[0]]
+    for u, v in zip(up_chain, up_chain[1:]):
+        _unpack(index, u, v, path)
+
+    return [graph.node_ids[i] for i in path], best
+
+# ========== ÍNDICE DEL PROCESO ==========
+
+_index_lock = Lock()
+_index: Optional[CHIndex] = None
+# Snapshot más nuevo que espera índice y versión en construcción: durante
+# una construcción las versiones nuevas se reemplazan entre sí, así una
+# ráfaga de mutaciones produce a lo sumo una construcción más (la última)
+_wanted: Optional[GraphSnapshot] = None
+_building_version: Optional[int] = None
+
+def _builder() -> None:
+    """
+    Hilo de fondo: construye en el pool de procesos (el hilo solo espera) el
+    índice de la versión más nueva pedida, hasta que no quede ninguna
+    """
+    # Import local para evitar import circular (jobs -> search -> contraction)
+    from app.jobs import run_in_pool
+    global _index, _wanted, _building_version
+    while True:
+        with _index_lock:
+            graph, _wanted = _wanted, None
+            if graph is None:
+                _building_version = None
+                return
+            _building_version = graph.version
+
+        started = time.perf_counter()
+        try:
+            index = run_in_pool(build_ch, graph)
+        except Exception as e:
+            logger.error("Error construyendo el índice CH (versión %s): %s", graph.version, e)
+            continue
+        with _index_lock:
+            if _index is None or index.version > _index.version:
+                _index = index
+        logger.info(
+            "Índice CH versión %s listo: %s atajos en %.2fs",
+            graph.version, index.shortcut_count, time.perf_counter() - started
+        )
+
+def get_fresh_index(graph: GraphSnapshot) -> Optional[CHIndex]:
+    """
+    Retorna el índice CH si corresponde a la versión del snapshot; si no,
+    programa su reconstrucción en segundo plano y retorna None
+    """
+    global _wanted, _building_version
+    if not CH_ENABLED:
+        return None
+
+    index = _index
+    if index is not None and index.version == graph.version:
+        return index
+
+    with _index_lock:
+        newest = max(
+            _building_version if _building_version is not None else -1,
+            _wanted.version if _wanted is not None else -1,
+            index.version if index is not None else -1,
+        )
+        if graph.version > newest:
+            idle = _building_version is None and _wanted is None
+            _wanted = graph
+            if idle:
+                # Marca de "en curso" antes de que el hilo arranque
+                _building_version = -1
+                Thread(target=_builder, daemon=True).start()
+    return None
@@ -1,4 +1,12 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from app.metrics import instrument_engine
 import os
 from dotenv import load_dotenv
 
@@ -11,26 +19,131 @@ MYSQL_URL = os.getenv(
     "mysql+pymysql://root:@localhost:3306/pathfinder_db?charset=utf8mb4"
 )
 
-# Crear el engine de MySQL
-engine = create_engine(
-    MYSQL_URL, 
-    echo=False,  # Cambiar a True para ver queries SQL en consola
-    pool_pre_ping=True,  # Verifica conexiones antes de usarlas
-    pool_recycle=3600,   # Recicla conexiones cada hora para evitar timeouts
-)
+# URL del engine asíncrono (por defecto se deriva de MYSQL_URL:
+# mysql+pymysql -> mysql+aiomysql, sqlite -> sqlite+aiosqlite)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+MYSQL_ASYNC_DRIVER = os.getenv("MYSQL_ASYNC_DRIVER", "aiomysql")  # aiomysql | asyncmy
+
+# Configuración del pool de conexiones (no aplica a SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+def _async_url(url: str) -> str:
+    """Traduce la URL síncrona al driver asíncrono equivalente"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "mysql":
+        return parsed.set(drivername=f"mysql+{MYSQL_ASYNC_DRIVER}").render_as_string(hide_password=False)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": False,  # Cambiar a True para ver queries SQL en consola
+        "pool_pre_ping": True,  # Verifica conexiones antes de usarlas
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,  # Recicla conexiones para evitar timeouts
+        )
+    return options
+
+# Engine síncrono (scripts, init_db y tareas en segundo plano)
+engine = create_engine(MYSQL_URL, **_engine_options(MYSQL_URL))
+
+# Engine asíncrono usado por los endpoints
+ASYNC_DATABASE_URL = ASYNC_DATABASE_URL or _async_url(MYSQL_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+
+# Consultas por petición para /metrics y Server-Timing
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Id de la única fila de la tabla graph_version
+GRAPH_VERSION_ROW_ID = 1
 
 def init_db():
     """
     Crea todas las tablas en la base de datos basándose en los modelos SQLModel
     """
-    from app.models import User, Node, Edge  # Importar aquí para evitar import circular
+    from app.models import User, Node, Edge, GraphVersion  # Importar aquí para evitar import circular
     SQLModel.metadata.create_all(engine)
+    
+    # Asegurar que exista la fila única con la versión del grafo
+    with Session(engine) as session:
+        if session.get(GraphVersion, GRAPH_VERSION_ROW_ID) is None:
+            session.add(GraphVersion(id=GRAPH_VERSION_ROW_ID, version=0))
+            try:
+                session.commit()
+            except IntegrityError:
+                # Otro worker la creó al mismo tiempo
+                session.rollback()
     print("✅ Base de datos MySQL inicializada - Tablas creadas")
 
+def insert_rows(session: Session, model, rows: list[dict], chunk_size: int = 1000) -> None:
+    """
+    Inserta filas en bloques de chunk_size dentro de la transacción actual
+    de la sesión. Se ejecuta como executemany sobre una sentencia compilada
+    una sola vez: el driver la envía como INSERT de múltiples filas
+    (PyMySQL reescribe el lote como un único INSERT ... VALUES (...), (...)).
+    """
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), chunk_size):
+        session.execute(statement, rows[start:start + chunk_size])
+
+def upsert_rows(
+    session: Session,
+    model,
+    rows: list[dict],
+    conflict_columns: list[str],
+    update_columns: tuple = (),
+    chunk_size: int = 1000,
+) -> None:
+    """
+    Inserta filas en bloques ignorando las que violan la clave única
+    conflict_columns (o actualizando update_columns si se indican).
+    Usa ON DUPLICATE KEY UPDATE en MySQL y ON CONFLICT en SQLite.
+    """
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(table)
+        # Sin columnas a actualizar se reasigna la clave a sí misma (no-op)
+        columns = update_columns or conflict_columns[:1]
+        statement = statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in columns}
+        )
+    elif dialect == "sqlite":
+        statement = sqlite_insert(table)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+    else:
+        raise ValueError(f"upsert no soportado para el dialecto '{dialect}'")
+
+    for start in range(0, len(rows), chunk_size):
+        session.execute(statement, rows[start:start + chunk_size])
+
 def get_session():
     """
-    Generator que proporciona una sesión de base de datos
-    Se usa como dependencia en FastAPI
+    Generator que proporciona una sesión síncrona de base de datos
     """
     with Session(engine) as session:
+        yield session
+
+async def get_async_session():
+    """
+    Generator que proporciona una sesión asíncrona de base de datos
+    Se usa como dependencia en FastAPI
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
\ No newline at end of file
@@ -1,65 +1,150 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlmodel import Session, select
-from app.db import get_session
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
 from app.models import User
+from app.schemas import UserOut
+from app.metrics import span
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Usar HTTPBearer en lugar de OAuth2PasswordBearer
 security = HTTPBearer()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-# Debug: imprimir el JWT_SECRET al cargar
-print(f"🔑 JWT_SECRET en deps: {JWT_SECRET}")
+# Caché de usuarios ya verificados (por worker). Los cambios hechos con el
+# ORM en este worker la invalidan al momento; los de otros workers, SQL
+# directo o scripts/ se ven recién al vencer la entrada: un usuario borrado
+# o renombrado puede seguir autenticando hasta AUTH_CACHE_TTL_SECONDS
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Si es false, los tokens que traen el username se aceptan sin consultar la BD
+AUTH_VERIFY_USER_ON_MISS = os.getenv("AUTH_VERIFY_USER_ON_MISS", "true").lower() in ("1", "true", "yes")
+
+if JWT_SECRET == "secret-key-change-in-production":
+    logger.warning("JWT_SECRET no está configurado; se usa el valor por defecto")
+
+class PrincipalCache:
+    """
+    LRU con TTL de usuarios autenticados, indexado por (user_id, jti/iat).
+    Una entrada vence al cumplirse el TTL o la expiración del token.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
 
-def get_current_user(
+    def get(self, key) -> Optional[UserOut]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, key, principal: UserOut, token_exp: Optional[float]) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, now + (token_exp - time.time()))
+        with self._lock:
+            self._entries[key] = (principal, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Elimina todas las entradas de un usuario"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+principal_cache = PrincipalCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+# Cualquier modificación o borrado de un usuario (vía ORM, en este worker)
+# invalida sus entradas
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: Session = Depends(get_session)
-) -> User:
+    session: AsyncSession = Depends(get_async_session)
+) -> UserOut:
     """
     Valida el JWT token y retorna el usuario actual
+    - Los usuarios ya verificados se sirven desde la caché, sin consultar la BD
     """
+    with span("auth"):
+        return await _authenticate(credentials.credentials, session)
+
+async def _authenticate(token: str, session: AsyncSession) -> UserOut:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
     try:
-        token = credentials.credentials
-        print(f"🔍 Token recibido: {token[:50]}...")
-        
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        print(f"✅ Payload decodificado: {payload}")
-        
+
         user_id_str = payload.get("sub")
         if user_id_str is None:
-            print("❌ No hay 'sub' en el payload")
+            logger.debug("Token sin 'sub' en el payload")
             raise credentials_exception
-        
+
         user_id = int(user_id_str)  # ← Convertir de string a int
-        print(f"🔍 Buscando usuario con ID: {user_id}")
-        
+
     except JWTError as e:
-        print(f"❌ Error JWT: {e}")
+        logger.debug("Error JWT: %s", e)
         raise credentials_exception
     except ValueError as e:
-        print(f"❌ Error convirtiendo user_id: {e}")
-        raise credentials_exception
-    
-    statement = select(User).where(User.id == user_id)
-    user = session.exec(statement).first()
-    
-    if user is None:
-        print(f"❌ Usuario {user_id} no encontrado en BD")
+        logger.debug("Error convirtiendo user_id: %s", e)
         raise credentials_exception
-    
-    print(f"✅ Usuario autenticado: {user.username}")
-    return user
\ No newline at end of file
+
+    # Camino rápido: usuario ya verificado para este token
+    cache_key = (user_id, payload.get("jti") or payload.get("iat"))
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    username = payload.get("username")
+    if username is not None and not AUTH_VERIFY_USER_ON_MISS:
+        principal = UserOut(id=user_id, username=username)
+    else:
+        statement = select(User.id, User.username).where(User.id == user_id)
+        row = (await session.exec(statement)).first()
+
+        if row is None or (username is not None and row[1] != username):
+            logger.debug("Usuario %s no encontrado en BD", user_id)
+            raise credentials_exception
+
+        principal = UserOut(id=row[0], username=row[1])
+
+    principal_cache.put(cache_key, principal, payload.get("exp"))
+    logger.debug("Usuario autenticado: %s", principal.username)
+    return principal
@@ -0,0 +1,278 @@
+from fastapi.concurrency import run_in_threadpool
+from threading import RLock
+from typing import Iterable, Optional
+from app.graph_cache import GraphSnapshot
+from app.search import PathResult
+import heapq
+import math
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Orígenes "calientes" cuyos árboles de caminos más cortos se mantienen al
+# día en cada worker (ids separados por comas). También se pueden registrar
+# en tiempo de ejecución con POST /graph/hot-sources.
+HOT_SOURCES = [
+    int(node_id) for node_id in os.getenv("HOT_SOURCES", "").split(",") if node_id.strip()
+]
+
+# Cambios que reciben los árboles (aplicados en el orden dado):
+#   ("insert", src_id, dst_id, weight)  arista nueva o con menor peso
+#   ("delete", src_id, dst_id)          arista eliminada
+#   ("delete_node", node_id)            nodo eliminado junto con sus aristas
+Change = tuple
+
+class DynamicTree:
+    """
+    Árbol de caminos más cortos desde src_id, indexado por id de nodo
+    (los índices densos del snapshot cambian al borrar nodos)
+    """
+
+    __slots__ = ("src_id", "dist", "parent", "children")
+
+    def __init__(self, src_id: int):
+        self.src_id = src_id
+        self.dist: dict[int, float] = {src_id: 0.0}
+        self.parent: dict[int, Optional[int]] = {src_id: None}
+        self.children: dict[int, set] = {}
+
+    def _attach(self, node: int, parent: Optional[int]) -> None:
+        old = self.parent.get(node)
+        if old is not None:
+            self.children.get(old, set()).discard(node)
+        self.parent[node] = parent
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+    def _detach(self, node: int) -> None:
+        old = self.parent.pop(node, None)
+        if old is not None:
+            self.children.get(old, set()).discard(node)
+        self.dist.pop(node, None)
+
+    def _settle(self, out: dict, pq: list) -> int:
+        """Dijkstra desde los nodos mejorados en pq; retorna cuántos se tocaron"""
+        touched = 0
+        while pq:
+            current_dist, current, parent = heapq.heappop(pq)
+            if current_dist > self.dist.get(current, math.inf):
+                continue
+            if self.parent.get(current, -1) != parent:
+                self._attach(current, parent)
+            touched += 1
+            for neighbor, weight in out.get(current, {}).items():
+                distance = current_dist + weight
+                if distance < self.dist.get(neighbor, math.inf):
+                    self.dist[neighbor] = distance
+                    heapq.heappush(pq, (distance, neighbor, current))
+        return touched
+
+    def rebuild(self, out: dict) -> int:
+        self.dist = {self.src_id: 0.0}
+        self.parent = {self.src_id: None}
+        self.children = {}
+        return self._settle(out, [(0.0, self.src_id, None)])
+
+    def edge_decreased(self, out: dict, u: int, v: int, weight: float) -> int:
+        """Inserción o reducción de peso: solo se propaga desde v si mejora"""
+        if u not in self.dist:
+            return 0
+        distance = self.dist[u] + weight
+        if distance >= self.dist.get(v, math.inf):
+            return 0
+        self.dist[v] = distance
+        return self._settle(out, [(distance, v, u)])
+
+    def edge_removed(self, out: dict, inn: dict, u: int, v: int) -> int:
+        """
+        Eliminación: si u -> v era arista del árbol, el subárbol de v queda
+        sin distancia; cada nodo del subárbol toma el mejor predecesor fuera
+        de él y desde ahí se repara con Dijkstra restringido a esos nodos
+        """
+        if self.parent.get(v) != u:
+            return 0
+
+        subtree = []
+        stack = [v]
+        while stack:
+            node = stack.pop()
+            subtree.append(node)
+            stack.extend(self.children.pop(node, ()))
+        affected = set(subtree)
+        for node in subtree:
+            self._detach(node)
+
+        pq = []
+        for node in subtree:
+            best, best_parent = math.inf, None
+            for pred, weight in inn.get(node, {}).items():
+                if pred in affected or pred not in self.dist:
+                    continue
+                if self.dist[pred] + weight < best:
+                    best, best_parent = self.dist[pred] + weight, pred
+            if best_parent is not None:
+                self.dist[node] = best
+                pq.append((best, node, best_parent))
+        heapq.heapify(pq)
+        return self._settle(out, pq)
+
+    def path_to(self, dst_id: int) -> PathResult:
+        if dst_id not in self.dist:
+            return None
+        path = []
+        current = dst_id
+        while current is not None:
+            path.append(current)
+            current = self.parent[current]
+        path.reverse()
+        return path, self.dist[dst_id]
+
+class DynamicSSSP:
+    """
+    Mantiene los árboles de los orígenes calientes de este worker
+    - Guarda su propia adyacencia (por id) solo mientras haya orígenes
+    - Cada mutación llega con la versión que produjo; si no es la siguiente
+      a la conocida (la hizo otro worker o un script), los árboles se
+      reconstruyen desde el snapshot en la próxima lectura
+    """
+
+    def __init__(self, sources: Iterable[int] = ()):
+        self._lock = RLock()
+        self._sources = set(sources)
+        self._trees: dict[int, DynamicTree] = {}
+        self._out: dict[int, dict] = {}
+        self._in: dict[int, dict] = {}
+        self.version: Optional[int] = None
+        self.rebuilds = 0
+        self.repairs = 0
+        self.nodes_touched = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._sources)
+
+    def sources(self) -> list[int]:
+        return sorted(self._sources)
+
+    def register(self, src_id: int) -> None:
+        with self._lock:
+            if src_id not in self._sources:
+                self._sources.add(src_id)
+                self.version = None
+
+    def unregister(self, src_id: int) -> bool:
+        with self._lock:
+            if src_id not in self._sources:
+                return False
+            self._sources.discard(src_id)
+            self._trees.pop(src_id, None)
+            if not self._sources:
+                self._out, self._in, self.version = {}, {}, None
+            return True
+
+    def _rebuild(self, graph: GraphSnapshot) -> None:
+        """Copia la adyacencia del snapshot y recalcula todos los árboles"""
+        out = {node_id: {} for node_id in graph.node_ids}
+        inn = {node_id: {} for node_id in graph.node_ids}
+        node_ids, offsets, targets, weights = graph.node_ids, graph.offsets, graph.targets, graph.weights
+        for i, u in enumerate(node_ids):
+            for k in range(offsets[i], offsets[i + 1]):
+                v, weight = node_ids[targets[k]], weights[k]
+                if weight < out[u].get(v, math.inf):
+                    out[u][v] = weight
+                    inn[v][u] = weight
+        self._out, self._in = out, inn
+        self._trees = {}
+        for src_id in self._sources:
+            if graph.has_node(src_id):
+                tree = DynamicTree(src_id)
+                self.nodes_touched += tree.rebuild(out)
+                self._trees[src_id] = tree
+        self.version = graph.version
+        self.rebuilds += 1
+
+    def lookup(self, graph: GraphSnapshot, src_id: int, dst_id: int) -> tuple[bool, PathResult]:
+        """
+        Retorna (es_caliente, resultado) leyendo el árbol mantenido de src_id.
+        Si los árboles son más viejos que el snapshot se reconstruyen antes.
+        """
+        with self._lock:
+            if src_id not in self._sources:
+                return False, None
+            if self.version is None or self.version < graph.version:
+                self._rebuild(graph)
+            tree = self._trees.get(src_id)
+            if tree is None:
+                return False, None
+            return True, tree.path_to(dst_id)
+
+    def apply(self, version: int, changes: list[Change]) -> None:
+        """Aplica los cambios de la mutación que produjo version"""
+        with self._lock:
+            if not self._sources or self.version is None:
+                return
+            if version != self.version + 1:
+                # Hubo mutaciones que este worker no vio
+                self.version = None
+                return
+            for change in changes:
+                self._apply_change(change)
+            self.version = version
+
+    def _apply_change(self, change: Change) -> None:
+        out, inn = self._out, self._in
+        kind = change[0]
+        if kind == "insert":
+            _, u, v, weight = change
+            old = out.setdefault(u, {}).get(v)
+            if old is not None and weight > old:
+                # Aumento de peso: equivale a eliminar y volver a insertar
+                self._apply_change(("delete", u, v))
+            out[u][v] = weight
+            inn.setdefault(v, {})[u] = weight
+            for tree in self._trees.values():
+                self._count(tree.edge_decreased(out, u, v, weight))
+        elif kind == "delete":
+            _, u, v = change
+            if out.get(u, {}).pop(v, None) is None:
+                return
+            inn[v].pop(u, None)
+            for tree in self._trees.values():
+                self._count(tree.edge_removed(out, inn, u, v))
+        elif kind == "delete_node":
+            _, node = change
+            for v in list(out.get(node, {})):
+                self._apply_change(("delete", node, v))
+            for u in list(inn.get(node, {})):
+                self._apply_change(("delete", u, node))
+            out.pop(node, None)
+            inn.pop(node, None)
+            self._trees.pop(node, None)
+        else:
+            raise ValueError(f"Cambio desconocido: {kind}")
+
+    def _count(self, touched: int) -> None:
+        if touched:
+            self.repairs += 1
+            self.nodes_touched += touched
+
+    async def notify(self, version: int, changes: list[Change]) -> None:
+        """Aplica los cambios fuera del event loop (no hace nada sin orígenes)"""
+        if self.active:
+            await run_in_threadpool(self.apply, version, changes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "sources": sorted(self._sources),
+                "trees": {
+                    src_id: len(tree.dist) for src_id, tree in self._trees.items()
+                },
+                "rebuilds": self.rebuilds,
+                "repairs": self.repairs,
+                "nodes_touched": self.nodes_touched,
+            }
+
+hot_sources = DynamicSSSP(HOT_SOURCES)
@@ -0,0 +1,312 @@
+from array import array
+from threading import Lock
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import GRAPH_VERSION_ROW_ID
+from app.models import Node, Edge, GraphVersion
+from app.singleflight import SingleFlight
+from app.metrics import span
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ========== VERSIÓN DEL GRAFO ==========
+
+# La versión vive en la tabla graph_version (una sola fila) para que todos
+# los workers de uvicorn vean las mutaciones hechas por cualquiera de ellos.
+# Con GRAPH_VERSION_POLL_SECONDS > 0 la lectura se reutiliza durante ese
+# intervalo; con 0 se consulta la fila en cada petición (lectura por PK).
+GRAPH_VERSION_POLL_SECONDS = float(os.getenv("GRAPH_VERSION_POLL_SECONDS", "0"))
+
+_version_lock = Lock()
+_known_version: Optional[int] = None
+_checked_at = 0.0
+_generation = 0
+
+def bump_graph_version(session: Session) -> int:
+    """
+    Incrementa la versión del grafo dentro de la transacción de la sesión
+    (debe llamarse antes del commit de la mutación; después del commit hay
+    que llamar a forget_graph_version).
+    Retorna la nueva versión: el UPDATE bloquea la fila hasta el commit, así
+    que ninguna otra transacción puede obtener el mismo número.
+    """
+    session.exec(
+        update(GraphVersion)
+        .where(GraphVersion.id == GRAPH_VERSION_ROW_ID)
+        .values(version=GraphVersion.version + 1)
+    )
+    statement = select(GraphVersion.version).where(GraphVersion.id == GRAPH_VERSION_ROW_ID)
+    return session.exec(statement).one()
+
+def forget_graph_version() -> None:
+    """
+    Fuerza que la próxima lectura en este worker consulte la BD. Se llama
+    después del commit de una mutación: antes, una lectura concurrente
+    volvería a guardar la versión anterior durante todo el intervalo de sondeo.
+    """
+    global _known_version, _generation
+    with _version_lock:
+        _known_version = None
+        _generation += 1
+
+def read_graph_version(session: Session) -> int:
+    """Retorna la versión actual del grafo (respetando el intervalo de sondeo)"""
+    global _known_version, _checked_at
+    now = time.monotonic()
+    if (
+        _known_version is not None
+        and now - _checked_at < GRAPH_VERSION_POLL_SECONDS
+    ):
+        return _known_version
+
+    generation = _generation
+    statement = select(GraphVersion.version).where(GraphVersion.id == GRAPH_VERSION_ROW_ID)
+    version = session.exec(statement).first() or 0
+    with _version_lock:
+        # Una lectura que empezó antes de un forget_graph_version puede haber
+        # visto la versión previa al commit: se usa pero no se guarda
+        if generation == _generation:
+            _known_version = version
+            _checked_at = now
+    return version
+
+# ========== SNAPSHOT CSR ==========
+
+class GraphSnapshot:
+    """
+    Representación compacta (CSR) del grafo en memoria
+
+    - node_ids[i]: id real del nodo con índice denso i (ordenados por id)
+    - index[node_id]: índice denso del nodo
+    - Las aristas salientes del nodo i ocupan las posiciones
+      offsets[i] .. offsets[i + 1] - 1 de targets/weights/edge_ids,
+      en el mismo orden en que están en la tabla (por id de arista)
+    - lats[i] / lons[i]: coordenadas del nodo (NaN si no tiene)
+    - names[i]: nombre del nodo (None si no se cargaron)
+    - source: archivo del que se mapearon los arreglos (None si viven en
+      la memoria del proceso); ver app.snapshot_file
+    - km_ratio: menor razón peso / km geodésicos entre las aristas; la
+      calcula app.search.astar_factor la primera vez que se necesita
+    """
+
+    __slots__ = (
+        "version", "node_ids", "index", "offsets", "targets", "weights", "edge_ids",
+        "lats", "lons", "all_coords", "names", "source", "km_ratio", "_reverse",
+    )
+
+    def __init__(self, version, node_ids, offsets, targets, weights, edge_ids, lats, lons,
+                 names=None, source=None):
+        self.version = version
+        self.node_ids = node_ids
+        self.index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_ids = edge_ids
+        self.lats = lats
+        self.lons = lons
+        self.all_coords = all(lat == lat for lat in lats)  # NaN != NaN
+        self.names = names
+        self.source = source
+        self.km_ratio = None
+        self._reverse = None
+
+    def __reduce__(self):
+        """
+        Al serializarlo (pool de trabajos) se copian los arreglos, también si
+        son memoryviews sobre un mmap; los nombres no se incluyen
+        """
+        return (GraphSnapshot, (
+            self.version, list(self.node_ids), _owned("q", self.offsets), _owned("q", self.targets),
+            _owned("d", self.weights), _owned("q", self.edge_ids), _owned("d", self.lats),
+            _owned("d", self.lons),
+        ))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def has_node(self, node_id: int) -> bool:
+        return node_id in self.index
+
+    def has_coords(self, i: int) -> bool:
+        """Indica si el nodo con índice denso i tiene coordenadas"""
+        return self.lats[i] == self.lats[i]
+
+    def neighbors(self, node_id: int):
+        """Itera (dst_id, weight) de las aristas salientes de un nodo"""
+        i = self.index.get(node_id)
+        if i is None:
+            return
+        node_ids, targets, weights = self.node_ids, self.targets, self.weights
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            yield node_ids[targets[k]], weights[k]
+
+    def reverse(self):
+        """
+        Retorna el CSR de aristas entrantes (offsets, sources, weights),
+        construido la primera vez que se necesita
+        """
+        if self._reverse is None:
+            self._reverse = _build_csr(
+                self.node_count,
+                (
+                    (self.targets[k], src, self.weights[k])
+                    for src in range(self.node_count)
+                    for k in range(self.offsets[src], self.offsets[src + 1])
+                ),
+                self.edge_count,
+            )[:3]
+        return self._reverse
+
+def _owned(typecode: str, values) -> array:
+    """Copia un buffer (p. ej. un memoryview sobre un mmap) a un array propio"""
+    if isinstance(values, array):
+        return values
+    owned = array(typecode)
+    owned.frombytes(memoryview(values).cast("B"))
+    return owned
+
+def _build_csr(n: int, edges, m: int):
+    """
+    Arma arreglos CSR a partir de tuplas (src, dst, weight[, edge_id]) con
+    índices densos, manteniendo el orden original dentro de cada bloque
+    """
+    edges = list(edges)
+
+    # Contar aristas salientes por nodo y acumular los offsets
+    offsets = array("q", [0]) * (n + 1)
+    for edge in edges:
+        offsets[edge[0] + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    # Ubicar cada arista en su bloque (counting sort estable por origen)
+    targets = array("q", [0]) * m
+    weights = array("d", [0.0]) * m
+    edge_ids = array("q", [0]) * m
+    cursor = offsets[:-1]
+    for edge in edges:
+        src = edge[0]
+        pos = cursor[src]
+        targets[pos] = edge[1]
+        weights[pos] = edge[2]
+        if len(edge) > 3:
+            edge_ids[pos] = edge[3]
+        cursor[src] = pos + 1
+
+    return offsets, targets, weights, edge_ids
+
+def load_graph_rows(session: Session, with_names: bool = False) -> tuple[list, list]:
+    """
+    Lee solo las columnas necesarias (tuplas, sin hidratar objetos ORM):
+    (id, lat, lon[, name]) de los nodos y (src_id, dst_id, weight, id) de las aristas
+    """
+    columns = (Node.id, Node.lat, Node.lon, Node.name) if with_names else (Node.id, Node.lat, Node.lon)
+    nodes = session.exec(select(*columns).order_by(Node.id)).all()
+    edges = session.exec(
+        select(Edge.src_id, Edge.dst_id, Edge.weight, Edge.id).order_by(Edge.id)
+    ).all()
+    return nodes, edges
+
+def snapshot_from_rows(version: int, nodes, rows) -> GraphSnapshot:
+    """Construye el snapshot CSR a partir de las filas leídas"""
+    node_ids = [node[0] for node in nodes]
+    names = [node[3] for node in nodes] if nodes and len(nodes[0]) > 3 else None
+    nan = float("nan")
+    lats = array("d", (nan if node[1] is None or node[2] is None else node[1] for node in nodes))
+    lons = array("d", (nan if node[1] is None or node[2] is None else node[2] for node in nodes))
+
+    # Descartar aristas que apunten a nodos inexistentes
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    edges = [
+        (index[src], index[dst], weight, edge_id)
+        for src, dst, weight, edge_id in rows
+        if src in index and dst in index
+    ]
+
+    offsets, targets, weights, edge_ids = _build_csr(len(node_ids), edges, len(edges))
+    return GraphSnapshot(version, node_ids, offsets, targets, weights, edge_ids, lats, lons, names=names)
+
+def build_snapshot(session: Session, version: int, with_names: bool = False) -> GraphSnapshot:
+    """Construye el snapshot CSR desde la base de datos (sesión síncrona)"""
+    nodes, rows = load_graph_rows(session, with_names)
+    return snapshot_from_rows(version, nodes, rows)
+
+# ========== CACHÉ DEL PROCESO ==========
+
+_snapshot: Optional[GraphSnapshot] = None
+_rebuilds = SingleFlight()
+
+async def get_graph(session: AsyncSession) -> GraphSnapshot:
+    """
+    Retorna el snapshot del grafo, reconstruyéndolo desde la base de datos
+    solo si la versión cambió desde la última construcción.
+    Las peticiones concurrentes comparten una sola reconstrucción, y el
+    armado del CSR corre fuera del event loop. Con GRAPH_SNAPSHOT_DIR la
+    reconstrucción se comparte además entre workers mediante el archivo
+    mapeado de la versión (ver app.snapshot_file).
+    """
+    with span("graph"):
+        version = await session.run_sync(read_graph_version)
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return await _rebuild(session, version)
+
+async def _rebuild(session: AsyncSession, version: int) -> GraphSnapshot:
+    """Arma (o abre el publicado) el snapshot de esa versión, una sola vez por versión"""
+    # Importar aquí para evitar import circular
+    from app.snapshot_file import snapshot_store
+
+    async def rebuild() -> GraphSnapshot:
+        global _snapshot
+        snapshot = await _load_published(version)
+        if snapshot is None:
+            try:
+                with span("graph_load"):
+                    nodes, rows = await session.run_sync(load_graph_rows, snapshot_store is not None)
+                with span("graph_build"):
+                    snapshot = await run_in_threadpool(snapshot_from_rows, version, nodes, rows)
+            except Exception:
+                if snapshot_store is not None:
+                    snapshot_store.release(version)
+                raise
+            if snapshot_store is not None:
+                snapshot = await run_in_threadpool(snapshot_store.publish, snapshot)
+        if _snapshot is None or _snapshot.version <= version:
+            _snapshot = snapshot
+        return snapshot
+
+    return await _rebuilds.do(version, rebuild)
+
+async def _load_published(version: int) -> Optional[GraphSnapshot]:
+    """
+    Con GRAPH_SNAPSHOT_DIR configurado, abre el archivo de la versión si
+    otro worker ya lo publicó (o espera a que termine de construirlo).
+    Retorna None si este worker debe construirlo desde la base de datos.
+    """
+    from app.snapshot_file import GRAPH_SNAPSHOT_WAIT_SECONDS, snapshot_store
+    if snapshot_store is None:
+        return None
+    snapshot = await run_in_threadpool(snapshot_store.load, version)
+    if snapshot is not None or await run_in_threadpool(snapshot_store.claim, version):
+        return snapshot
+
+    deadline = time.monotonic() + GRAPH_SNAPSHOT_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        snapshot = await run_in_threadpool(snapshot_store.load, version)
+        if snapshot is not None:
+            return snapshot
+    return None
@@ -0,0 +1,114 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from threading import Lock
+from typing import Optional
+import asyncio
+import bcrypt
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Costo de bcrypt para hashes nuevos; al cambiarlo, los hashes existentes se
+# regeneran de forma transparente en el siguiente login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Pool dedicado al hashing: "thread" (bcrypt libera el GIL) o "process"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Operaciones que pueden esperar turno antes de responder 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """Hashea una contraseña usando bcrypt directamente"""
+    password_bytes = password.encode('utf-8')
+    salt = bcrypt.gensalt(rounds=rounds)
+    hashed = bcrypt.hashpw(password_bytes, salt)
+    return hashed.decode('utf-8')
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifica una contraseña contra su hash"""
+    password_bytes = plain_password.encode('utf-8')
+    hashed_bytes = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """Indica si el hash ($2b$<costo>$...) usa un costo distinto al configurado"""
+    parts = hashed_password.split('$')
+    try:
+        return int(parts[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool acotado para no ocupar el threadpool de las
+    peticiones. Si hay más de workers + max_queue operaciones en curso,
+    responde 503 en lugar de encolar sin límite.
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="bcrypt"
+                        )
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Demasiadas operaciones de autenticación en curso, reintente",
+                    headers={"Retry-After": "1"},
+                )
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        """Métricas del pool: operaciones en curso y en cola"""
+        in_flight = self._in_flight
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.workers),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(hash_password, password, BCRYPT_ROUNDS)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
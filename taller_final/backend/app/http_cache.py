@@ -0,0 +1,50 @@
+from fastapi import Request, Response, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from app.graph_cache import read_graph_version
+import hashlib
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# GET condicional para los listados y los algoritmos: el ETag se deriva de
+# la versión del grafo más la ruta y los parámetros de la consulta, así que
+# mientras el grafo no cambie la misma URL produce el mismo cuerpo.
+# Un If-None-Match que coincide se responde con 304 tras leer solo la
+# versión (sin consultas de listado, sin snapshot y sin recorrer el grafo).
+GRAPH_CACHE_CONTROL = os.getenv("GRAPH_CACHE_CONTROL", "private, no-cache")
+
+def graph_etag(request: Request, version: int) -> str:
+    """ETag fuerte: "v<versión>-<hash de la ruta y los parámetros>" """
+    query = sorted(request.query_params.multi_items())
+    key = repr((request.url.path, query)).encode()
+    return f'"v{version}-{hashlib.blake2b(key, digest_size=8).hexdigest()}"'
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def set_cache_headers(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = GRAPH_CACHE_CONTROL
+    return response
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Retorna la respuesta 304 si el cliente ya tiene esta versión, o None"""
+    if not _matches(request, etag):
+        return None
+    return set_cache_headers(Response(status_code=status.HTTP_304_NOT_MODIFIED), etag)
+
+async def check_graph_etag(request: Request, session: AsyncSession) -> tuple[str, Optional[Response]]:
+    """
+    Lee la versión del grafo (respetando GRAPH_VERSION_POLL_SECONDS) y
+    retorna (etag, respuesta 304 o None)
+    """
+    version = await session.run_sync(read_graph_version)
+    etag = graph_etag(request, version)
+    return etag, not_modified(request, etag)
@@ -0,0 +1,451 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+from app.graph_cache import GraphSnapshot
+from app.search import bfs, shortest_path_tree, strongly_connected_components
+import json
+import math
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cálculos pesados (BFS, árbol completo, matriz de distancias, componentes)
+# ejecutados en un pool de procesos. El estado y los resultados de cada
+# trabajo viven en archivos dentro de JOBS_DIR, así cualquier worker de
+# uvicorn puede responder por ellos.
+JOBS_DIR = Path(os.getenv("JOBS_DIR", str(Path(tempfile.gettempdir()) / "pathfinder_jobs")))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+# Trabajos en cola o en ejecución permitidos por usuario
+JOBS_MAX_PER_USER = int(os.getenv("JOBS_MAX_PER_USER", "2"))
+# Segundos que se conservan los trabajos terminados y sus resultados
+JOBS_RESULT_TTL_SECONDS = float(os.getenv("JOBS_RESULT_TTL_SECONDS", "3600"))
+# Un trabajo en ejecución publica su latido cada JOBS_HEARTBEAT_SECONDS; si
+# su proceso ya no existe o el latido tiene más de JOBS_STALE_SECONDS se da
+# por fallido (y deja de contar para el límite del usuario)
+JOBS_HEARTBEAT_SECONDS = float(os.getenv("JOBS_HEARTBEAT_SECONDS", "10"))
+JOBS_STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "300"))
+# Un bloqueo de usuario más viejo que esto se considera abandonado
+JOBS_LOCK_STALE_SECONDS = 5.0
+# Los índices (CH, alcanzabilidad) de grafos con al menos estas aristas se
+# construyen en el pool de procesos; los más chicos, en el propio worker
+INDEX_PROCESS_MIN_EDGES = int(os.getenv("INDEX_PROCESS_MIN_EDGES", "50000"))
+
+ACTIVE_STATUSES = ("queued", "running")
+JOB_KINDS = ("bfs", "sssp", "distance_matrix", "components")
+
+class JobCancelled(Exception):
+    pass
+
+# ========== ALMACÉN EN DISCO ==========
+
+def _meta_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.json"
+
+def result_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.result.json"
+
+def _cancel_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.cancel"
+
+def _snapshot_path(version: int) -> Path:
+    return JOBS_DIR / f"snapshot-{version}.pickle"
+
+def _owner_lock_path(owner_id: int) -> Path:
+    return JOBS_DIR / f"owner-{owner_id}.lock"
+
+def _write_json(path: Path, data) -> None:
+    """Escritura atómica: los lectores nunca ven un archivo a medias"""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def read_job(job_id: str) -> Optional[dict]:
+    try:
+        with open(_meta_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+# El latido y el avance de un trabajo se escriben desde hilos distintos
+_update_lock = threading.Lock()
+
+def _update_job(job_id: str, **fields) -> dict:
+    with _update_lock:
+        job = read_job(job_id) or {}
+        job.update(fields)
+        _write_json(_meta_path(job_id), job)
+    return job
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+def list_jobs(owner_id: int) -> list[dict]:
+    """Trabajos del usuario, más recientes primero (purga los vencidos)"""
+    jobs = []
+    for job in _scan():
+        if job.get("owner_id") == owner_id:
+            jobs.append(job)
+    jobs.sort(key=lambda job: job["created_at"], reverse=True)
+    return jobs
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _is_orphaned(job: dict, now: float) -> bool:
+    """
+    Trabajo activo que ya nadie va a terminar: en cola de un worker que
+    murió (la cola vive en su pool) o en ejecución en un proceso que murió
+    o dejó de latir. JOBS_DIR es local: los pids son del mismo host.
+    """
+    if job["status"] == "running":
+        return (
+            not _pid_alive(job.get("worker_pid"))
+            or now - job.get("heartbeat_at", now) > JOBS_STALE_SECONDS
+        )
+    return not _pid_alive(job.get("queued_by"))
+
+def _scan() -> list[dict]:
+    """
+    Lee todos los trabajos, marca como fallidos los huérfanos y elimina los
+    terminados hace más de JOBS_RESULT_TTL_SECONDS
+    """
+    if not JOBS_DIR.exists():
+        return []
+    now = time.time()
+    jobs = []
+    referenced_versions = set()
+    for path in JOBS_DIR.glob("*.json"):
+        if path.name.endswith(".result.json"):
+            continue
+        job = read_job(path.stem)
+        if job is None:
+            continue
+        if job["status"] in ACTIVE_STATUSES and _is_orphaned(job, now):
+            job = _update_job(
+                job["id"], status="failed", finished_at=_now(),
+                error="El proceso del trabajo terminó sin completarlo"
+            )
+        if job["status"] not in ACTIVE_STATUSES:
+            if now - path.stat().st_mtime > JOBS_RESULT_TTL_SECONDS:
+                for stale in (path, result_path(job["id"]), _cancel_path(job["id"])):
+                    stale.unlink(missing_ok=True)
+                continue
+        else:
+            referenced_versions.add(job["graph_version"])
+        jobs.append(job)
+
+    # Snapshots que ya no usa ningún trabajo activo (se conserva el más nuevo)
+    snapshots = sorted(
+        JOBS_DIR.glob("snapshot-*.pickle"), key=lambda path: int(path.stem.split("-")[1])
+    )
+    for path in snapshots[:-1]:
+        if int(path.stem.split("-")[1]) not in referenced_versions:
+            path.unlink(missing_ok=True)
+    return jobs
+
+# ========== EJECUCIÓN EN EL PROCESO HIJO ==========
+
+# Snapshot cargado en este proceso del pool (se lee una vez por versión)
+_worker_snapshot: Optional[GraphSnapshot] = None
+
+def _load_snapshot(version: int) -> GraphSnapshot:
+    global _worker_snapshot
+    if _worker_snapshot is None or _worker_snapshot.version != version:
+        with open(_snapshot_path(version), "rb") as f:
+            _worker_snapshot = pickle.load(f)
+    return _worker_snapshot
+
+class _Progress:
+    """Publica el avance cada ~5% y revisa si se pidió cancelar"""
+
+    def __init__(self, job_id: str, total: int):
+        self.job_id = job_id
+        self.total = max(total, 1)
+        self.step = max(self.total // 20, 1)
+        self.done = 0
+
+    def advance(self, amount: int = 1) -> None:
+        before = self.done // self.step
+        self.done += amount
+        if self.done // self.step != before:
+            self.check()
+            _update_job(self.job_id, progress=min(self.done / self.total, 1.0))
+
+    def check(self) -> None:
+        if _cancel_path(self.job_id).exists():
+            raise JobCancelled()
+
+    def tick(self, amount: int) -> None:
+        """Callback de las búsquedas largas (cada PROGRESS_EVERY nodos): cancela y avanza"""
+        self.check()
+        self.advance(amount)
+
+def _run_bfs(graph: GraphSnapshot, params: dict, progress: _Progress) -> dict:
+    order = []
+    tree = []
+    for node_id, parent_id, depth in bfs(graph, params["start_id"], max_depth=params.get("max_depth")):
+        order.append(node_id)
+        tree.append({"node_id": node_id, "parent_id": parent_id, "depth": depth})
+        progress.advance()
+    return {"order": order, "tree": tree}
+
+def _run_sssp(graph: GraphSnapshot, params: dict, progress: _Progress) -> dict:
+    # Con SciPy el árbol es una sola llamada en C: se cancela antes o después
+    distances, parent = shortest_path_tree(graph, graph.index[params["src_id"]], progress.tick)
+    progress.check()
+    node_ids = graph.node_ids
+    reached = [i for i in range(graph.node_count) if distances[i] != math.inf]
+    return {
+        "source": params["src_id"],
+        "nodes": [node_ids[i] for i in reached],
+        "distances": [float(distances[i]) for i in reached],
+        "parents": [node_ids[parent[i]] if parent[i] >= 0 else None for i in reached],
+    }
+
+def _run_distance_matrix(graph: GraphSnapshot, params: dict, progress: _Progress) -> dict:
+    targets = [graph.index[dst_id] for dst_id in params["targets"]]
+    rows = {}
+    for src_id in dict.fromkeys(params["sources"]):
+        progress.check()
+        distances, _ = shortest_path_tree(graph, graph.index[src_id])
+        rows[src_id] = [None if distances[dst] == math.inf else float(distances[dst]) for dst in targets]
+        progress.advance()
+    return {
+        "sources": params["sources"],
+        "targets": params["targets"],
+        "distances": [rows[src_id] for src_id in params["sources"]],
+    }
+
+def _run_components(graph: GraphSnapshot, params: dict, progress: _Progress) -> dict:
+    count, labels = strongly_connected_components(graph, progress.tick)
+    progress.check()
+    members = [[] for _ in range(count)]
+    for i, label in enumerate(labels):
+        members[label].append(graph.node_ids[i])
+    members.sort(key=len, reverse=True)
+    return {"count": count, "components": members}
+
+_RUNNERS = {
+    "bfs": (_run_bfs, lambda graph, params: graph.node_count),
+    "sssp": (_run_sssp, lambda graph, params: graph.node_count),
+    "distance_matrix": (_run_distance_matrix, lambda graph, params: len(set(params["sources"]))),
+    "components": (_run_components, lambda graph, params: graph.node_count),
+}
+
+@contextmanager
+def _heartbeat(job_id: str):
+    """Publica heartbeat_at cada JOBS_HEARTBEAT_SECONDS mientras dura el bloque"""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOBS_HEARTBEAT_SECONDS):
+            _update_job(job_id, heartbeat_at=time.time())
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def _execute(job_id: str, kind: str, params: dict, version: int) -> None:
+    """Punto de entrada en el proceso del pool"""
+    try:
+        if _cancel_path(job_id).exists():
+            raise JobCancelled()
+        _update_job(
+            job_id, status="running", started_at=_now(), worker_pid=os.getpid(), heartbeat_at=time.time()
+        )
+        with _heartbeat(job_id):
+            graph = _load_snapshot(version)
+            runner, total = _RUNNERS[kind]
+            progress = _Progress(job_id, total(graph, params))
+            result = runner(graph, params, progress)
+        _write_json(result_path(job_id), result)
+        _update_job(job_id, status="done", progress=1.0, finished_at=_now())
+    except JobCancelled:
+        _update_job(job_id, status="cancelled", finished_at=_now())
+    except Exception as e:
+        _update_job(job_id, status="failed", error=str(e), finished_at=_now())
+
+# ========== COLA DEL PROCESO ==========
+
+@contextmanager
+def _owner_lock(owner_id: int):
+    """
+    Bloqueo por usuario entre workers (archivo creado con O_EXCL). Se
+    espera a que se libere; uno más viejo que JOBS_LOCK_STALE_SECONDS se
+    considera abandonado (quien lo tenía murió).
+    """
+    lock = _owner_lock_path(owner_id)
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > JOBS_LOCK_STALE_SECONDS:
+                    lock.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        lock.unlink(missing_ok=True)
+
+class JobQueue:
+    """Pool de procesos acotado y trabajos encolados por este worker"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: dict[str, Future] = {}
+        self._lock = Lock()
+        self._snapshot_version: Optional[int] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _publish_snapshot(self, graph: GraphSnapshot) -> None:
+        """Serializa el snapshot una sola vez por versión para los procesos del pool"""
+        with self._lock:
+            path = _snapshot_path(graph.version)
+            if self._snapshot_version == graph.version and path.exists():
+                return
+            if not path.exists():
+                tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+                with open(tmp, "wb") as f:
+                    pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+            self._snapshot_version = graph.version
+
+    def submit(self, owner_id: int, kind: str, params: dict, graph: GraphSnapshot) -> Optional[dict]:
+        """
+        Registra y encola un trabajo. Retorna None si el usuario ya tiene
+        JOBS_MAX_PER_USER trabajos activos. El conteo y el registro se hacen
+        bajo el bloqueo del usuario, así que envíos concurrentes (de
+        cualquier worker) no superan el límite.
+        """
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        with _owner_lock(owner_id):
+            active = sum(
+                1 for job in _scan()
+                if job.get("owner_id") == owner_id and job["status"] in ACTIVE_STATUSES
+            )
+            if active >= JOBS_MAX_PER_USER:
+                return None
+
+            job = {
+                "id": job_id,
+                "owner_id": owner_id,
+                "kind": kind,
+                "params": params,
+                "status": "queued",
+                "progress": 0.0,
+                "graph_version": graph.version,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                # Worker de uvicorn en cuyo pool queda encolado
+                "queued_by": os.getpid(),
+            }
+            _write_json(_meta_path(job_id), job)
+        try:
+            # Después de registrar el trabajo: desde ahí _scan no borra su snapshot
+            self._publish_snapshot(graph)
+            future = self._get_executor().submit(_execute, job_id, kind, params, graph.version)
+        except Exception as e:
+            self._reset_broken_pool(e)
+            return _update_job(job_id, status="failed", error=str(e) or repr(e), finished_at=_now())
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda done: self._finished(job_id, done))
+        return job
+
+    def _finished(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # El pool se rompió (p. ej. un proceso murió): el trabajo no va a terminar
+            self._reset_broken_pool(error)
+            job = read_job(job_id)
+            if job is not None and job["status"] in ACTIVE_STATUSES:
+                _update_job(job_id, status="failed", error=str(error) or repr(error), finished_at=_now())
+
+    def _reset_broken_pool(self, error: BaseException) -> None:
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                self._executor = None
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        Cancela un trabajo: si sigue en la cola de este worker se descarta;
+        si ya corre, el proceso lo detiene en su próximo punto de control
+        """
+        _cancel_path(job_id).touch()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return _update_job(job_id, status="cancelled", finished_at=_now())
+        return read_job(job_id)
+
+    def run_on_snapshot(self, fn, graph: GraphSnapshot) -> Future:
+        """
+        Ejecuta fn(graph) en el pool (fn debe poder importarse desde el proceso
+        hijo). El snapshot viaja con la tarea y no por JOBS_DIR: ningún
+        trabajo lo referencia, así que _scan podría borrar el archivo antes
+        de que el proceso lo lea.
+        """
+        try:
+            return self._get_executor().submit(fn, graph)
+        except BrokenProcessPool as e:
+            self._reset_broken_pool(e)
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+job_queue = JobQueue(JOBS_WORKERS)
+
+def run_in_pool(fn, graph: GraphSnapshot):
+    """
+    fn(graph) para trabajo CPU de fondo (construcción de índices) sin retener
+    el GIL del worker: en el pool de procesos, o aquí si el grafo tiene menos
+    de INDEX_PROCESS_MIN_EDGES aristas. Bloquea: llamar desde un hilo.
+    """
+    if graph.edge_count < INDEX_PROCESS_MIN_EDGES:
+        return fn(graph)
+    return job_queue.run_on_snapshot(fn, graph).result()
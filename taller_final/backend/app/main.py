@@ -1,16 +1,26 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from app.db import init_db
 from app.auth import router as auth_router
-from app.routers import graph, algorithms
+from app.hashing import password_hasher
+from app.jobs import job_queue
+from app import metrics, profiling
+from app.routers import graph, algorithms, jobs
+from typing import Literal
 import os
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Crear la aplicación FastAPI
-app = FastAPI(title="PathFinder Minimal API", version="1.0.0")
+# Las respuestas se serializan con orjson
+app = FastAPI(
+    title="PathFinder Minimal API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # Configurar CORS
 origins = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
@@ -19,13 +29,24 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    # Cursor de la paginación de /graph/nodes y /graph/edges y ETag del GET condicional
+    expose_headers=["X-Next-After-Id", "ETag", "Server-Timing", "X-Profile-Id"]
 )
 
+# Latencia por ruta, etapas y consultas por petición (ver app.metrics)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Perfiles bajo demanda (token de admin) y muestreo continuo (ver app.profiling)
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 # Incluir routers
 app.include_router(auth_router)
 app.include_router(graph.router)
 app.include_router(algorithms.router)
+app.include_router(jobs.router)
 
 # Evento al iniciar la aplicación
 @app.on_event("startup")
@@ -34,6 +55,11 @@ def on_startup():
     init_db()
     print("✅ Aplicación lista!")
 
+@app.on_event("shutdown")
+def on_shutdown():
+    password_hasher.shutdown()
+    job_queue.shutdown()
+
 # Endpoint raíz
 @app.get("/")
 def root():
@@ -41,4 +67,31 @@ def root():
         "message": "PathFinder API",
         "version": "1.0.0",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+# Métricas en formato Prometheus (por worker)
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    if not metrics.METRICS_ENABLED:
+        return PlainTextResponse("# métricas desactivadas (METRICS_ENABLED=false)\n")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Perfiles guardados (formato collapsed: flamegraph.pl o speedscope)
+@app.get("/profiles", include_in_schema=False, dependencies=[Depends(profiling.require_profile_admin)])
+def list_profiles(
+    limit: int = Query(50, ge=1, le=1000),
+    order: Literal["recent", "slowest"] = Query("recent", description="recent o slowest (cola lenta)")
+):
+    return profiling.profile_store.list(limit, order)
+
+@app.get("/profiles/{profile_id}", include_in_schema=False, dependencies=[Depends(profiling.require_profile_admin)])
+def get_profile(profile_id: str):
+    collapsed = profiling.profile_store.read(profile_id)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil no encontrado (puede haber sido rotado)"
+        )
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": f'attachment; filename="{profile_id}.collapsed"'
+    })
@@ -0,0 +1,254 @@
+from contextlib import nullcontext
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+from sqlalchemy import event
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Instrumentación del camino caliente:
+# - span(etapa): tiempo de cada etapa de la petición (auth, graph, search,
+#   serialize, ...), acumulado en el contexto de la petición
+# - consultas a la BD por petición (eventos de SQLAlchemy)
+# - latencia por ruta, en histogramas
+# - contadores de los algoritmos (nodos asentados, inserciones en el heap,
+#   aristas relajadas)
+# Se exporta en formato Prometheus en /metrics y por petición en el header
+# Server-Timing. Los valores son por worker de uvicorn.
+# Con METRICS_ENABLED=false no se instala el middleware ni los eventos, y
+# span() / record_search() retornan de inmediato.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# ========== MÉTRICAS DEL PROCESO ==========
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [conteo por bucket..., suma, total]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        values = self._values.get(labels)
+        if values is None:
+            values = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        values[-2] += value
+        values[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {values[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+_lock = Lock()
+
+requests_total = Counter(
+    "pathfinder_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+request_seconds = Histogram(
+    "pathfinder_http_request_duration_seconds", "Latencia de las peticiones por ruta",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+stage_seconds = Histogram(
+    "pathfinder_stage_duration_seconds", "Tiempo por etapa de la petición",
+    ("route", "stage"), LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "pathfinder_db_queries_per_request", "Consultas a la base de datos por petición",
+    ("route",), QUERY_BUCKETS,
+)
+searches_total = Counter("pathfinder_searches_total", "Búsquedas ejecutadas", ("algorithm",))
+nodes_settled = Counter(
+    "pathfinder_search_nodes_settled_total", "Nodos asentados (extraídos del heap o de la cola)", ("algorithm",)
+)
+heap_pushes = Counter("pathfinder_search_heap_pushes_total", "Inserciones en el heap o la cola", ("algorithm",))
+edges_relaxed = Counter(
+    "pathfinder_search_edges_relaxed_total", "Aristas examinadas desde nodos asentados", ("algorithm",)
+)
+
+METRICS = (
+    requests_total, request_seconds, stage_seconds, request_queries,
+    searches_total, nodes_settled, heap_pushes, edges_relaxed,
+)
+
+def record_search(algorithm: str, settled: int, pushes: int, relaxed: int) -> None:
+    """Suma los contadores de una búsqueda (se llama una vez al terminar)"""
+    if not METRICS_ENABLED:
+        return
+    labels = (algorithm,)
+    with _lock:
+        searches_total.inc(labels)
+        nodes_settled.inc(labels, settled)
+        heap_pushes.inc(labels, pushes)
+        edges_relaxed.inc(labels, relaxed)
+
+def render() -> str:
+    """Todas las métricas en el formato de texto de Prometheus"""
+    with _lock:
+        lines = []
+        for metric in METRICS:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ========== ETAPAS DE LA PETICIÓN ==========
+
+class RequestTimings:
+    """Tiempos acumulados por etapa y consultas a la BD de una petición"""
+
+    __slots__ = ("stages", "db_queries", "db_seconds")
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+class _Span:
+    __slots__ = ("timings", "stage", "started")
+
+    def __init__(self, timings: RequestTimings, stage: str):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.stage, time.perf_counter() - self.started)
+        return False
+
+_NO_SPAN = nullcontext()
+
+def span(stage: str):
+    """
+    Mide un bloque como etapa de la petición actual. Fuera de una petición
+    instrumentada (o con las métricas desactivadas) no hace nada.
+    """
+    timings = _current.get()
+    if timings is None:
+        return _NO_SPAN
+    return _Span(timings, stage)
+
+# ========== CONSULTAS A LA BASE DE DATOS ==========
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    if timings is not None:
+        conn.info["metrics_query_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = conn.info.pop("metrics_query_started", None)
+    if timings is not None and started is not None:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+def instrument_engine(engine) -> None:
+    """Cuenta y cronometra las consultas del engine (síncrono o el sync_engine del asíncrono)"""
+    if METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# ========== MIDDLEWARE ==========
+
+def _route_label(scope) -> str:
+    """Plantilla de la ruta (p. ej. /graph/jobs/{job_id}) para acotar la cardinalidad"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _server_timing(timings: RequestTimings, total: float) -> bytes:
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.stages.items()]
+    if timings.db_queries:
+        parts.append(f'db;desc="{timings.db_queries} queries";dur={timings.db_seconds * 1000:.2f}')
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+class MetricsMiddleware:
+    """Middleware ASGI: crea el contexto de la petición y registra su latencia"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(timings, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            route = _route_label(scope)
+            with _lock:
+                requests_total.inc((scope["method"], route, str(status)))
+                request_seconds.observe((scope["method"], route), elapsed)
+                request_queries.observe((route,), timings.db_queries)
+                for stage, seconds in timings.stages.items():
+                    stage_seconds.observe((route, stage), seconds)
+                if timings.db_queries:
+                    stage_seconds.observe((route, "db"), timings.db_seconds)
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, UniqueConstraint
 from datetime import datetime
 
 class User(SQLModel, table=True):
@@ -15,13 +15,25 @@ class Node(SQLModel, table=True):
     
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True, max_length=100)
+    # Coordenadas opcionales (grados), usadas por la heurística de A*
+    lat: Optional[float] = Field(default=None)
+    lon: Optional[float] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Edge(SQLModel, table=True):
     __tablename__ = "edges"
+    # Una sola arista por par (origen, destino); permite cargas idempotentes
+    __table_args__ = (UniqueConstraint("src_id", "dst_id", name="uq_edges_src_dst"),)
     
     id: Optional[int] = Field(default=None, primary_key=True)
     src_id: int = Field(foreign_key="nodes.id", index=True)
     dst_id: int = Field(foreign_key="nodes.id", index=True)
     weight: float
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class GraphVersion(SQLModel, table=True):
+    __tablename__ = "graph_version"
+    
+    # Tabla de una sola fila (id=1) compartida por todos los workers
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=0)
@@ -0,0 +1,229 @@
+from array import array
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+from threading import Lock
+from typing import Callable, Hashable, Optional
+from app.graph_cache import GraphSnapshot
+from app.search import ENGINES, PathResult, choose_engine, shortest_path_tree, tree_path
+from app.singleflight import SingleFlight
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Resultados punto a punto guardados: (src_id, dst_id, versión) -> camino
+PATH_CACHE_MAX_ENTRIES = int(os.getenv("PATH_CACHE_MAX_ENTRIES", "10000"))
+# Presupuesto en bytes para los árboles completos por origen (16 bytes por nodo)
+PATH_TREE_CACHE_MAX_BYTES = int(os.getenv("PATH_TREE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Consultas no cacheadas desde un mismo origen antes de calcular su árbol
+# completo: el árbol cuesta una búsqueda sobre todo el grafo y se amortiza
+# con las consultas punto a punto que evita
+PATH_TREE_MIN_QUERIES = int(os.getenv("PATH_TREE_MIN_QUERIES", "8"))
+# Solo se calculan árboles si en el presupuesto caben al menos estos: con
+# grafos más grandes se desalojarían entre sí antes de amortizarse
+PATH_TREE_MIN_SLOTS = 8
+# Bytes por nodo de un árbol (distancia "d" + padre "q")
+_TREE_BYTES_PER_NODE = 16
+
+class _LRU:
+    """LRU acotado por la suma de los pesos de sus entradas"""
+
+    def __init__(self, budget: int, weigh: Callable[[object], int]):
+        self.budget = budget
+        self.weigh = weigh
+        self.weight = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value) -> None:
+        weight = self.weigh(value)
+        if weight > self.budget:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.weight -= self.weigh(old)
+        self._entries[key] = value
+        self.weight += weight
+        while self.weight > self.budget:
+            _, evicted = self._entries.popitem(last=False)
+            self.weight -= self.weigh(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weight = 0
+
+class ShortestPathTree:
+    """Árbol completo de caminos más cortos desde un origen, para una versión"""
+
+    __slots__ = ("version", "src_id", "distances", "parent")
+
+    def __init__(self, version: int, src_id: int, distances: array, parent: array):
+        self.version = version
+        self.src_id = src_id
+        self.distances = distances
+        self.parent = parent
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self.distances) * self.distances.itemsize
+            + len(self.parent) * self.parent.itemsize
+        )
+
+    def path_to(self, graph: GraphSnapshot, dst_id: int) -> PathResult:
+        return tree_path(graph, self.distances, self.parent, graph.index[dst_id])
+
+class PathCache:
+    """
+    Caché de caminos más cortos del proceso
+    - pairs: resultados punto a punto (incluye "no existe camino")
+    - trees: árboles completos de los orígenes más consultados
+    Las claves incluyen la versión del grafo; al aparecer una versión nueva
+    se descarta todo lo anterior, que ya no puede volver a usarse.
+    """
+
+    def __init__(self, max_entries: int, max_tree_bytes: int, tree_min_queries: int):
+        self.tree_min_queries = tree_min_queries
+        self.version = -1
+        self._pairs = _LRU(max_entries, lambda value: 1)
+        self._trees = _LRU(max_tree_bytes, lambda tree: tree.nbytes)
+        self._source_misses: dict[int, int] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _advance(self, version: int) -> bool:
+        """Descarta las entradas viejas si version es más nueva; False si es más vieja"""
+        if version > self.version:
+            if self.version >= 0:
+                self.invalidations += 1
+            self.version = version
+            self._pairs.clear()
+            self._trees.clear()
+            self._source_misses.clear()
+        return version == self.version
+
+    def get(self, version: int, src_id: int, dst_id: int) -> tuple[bool, PathResult]:
+        """Retorna (encontrado, resultado)"""
+        with self._lock:
+            if self._advance(version):
+                entry = self._pairs.get((src_id, dst_id))
+                if entry is not None:
+                    self.hits += 1
+                    return True, entry[0]
+            self.misses += 1
+            return False, None
+
+    def put(self, version: int, src_id: int, dst_id: int, result: PathResult) -> None:
+        with self._lock:
+            if self._advance(version):
+                # Tupla de un elemento para poder guardar también None
+                self._pairs.put((src_id, dst_id), (result,))
+
+    def get_tree(self, version: int, src_id: int) -> Optional[ShortestPathTree]:
+        with self._lock:
+            if not self._advance(version):
+                return None
+            tree = self._trees.get(src_id)
+            if tree is not None:
+                self.tree_hits += 1
+            return tree
+
+    def put_tree(self, tree: ShortestPathTree) -> None:
+        with self._lock:
+            if self._advance(tree.version):
+                self._trees.put(tree.src_id, tree)
+                self._source_misses.pop(tree.src_id, None)
+
+    def tree_worthwhile(self, graph: GraphSnapshot) -> bool:
+        """Indica si un árbol de este grafo deja lugar para PATH_TREE_MIN_SLOTS en el presupuesto"""
+        tree_bytes = graph.node_count * _TREE_BYTES_PER_NODE
+        return self.tree_min_queries > 0 and tree_bytes * PATH_TREE_MIN_SLOTS <= self._trees.budget
+
+    def note_source_miss(self, version: int, src_id: int) -> int:
+        """Cuenta las consultas calculadas desde src_id en esta versión"""
+        with self._lock:
+            if not self._advance(version):
+                return 0
+            count = self._source_misses.get(src_id, 0) + 1
+            # Acotar el contador al mismo número de orígenes que el LRU de pares
+            if count == 1 and len(self._source_misses) >= self._pairs.budget:
+                self._source_misses.clear()
+            self._source_misses[src_id] = count
+            return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._pairs),
+                "max_entries": self._pairs.budget,
+                "trees": len(self._trees),
+                "tree_bytes": self._trees.weight,
+                "max_tree_bytes": self._trees.budget,
+                "hits": self.hits,
+                "tree_hits": self.tree_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self._pairs.evictions,
+                "tree_evictions": self._trees.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": _flights.coalesced,
+                "in_flight": _flights.in_flight(),
+            }
+
+path_cache = PathCache(PATH_CACHE_MAX_ENTRIES, PATH_TREE_CACHE_MAX_BYTES, PATH_TREE_MIN_QUERIES)
+_flights = SingleFlight()
+
+def compute_shortest_path(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    Calcula un camino no cacheado: primero desde el árbol del origen si
+    existe; si el origen ya se consultó PATH_TREE_MIN_QUERIES veces y el
+    árbol es más barato que las búsquedas que reemplaza (cabe holgado en el
+    presupuesto y no hay índice CH, cuyas consultas son más baratas que
+    recorrer el grafo) se construye su árbol completo; si no, se usa el
+    motor por defecto
+    """
+    tree = path_cache.get_tree(graph.version, src_id)
+    if tree is not None:
+        return tree.path_to(graph, dst_id)
+
+    engine = choose_engine(graph, src_id, dst_id)
+    if engine != "ch" and path_cache.tree_worthwhile(graph) and (
+        path_cache.note_source_miss(graph.version, src_id) >= path_cache.tree_min_queries
+    ):
+        distances, parent = shortest_path_tree(graph, graph.index[src_id])
+        tree = ShortestPathTree(graph.version, src_id, distances, parent)
+        path_cache.put_tree(tree)
+        return tree.path_to(graph, dst_id)
+
+    return ENGINES[engine](graph, src_id, dst_id)
+
+async def cached_shortest_path(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    Camino más corto con caché por (src_id, dst_id, versión). Las consultas
+    idénticas concurrentes comparten un solo cálculo.
+    """
+    found, result = path_cache.get(graph.version, src_id, dst_id)
+    if found:
+        return result
+
+    async def compute() -> PathResult:
+        result = await run_in_threadpool(compute_shortest_path, graph, src_id, dst_id)
+        path_cache.put(graph.version, src_id, dst_id, result)
+        return result
+
+    return await _flights.do((graph.version, src_id, dst_id), compute)
@@ -0,0 +1,267 @@
+from fastapi import Header, HTTPException, status
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import anyio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Perfilado de peticiones individuales con un muestreador de pilas: un hilo
+# lee sys._current_frames() cada PROFILE_INTERVAL_MS mientras dura la
+# petición y cuenta las pilas en formato "collapsed" (frame;frame;frame N),
+# que abren directamente flamegraph.pl y speedscope.
+# - Bajo demanda: header X-Profile-Token (o ?profile_token=) con el valor
+#   de PROFILE_ADMIN_TOKEN. Sin token configurado no se puede pedir.
+# - Continuo: una fracción PROFILE_SAMPLE_RATE de las peticiones a las rutas
+#   de algoritmos, guardando solo las que tardan al menos PROFILE_MIN_MS.
+# Los perfiles se guardan en PROFILE_DIR (se conservan los PROFILE_KEEP más
+# recientes) y la respuesta lleva su id en el header X-Profile-Id.
+# Se muestrean todos los hilos ocupados del worker (el event loop y el
+# threadpool): con peticiones concurrentes el perfil incluye también el
+# trabajo de las otras, por eso se guarda cuántas había en curso.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_PATHS = frozenset(
+    path.strip() for path in os.getenv(
+        "PROFILE_SAMPLE_PATHS",
+        "/graph/bfs,/graph/shortest-path,/graph/reachable,/graph/components,/graph/distance-matrix",
+    ).split(",") if path.strip()
+)
+PROFILE_MIN_MS = float(os.getenv("PROFILE_MIN_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "pathfinder_profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_MAX_DEPTH = 128
+
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+_PROFILE_ID = re.compile(r"^\d+-\d+-\d+$")
+
+# Hilos esperando trabajo (threadpool, event loop en select): no se cuentan.
+# Los ejecutores y aiosqlite esperan dentro de SimpleQueue.get (en C), así
+# que la hoja visible es su propia función de worker
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+_IDLE_FUNCTIONS = frozenset({"_worker", "_connection_worker_thread"})
+
+# ========== MUESTREADOR ==========
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _collapse(frame) -> Optional[str]:
+    """Pila de la raíz a la hoja separada por ';', o None si el hilo está ocioso"""
+    code = frame.f_code
+    if code.co_filename.endswith(_IDLE_FILES) or code.co_name in _IDLE_FUNCTIONS:
+        return None
+    labels = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(_frame_label(frame).replace(";", ":"))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+class StackSampler:
+    """Cuenta las pilas de los hilos ocupados del proceso hasta llamar a stop()"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        stacks = self.stacks
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = _collapse(frame)
+                if stack is not None:
+                    stacks[stack] = stacks.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+        return "\n".join(lines) + "\n" if lines else ""
+
+# ========== ALMACÉN EN DISCO ==========
+
+class ProfileStore:
+    """Perfiles en disco (<id>.collapsed + <id>.json); rota conservando los más recientes"""
+
+    def __init__(self, directory: Path, keep: int):
+        self.directory = directory
+        self.keep = keep
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        return f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._sequence)}"
+
+    def save(self, profile_id: str, collapsed: str, meta: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.collapsed").write_text(collapsed, encoding="utf-8")
+        # El .json se escribe al final: un perfil listado siempre tiene sus pilas
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(meta), encoding="utf-8")
+        self._prune()
+
+    def _prune(self) -> None:
+        with self._lock:
+            dated = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    dated.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    continue  # Rotado por otro worker (el bloqueo es de este proceso)
+            dated.sort()
+            metas = [path for _, path in dated]
+            for path in metas[:max(len(metas) - self.keep, 0)]:
+                path.unlink(missing_ok=True)
+                path.with_suffix(".collapsed").unlink(missing_ok=True)
+
+    def list(self, limit: int = 50, order: str = "recent") -> list[dict]:
+        if not self.directory.exists():
+            return []
+        metas = []
+        for path in self.directory.glob("*.json"):
+            try:
+                metas.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # Rotado o a medio escribir por otro worker
+        key = "duration_ms" if order == "slowest" else "created_at"
+        metas.sort(key=lambda meta: meta[key], reverse=True)
+        return metas[:limit]
+
+    def read(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            return (self.directory / f"{profile_id}.collapsed").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_KEEP)
+
+# ========== ACCESO ==========
+
+def _valid_token(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN and token) and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+def require_profile_admin(x_profile_token: Optional[str] = Header(default=None)) -> None:
+    """Dependencia de los endpoints de perfiles: exige el token de administración"""
+    if not _valid_token(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requiere el token de perfilado (X-Profile-Token)"
+        )
+
+def _requested_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile-token":
+            return value.decode("latin-1")
+    if b"profile_token=" in scope.get("query_string", b""):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile_token")
+        return values[0] if values else None
+    return None
+
+def _public_query(scope) -> str:
+    """Query string sin el token, para guardarla en los metadatos"""
+    query = scope.get("query_string", b"").decode("latin-1")
+    return "&".join(part for part in query.split("&") if part and not part.startswith("profile_token="))
+
+# ========== MIDDLEWARE ==========
+
+class ProfilingMiddleware:
+    """Middleware ASGI: perfila las peticiones pedidas por un admin y una muestra de las de algoritmos"""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _valid_token(_requested_token(scope)):
+            trigger = "admin"
+        elif PROFILE_SAMPLE_RATE > 0 and scope["path"] in PROFILE_SAMPLE_PATHS and random.random() < PROFILE_SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            trigger = None
+
+        self.in_flight += 1
+        if trigger is None:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.in_flight -= 1
+            return
+
+        profile_id = profile_store.new_id()
+        concurrent = self.in_flight
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code, concurrent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                concurrent = max(concurrent, self.in_flight)
+                # Las muestreadas no llevan el id: se guardan solo si llegan a PROFILE_MIN_MS
+                if trigger == "admin":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000).start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.in_flight -= 1
+            duration_ms = (time.perf_counter() - started) * 1000
+            meta = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": _public_query(scope),
+                "status": status_code,
+                "duration_ms": round(duration_ms, 3),
+                "concurrent_requests": concurrent,
+                "pid": os.getpid(),
+                "created_at": time.time(),
+            }
+            # Detener el muestreador (join) y escribir en disco fuera del event
+            # loop; shield para guardar el perfil también si se cancela la petición
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(_finish_profile, sampler, meta)
+
+def _finish_profile(sampler: StackSampler, meta: dict) -> None:
+    sampler.stop()
+    if meta["trigger"] == "admin" or meta["duration_ms"] >= PROFILE_MIN_MS:
+        meta["samples"] = sampler.samples
+        profile_store.save(meta["id"], sampler.collapsed(), meta)
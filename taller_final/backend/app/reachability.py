@@ -0,0 +1,303 @@
+from fastapi.concurrency import run_in_threadpool
+from threading import Lock, Thread
+from typing import Optional
+from app.graph_cache import GraphSnapshot
+from app.search import strongly_connected_components
+from app.singleflight import SingleFlight
+import logging
+import os
+import random
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Índice de alcanzabilidad: componentes fuertemente conexas + DAG condensado.
+# Con hasta REACH_BITSET_MAX_COMPONENTS componentes se guarda, por componente,
+# un bitset (int de Python) con todas las componentes alcanzables: la
+# respuesta es exacta. Con más componentes se usan REACH_INTERVAL_LABELS
+# etiquetados por intervalos (DFS aleatorios) que solo descartan pares.
+REACH_BITSET_MAX_COMPONENTS = int(os.getenv("REACH_BITSET_MAX_COMPONENTS", "10000"))
+REACH_INTERVAL_LABELS = int(os.getenv("REACH_INTERVAL_LABELS", "3"))
+
+class ReachIndex:
+    """
+    Índice de alcanzabilidad de una versión del grafo
+
+    - labels[i]: componente del nodo con índice denso i en graph
+    - reach[c]: bitset de componentes alcanzables desde c (modo bitset)
+    - intervals: [(low, post)] por etiquetado; si v es alcanzable desde u,
+      el intervalo de v está contenido en el de u (modo intervalos)
+    - graph: snapshot con el que se construyó; tras apply puede ser anterior
+      a version, y los nodos creados después no están en el índice (para
+      ellos check() responde None)
+    - exact: False tras eliminar aristas; entonces solo los "no" son seguros
+    - patched: True si se actualizó tras una inserción; la partición en
+      componentes puede haber cambiado aunque las respuestas sigan siendo válidas
+    """
+
+    def __init__(self, graph: GraphSnapshot, count: int, labels: list[int], condensation: list,
+                 reach: Optional[list[int]], intervals: Optional[list]):
+        self.version = graph.version
+        self.graph = graph
+        self.count = count
+        self.labels = labels
+        self.condensation_edges = sum(len(successors) for successors in condensation)
+        self.reach = reach
+        self.intervals = intervals
+        self.exact = True
+        self.patched = False
+        self.sizes = [0] * count
+        for label in labels:
+            self.sizes[label] += 1
+
+    def __getstate__(self) -> dict:
+        # Se construye en el pool de procesos: el snapshot no viaja de vuelta,
+        # quien lo recibe le asigna el suyo (ver _build)
+        state = self.__dict__.copy()
+        state["graph"] = None
+        return state
+
+    @property
+    def mode(self) -> str:
+        return "bitset" if self.reach is not None else "intervals"
+
+    def component(self, node_id: int) -> Optional[int]:
+        i = self.graph.index.get(node_id)
+        return None if i is None else self.labels[i]
+
+    def check(self, src_id: int, dst_id: int) -> Optional[bool]:
+        """True / False si el índice lo sabe con certeza, None si no"""
+        cs, cd = self.component(src_id), self.component(dst_id)
+        if cs is None or cd is None:
+            return None
+        if self.reach is not None:
+            if (self.reach[cs] >> cd) & 1:
+                return True if self.exact else None
+            return False
+        if cs == cd:
+            return True if self.exact else None
+        for low, post in self.intervals:
+            if not (low[cs] <= low[cd] and post[cd] <= post[cs]):
+                return False
+        return None
+
+    def edge_inserted(self, u: int, v: int) -> bool:
+        """
+        Actualiza los bitsets: toda componente que alcanza a u alcanza ahora
+        lo que alcanza v. Retorna False si el índice no puede actualizarse.
+        """
+        cu, cv = self.component(u), self.component(v)
+        if cu is None or cv is None or self.reach is None:
+            return False
+        reach = self.reach
+        if (reach[cu] >> cv) & 1:
+            return True
+        self.patched = True
+        reach_v = reach[cv]
+        bit = 1 << cu
+        for c in range(self.count):
+            if reach[c] & bit:
+                reach[c] |= reach_v
+        return True
+
+def _condensation(graph: GraphSnapshot, labels: list[int], count: int) -> list:
+    condensation = [set() for _ in range(count)]
+    offsets, targets = graph.offsets, graph.targets
+    for u in range(graph.node_count):
+        cu = labels[u]
+        for k in range(offsets[u], offsets[u + 1]):
+            cv = labels[targets[k]]
+            if cu != cv:
+                condensation[cu].add(cv)
+    return condensation
+
+def _topological_order(condensation: list) -> list[int]:
+    """Orden topológico del DAG condensado (Kahn)"""
+    indegree = [0] * len(condensation)
+    for successors in condensation:
+        for d in successors:
+            indegree[d] += 1
+    order = [c for c, degree in enumerate(indegree) if degree == 0]
+    for c in order:
+        for d in condensation[c]:
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                order.append(d)
+    return order
+
+def _interval_labels(condensation: list, order: list[int], rng: random.Random) -> tuple[list, list]:
+    """
+    Un etiquetado por intervalos [low, post]: post-orden de un DFS con los
+    hijos en orden aleatorio; low es el menor post-orden del subgrafo alcanzado
+    """
+    count = len(condensation)
+    visited = bytearray(count)
+    post = [0] * count
+    low = [count] * count
+    counter = 0
+
+    def shuffled(c: int):
+        children = list(condensation[c])
+        rng.shuffle(children)
+        return iter(children)
+
+    roots = order[:]
+    rng.shuffle(roots)
+    for root in roots:
+        if visited[root]:
+            continue
+        visited[root] = 1
+        stack = [(root, shuffled(root))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is not None:
+                if not visited[child]:
+                    visited[child] = 1
+                    stack.append((child, shuffled(child)))
+                elif low[child] < low[node]:
+                    low[node] = low[child]
+                continue
+            stack.pop()
+            post[node] = counter
+            low[node] = min(low[node], counter)
+            counter += 1
+            if stack and low[node] < low[stack[-1][0]]:
+                low[stack[-1][0]] = low[node]
+    return low, post
+
+def build_index(graph: GraphSnapshot) -> ReachIndex:
+    count, labels = strongly_connected_components(graph)
+    condensation = _condensation(graph, labels, count)
+    order = _topological_order(condensation)
+
+    reach = None
+    intervals = None
+    if count <= REACH_BITSET_MAX_COMPONENTS:
+        # Las componentes sin sucesores primero: su bitset ya está completo
+        reach = [0] * count
+        for c in reversed(order):
+            bits = 1 << c
+            for d in condensation[c]:
+                bits |= reach[d]
+            reach[c] = bits
+    else:
+        rng = random.Random(graph.version)
+        intervals = [_interval_labels(condensation, order, rng) for _ in range(REACH_INTERVAL_LABELS)]
+
+    return ReachIndex(graph, count, labels, condensation, reach, intervals)
+
+# ========== ÍNDICE DEL PROCESO ==========
+
+_index_lock = Lock()
+_index: Optional[ReachIndex] = None
+_builds = SingleFlight()
+_refreshing = False
+
+def _publish(index: ReachIndex) -> None:
+    global _index
+    with _index_lock:
+        if _index is None or index.version >= _index.version:
+            _index = index
+
+def _build(graph: GraphSnapshot) -> ReachIndex:
+    """build_index en el pool de procesos (no retiene el GIL del worker); bloquea"""
+    # Import local para evitar import circular (jobs -> search -> contraction)
+    from app.jobs import run_in_pool
+    index = run_in_pool(build_index, graph)
+    index.graph = graph
+    return index
+
+def _refresh(graph: GraphSnapshot) -> None:
+    """Reconstruye en segundo plano un índice que dejó de ser exacto"""
+    global _refreshing
+    started = time.perf_counter()
+    try:
+        _publish(_build(graph))
+        logger.info(
+            "Índice de alcanzabilidad versión %s listo en %.2fs", graph.version, time.perf_counter() - started
+        )
+    except Exception as e:
+        logger.error("Error construyendo el índice de alcanzabilidad (versión %s): %s", graph.version, e)
+    finally:
+        _refreshing = False
+
+async def get_index(graph: GraphSnapshot) -> ReachIndex:
+    """
+    Retorna un índice válido para el snapshot. Si el vigente quedó atrás se
+    reconstruye (fuera del event loop, una sola vez por versión); si solo
+    dejó de ser exacto o le faltan nodos creados después se sigue usando y
+    se renueva en segundo plano.
+    """
+    global _refreshing
+    index = _index
+    if index is not None and index.version >= graph.version:
+        stale = not index.exact or index.graph.node_count != graph.node_count
+        if stale and not _refreshing and graph.version == index.version:
+            with _index_lock:
+                if not _refreshing:
+                    _refreshing = True
+                    Thread(target=_refresh, args=(graph,), daemon=True).start()
+        return index
+
+    async def build() -> ReachIndex:
+        index = await run_in_threadpool(_build, graph)
+        _publish(index)
+        return index
+
+    return await _builds.do(graph.version, build)
+
+async def get_current_index(graph: GraphSnapshot) -> ReachIndex:
+    """
+    Como get_index, pero construye uno nuevo si el vigente fue actualizado o
+    se construyó con otro snapshot (p. ej. antes de crear un nodo, que no
+    envía cambios de aristas)
+    """
+    index = await get_index(graph)
+    if index.exact and not index.patched and index.graph.version == graph.version:
+        return index
+    index = await run_in_threadpool(_build, graph)
+    _publish(index)
+    return index
+
+def apply(version: int, changes: list) -> None:
+    """
+    Lleva el índice a la versión producida por una mutación:
+    - inserción: se actualizan los bitsets (en modo intervalos se descarta)
+    - eliminación: el índice sigue sirviendo para los "no" y deja de ser exacto
+    """
+    global _index
+    with _index_lock:
+        index = _index
+        if index is None or index.version != version - 1:
+            return
+        for change in changes:
+            kind = change[0]
+            if kind == "insert":
+                if not index.edge_inserted(change[1], change[2]):
+                    _index = None
+                    return
+            elif kind in ("delete", "delete_node"):
+                index.exact = False
+        index.version = version
+
+async def notify(version: int, changes: list) -> None:
+    if _index is not None:
+        await run_in_threadpool(apply, version, changes)
+
+def summary(index: ReachIndex) -> dict:
+    sizes = sorted(index.sizes, reverse=True)
+    return {
+        "version": index.version,
+        "nodes": index.graph.node_count,
+        "components": index.count,
+        "largest": sizes[0] if sizes else 0,
+        "singletons": sum(1 for size in sizes if size == 1),
+        "top_sizes": sizes[:10],
+        "condensation_edges": index.condensation_edges,
+        "mode": index.mode,
+        "exact": index.exact,
+    }
@@ -0,0 +1,25 @@
+from fastapi import Response
+from typing import Any, Iterable
+import orjson
+
+# Serialización directa con orjson para los listados y recorridos grandes:
+# se arman dicts/listas simples y se omite la validación del response_model.
+# - rows: una lista de objetos (formato histórico, por defecto)
+# - columnar: un objeto con una lista paralela por campo
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+def json_bytes_response(body: bytes, status_code: int = 200) -> Response:
+    """Respuesta con un cuerpo ya serializado (p. ej. en el threadpool)"""
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+def columnar(rows: Iterable[tuple], columns: tuple[str, ...]) -> dict[str, list]:
+    """Convierte filas (tuplas) en listas paralelas, una por columna"""
+    rows = list(rows)
+    if not rows:
+        return {column: [] for column in columns}
+    return {column: list(values) for column, values in zip(columns, zip(*rows))}
+
+def rows_payload(rows: Iterable[tuple], columns: tuple[str, ...]) -> list[dict]:
+    return [dict(zip(columns, row)) for row in rows]
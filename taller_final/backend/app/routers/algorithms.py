@@ -1,167 +1,489 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
-from app.db import get_session
-from app.models import Node, Edge, User
-from app.schemas import BFSResult, BFSTreeNode, ShortestPathOut
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
+from app.graph_cache import GraphSnapshot, get_graph
+from app.http_cache import check_graph_etag, graph_etag, set_cache_headers
+from app.schemas import (
+    BFSResult, BFSColumnarOut, ShortestPathOut, DistanceMatrixIn, DistanceMatrixOut,
+    ReachableOut, ComponentsOut, UserOut, WithinOut, NearestOut, ReachedColumnarOut
+)
 from app.deps import get_current_user
-from collections import deque
-import heapq
+from app.path_cache import cached_shortest_path, path_cache
+from app.dynamic_sssp import hot_sources
+from app import reachability
+from app.search import ENGINES, bfs, bounded_dijkstra, build_path, is_reachable, single_source, tree_path
+from app import scipy_backend
+from app.responses import columnar, dumps, json_bytes_response, rows_payload
+from app.metrics import span
+from app.admission import admission, admitted_stream, graph_cost, run_admitted
+from typing import Literal, Optional, Union
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Máximo de celdas (orígenes x destinos) aceptadas por /graph/distance-matrix
+DISTANCE_MATRIX_MAX_CELLS = int(os.getenv("DISTANCE_MATRIX_MAX_CELLS", "10000"))
+# Máximo k aceptado por /graph/nearest
+NEAREST_MAX_K = int(os.getenv("NEAREST_MAX_K", "10000"))
 
 router = APIRouter(prefix="/graph", tags=["algorithms"])
 
-@router.get("/bfs", response_model=BFSResult)
-def run_bfs(
+BFS_COLUMNS = ("node_id", "parent_id", "depth")
+REACHED_COLUMNS = ("node_id", "distance", "parent_id")
+
+@router.get("/bfs", response_model=Union[BFSResult, BFSColumnarOut])
+async def run_bfs(
+    request: Request,
     start_id: int = Query(..., description="ID del nodo inicial"),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    max_depth: Optional[int] = Query(None, ge=0, description="Profundidad máxima a explorar"),
+    limit: Optional[int] = Query(None, ge=1, description="Máximo de nodos a visitar"),
+    stream: bool = Query(False, description="Emitir el árbol como NDJSON a medida que se recorre"),
+    result_format: Literal["rows", "columnar"] = Query(
+        "rows", alias="format", description="rows: order + tree; columnar: listas paralelas"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """
     Ejecuta BFS desde un nodo inicial
     Retorna el orden de visita y el árbol BFS
+    - max_depth / limit detienen el recorrido antes
+    - stream=true responde application/x-ndjson (una entrada del árbol por línea)
+    - format=columnar responde {node_id: [...], parent_id: [...], depth: [...]}
+    - ETag según la versión del grafo y los parámetros (If-None-Match -> 304)
+    - Peticiones idénticas concurrentes comparten el recorrido; con el
+      servidor saturado responde 429/503 con Retry-After
     """
-    # Verificar que el nodo existe
-    statement = select(Node).where(Node.id == start_id)
-    start_node = session.exec(statement).first()
+    # El cliente ya tiene el resultado de esta versión: 304 sin recorrer
+    _, cached = await check_graph_etag(request, session)
+    if cached is not None:
+        return cached
     
-    if not start_node:
+    # Obtener el grafo desde la caché (solo consulta la BD si cambió)
+    graph = await get_graph(session)
+    etag = graph_etag(request, graph.version)
+    
+    # Verificar que el nodo existe
+    if not graph.has_node(start_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Nodo con id {start_id} no encontrado"
         )
     
-    # Obtener todas las aristas para construir el grafo
-    statement_edges = select(Edge)
-    edges = session.exec(statement_edges).all()
-    
-    # Construir grafo de adyacencia
-    graph = {}
-    statement_nodes = select(Node)
-    all_nodes = session.exec(statement_nodes).all()
-    
-    for node in all_nodes:
-        graph[node.id] = []
-    
-    for edge in edges:
-        graph[edge.src_id].append(edge.dst_id)
-    
-    # Ejecutar BFS
-    visited = set()
-    queue = deque([start_id])
-    visited.add(start_id)
-    
-    order = []
-    parent = {start_id: None}
-    depth = {start_id: 0}
-    
-    while queue:
-        current = queue.popleft()
-        order.append(current)
-        
-        for neighbor in graph.get(current, []):
-            if neighbor not in visited:
-                visited.add(neighbor)
-                queue.append(neighbor)
-                parent[neighbor] = current
-                depth[neighbor] = depth[current] + 1
-    
-    # Construir árbol BFS
-    tree = []
-    for node_id in order:
-        tree.append(BFSTreeNode(
-            node_id=node_id,
-            parent_id=parent[node_id],
-            depth=depth[node_id]
-        ))
-    
-    return BFSResult(order=order, tree=tree)
+    # Un recorrido acotado cuesta una unidad; uno completo, según el grafo
+    cost = 1 if max_depth is not None or limit is not None else graph_cost(graph)
+    
+    if stream:
+        entries = bfs(graph, start_id, max_depth=max_depth, limit=limit)
+        response = await admitted_stream(
+            current_user.username, cost, _ndjson_tree(entries), "application/x-ndjson"
+        )
+        return set_cache_headers(response, etag)
+    
+    # Recorrer y serializar fuera del event loop, sin un modelo por nodo
+    # (el recorrido es perezoso: la etapa incluye la serialización)
+    as_columns = result_format == "columnar"
+    with span("search"):
+        body = await run_admitted(
+            ("bfs", graph.version, start_id, max_depth, limit, as_columns), current_user.username, cost,
+            lambda: run_in_threadpool(
+                _bfs_body, bfs(graph, start_id, max_depth=max_depth, limit=limit), as_columns
+            )
+        )
+    return set_cache_headers(json_bytes_response(body), etag)
+
+def _bfs_body(entries, as_columns: bool) -> bytes:
+    """Serializa el resultado del BFS (mismo esquema que BFSResult / BFSColumnarOut)"""
+    if as_columns:
+        return dumps(columnar(entries, BFS_COLUMNS))
+    
+    tree = rows_payload(entries, BFS_COLUMNS)
+    return dumps({"order": [entry["node_id"] for entry in tree], "tree": tree})
+
+def _ndjson_tree(entries, chunk_size: int = 1024):
+    """Serializa las entradas del árbol BFS como NDJSON en bloques"""
+    lines = []
+    for entry in entries:
+        lines.append(dumps(dict(zip(BFS_COLUMNS, entry))))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
 
 @router.get("/shortest-path", response_model=ShortestPathOut)
-def run_shortest_path(
+async def run_shortest_path(
+    request: Request,
     src_id: int = Query(..., description="ID del nodo origen"),
     dst_id: int = Query(..., description="ID del nodo destino"),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    algorithm: Literal["auto", "dijkstra", "bidirectional", "astar", "ch", "scipy"] = Query(
+        "auto", description="Motor de búsqueda (auto elige según el grafo)"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """
-    Ejecuta algoritmo de Dijkstra para encontrar el camino más corto
-    entre dos nodos
+    Encuentra el camino más corto entre dos nodos
+    - dijkstra: Dijkstra unidireccional
+    - bidirectional: Dijkstra bidireccional
+    - astar: A* con heurística geodésica (requiere coordenadas)
+    - ch: contraction hierarchies (si el índice está al día)
+    - scipy: csgraph.dijkstra (requiere numpy/scipy)
+    - auto usa la caché de resultados por versión del grafo; los motores
+      explícitos siempre recalculan. Si src_id es un origen caliente se lee
+      de su árbol, que se repara en cada mutación
+    - ETag según la versión del grafo y los parámetros (If-None-Match -> 304)
+    - Peticiones idénticas concurrentes comparten la búsqueda; con el
+      servidor saturado responde 429/503 con Retry-After
     """
-    # Verificar que ambos nodos existen
-    statement_src = select(Node).where(Node.id == src_id)
-    src_node = session.exec(statement_src).first()
+    # El cliente ya tiene el resultado de esta versión: 304 sin recalcular
+    _, cached = await check_graph_etag(request, session)
+    if cached is not None:
+        return cached
     
-    statement_dst = select(Node).where(Node.id == dst_id)
-    dst_node = session.exec(statement_dst).first()
+    # Obtener el grafo desde la caché (solo consulta la BD si cambió)
+    graph = await get_graph(session)
     
-    if not src_node:
+    # Verificar que ambos nodos existen
+    if not graph.has_node(src_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Nodo origen con id {src_id} no encontrado"
         )
     
-    if not dst_node:
+    if not graph.has_node(dst_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Nodo destino con id {dst_id} no encontrado"
         )
     
-    # Obtener todas las aristas
-    statement_edges = select(Edge)
-    edges = session.exec(statement_edges).all()
-    
-    # Construir grafo con pesos
-    graph = {}
-    statement_nodes = select(Node)
-    all_nodes = session.exec(statement_nodes).all()
-    
-    for node in all_nodes:
-        graph[node.id] = []
-    
-    for edge in edges:
-        graph[edge.src_id].append((edge.dst_id, edge.weight))
-    
-    # Ejecutar Dijkstra
-    distances = {node.id: float('inf') for node in all_nodes}
-    distances[src_id] = 0
-    previous = {node.id: None for node in all_nodes}
-    
-    # Priority queue: (distance, node_id)
-    pq = [(0, src_id)]
-    visited = set()
-    
-    while pq:
-        current_dist, current = heapq.heappop(pq)
-        
-        if current in visited:
-            continue
-        
-        visited.add(current)
-        
-        if current == dst_id:
-            break
-        
-        for neighbor, weight in graph.get(current, []):
-            distance = current_dist + weight
-            
-            if distance < distances[neighbor]:
-                distances[neighbor] = distance
-                previous[neighbor] = current
-                heapq.heappush(pq, (distance, neighbor))
+    # Rechazar en O(1) los pares sin camino (sin explorar el grafo)
+    with span("reach"):
+        index = await reachability.get_index(graph)
+    if index.check(src_id, dst_id) is False:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No existe camino entre el nodo {src_id} y {dst_id}"
+        )
+    
+    if algorithm != "auto" and algorithm not in ENGINES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El motor '{algorithm}' no está disponible en este servidor"
+        )
+    
+    with span("search"):
+        result = await run_admitted(
+            ("shortest-path", graph.version, src_id, dst_id, algorithm), current_user.username,
+            graph_cost(graph), lambda: _search(graph, src_id, dst_id, algorithm)
+        )
     
     # Verificar si existe camino
-    if distances[dst_id] == float('inf'):
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No existe camino entre el nodo {src_id} y {dst_id}"
         )
     
-    # Reconstruir camino
-    path = []
-    current = dst_id
-    while current is not None:
-        path.append(current)
-        current = previous[current]
+    path, distance = result
+    with span("serialize"):
+        body = dumps({"path": path, "distance": distance})
+    return set_cache_headers(json_bytes_response(body), graph_etag(request, graph.version))
+
+async def _search(graph: GraphSnapshot, src_id: int, dst_id: int, algorithm: str):
+    """Elige el motor de búsqueda y retorna (path, distance) o None"""
+    if algorithm == "auto":
+        # Los orígenes calientes se responden desde su árbol mantenido
+        hot, result = await run_in_threadpool(hot_sources.lookup, graph, src_id, dst_id)
+        if not hot:
+            result = await cached_shortest_path(graph, src_id, dst_id)
+        return result
+    return await run_in_threadpool(ENGINES[algorithm], graph, src_id, dst_id)
+
+@router.get("/within", response_model=Union[WithinOut, ReachedColumnarOut])
+async def run_within(
+    request: Request,
+    src_id: int = Query(..., description="ID del nodo origen"),
+    max_distance: float = Query(..., ge=0, description="Radio: distancia máxima desde el origen"),
+    result_format: Literal["rows", "columnar"] = Query(
+        "rows", alias="format", description="rows: lista de nodos; columnar: listas paralelas"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Nodos a distancia menor o igual que max_distance del origen (isócrona)
+    - Un Dijkstra que se detiene al pasar el radio
+    - Cada nodo trae su distancia y su predecesor en el camino más corto
+    - ETag según la versión del grafo y los parámetros (If-None-Match -> 304)
+    """
+    return await _bounded_search(
+        request, session, current_user, src_id, result_format,
+        {"src_id": src_id, "max_distance": max_distance}, max_distance=max_distance
+    )
+
+@router.get("/nearest", response_model=Union[NearestOut, ReachedColumnarOut])
+async def run_nearest(
+    request: Request,
+    src_id: int = Query(..., description="ID del nodo origen"),
+    k: int = Query(..., ge=1, le=NEAREST_MAX_K, description="Cantidad de nodos más cercanos"),
+    result_format: Literal["rows", "columnar"] = Query(
+        "rows", alias="format", description="rows: lista de nodos; columnar: listas paralelas"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Los k nodos más cercanos al origen (menos si no hay tantos alcanzables)
+    - Un Dijkstra que se detiene al asentar k nodos
+    - Cada nodo trae su distancia y su predecesor en el camino más corto
+    - ETag según la versión del grafo y los parámetros (If-None-Match -> 304)
+    """
+    return await _bounded_search(
+        request, session, current_user, src_id, result_format, {"src_id": src_id, "k": k}, k=k
+    )
+
+async def _bounded_search(
+    request: Request,
+    session: AsyncSession,
+    current_user: UserOut,
+    src_id: int,
+    result_format: str,
+    header: dict,
+    max_distance: Optional[float] = None,
+    k: Optional[int] = None,
+):
+    """Carga del grafo, validación y búsqueda acotada compartidas por /within y /nearest"""
+    _, cached = await check_graph_etag(request, session)
+    if cached is not None:
+        return cached
+    
+    graph = await get_graph(session)
+    
+    if not graph.has_node(src_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nodo origen con id {src_id} no encontrado"
+        )
+    
+    # Un radio puede cubrir todo el grafo; k acota la búsqueda a k nodos
+    cost = graph_cost(graph) if k is None else 1
+    as_columns = result_format == "columnar"
+    key = ("bounded", graph.version, src_id, max_distance, k, as_columns)
+    with span("search"):
+        body = await run_admitted(
+            key, current_user.username, cost,
+            lambda: run_in_threadpool(
+                _bounded_body, graph, graph.index[src_id], max_distance, k, as_columns, header
+            )
+        )
+    return set_cache_headers(json_bytes_response(body), graph_etag(request, graph.version))
+
+def _bounded_body(
+    graph: GraphSnapshot, src: int, max_distance: Optional[float], k: Optional[int],
+    as_columns: bool, header: dict
+) -> bytes:
+    """Serializa el resultado de /within o /nearest (WithinOut / NearestOut / ReachedColumnarOut)"""
+    reached = bounded_dijkstra(graph, src, max_distance=max_distance, k=k)
+    if as_columns:
+        return dumps(columnar(reached, REACHED_COLUMNS))
+    return dumps({**header, "nodes": rows_payload(reached, REACHED_COLUMNS)})
+
+@router.get("/reachable", response_model=ReachableOut)
+async def run_reachable(
+    src_id: int = Query(..., description="ID del nodo origen"),
+    dst_id: int = Query(..., description="ID del nodo destino"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Indica si existe un camino de src_id a dst_id
+    - Se responde desde el índice de componentes; si el índice no puede
+      asegurarlo, con un BFS que se detiene al encontrar el destino
+    """
+    graph = await get_graph(session)
+    
+    for node_id in (src_id, dst_id):
+        if not graph.has_node(node_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nodo con id {node_id} no encontrado"
+            )
+    
+    index = await reachability.get_index(graph)
+    reachable = index.check(src_id, dst_id)
+    if reachable is not None:
+        return ReachableOut(src_id=src_id, dst_id=dst_id, reachable=reachable, method="index")
+    
+    reachable = await run_in_threadpool(is_reachable, graph, src_id, dst_id)
+    return ReachableOut(src_id=src_id, dst_id=dst_id, reachable=reachable, method="search")
+
+@router.get("/components", response_model=ComponentsOut)
+async def run_components(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Resumen de las componentes fuertemente conexas del grafo
+    (requiere autenticación)
+    """
+    graph = await get_graph(session)
+    index = await reachability.get_current_index(graph)
+    return reachability.summary(index)
+
+@router.get("/cache-stats")
+async def cache_stats(current_user: UserOut = Depends(get_current_user)):
+    """
+    Métricas de la caché de caminos más cortos (requiere autenticación)
+    """
+    return path_cache.stats()
+
+@router.get("/admission-stats")
+async def admission_stats(current_user: UserOut = Depends(get_current_user)):
+    """
+    Cupo en uso, cola y rechazos del control de admisión de este worker
+    (requiere autenticación)
+    """
+    return admission.stats()
+
+@router.get("/hot-sources")
+async def list_hot_sources(current_user: UserOut = Depends(get_current_user)):
+    """
+    Orígenes calientes de este worker y estado de sus árboles (requiere autenticación)
+    """
+    return hot_sources.stats()
+
+@router.post("/hot-sources/{node_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def register_hot_source(
+    node_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Registra un origen caliente en este worker (requiere autenticación)
+    - Para todos los workers usar la variable HOT_SOURCES
+    """
+    graph = await get_graph(session)
+    if not graph.has_node(node_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nodo con id {node_id} no encontrado"
+        )
+    hot_sources.register(node_id)
+    return None
+
+@router.delete("/hot-sources/{node_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def unregister_hot_source(
+    node_id: int,
+    current_user: UserOut = Depends(get_current_user)
+):
+    """Quita un origen caliente de este worker (requiere autenticación)"""
+    if not hot_sources.unregister(node_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"El nodo {node_id} no es un origen caliente"
+        )
+    return None
+
+@router.post("/distance-matrix", response_model=DistanceMatrixOut)
+async def run_distance_matrix(
+    matrix_in: DistanceMatrixIn,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Calcula la matriz de distancias entre varios orígenes y destinos
+    - Una búsqueda de Dijkstra por cada origen distinto
+    - Cada búsqueda se detiene al asentar todos los destinos
+    - null indica que no existe camino
+    - Cuesta una unidad del presupuesto por origen distinto (según el grafo)
+      y lotes idénticos concurrentes se calculan una vez
+    """
+    cells = len(matrix_in.sources) * len(matrix_in.targets)
+    if cells > DISTANCE_MATRIX_MAX_CELLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La matriz excede el máximo de {DISTANCE_MATRIX_MAX_CELLS} celdas"
+        )
+    
+    # Un único snapshot del grafo para todo el lote
+    graph = await get_graph(session)
+    
+    # Verificar que todos los nodos existen
+    missing = sorted({
+        node_id for node_id in matrix_in.sources + matrix_in.targets
+        if not graph.has_node(node_id)
+    })
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nodos con ids {missing} no encontrados"
+        )
+    
+    index = await reachability.get_index(graph)
     
-    path.reverse()
+    # Las búsquedas son CPU: se ejecutan fuera del event loop
+    key = (
+        "distance-matrix", graph.version, tuple(matrix_in.sources), tuple(matrix_in.targets),
+        matrix_in.include_paths,
+    )
+    return await run_admitted(
+        key, current_user.username, graph_cost(graph, len(set(matrix_in.sources))),
+        lambda: run_in_threadpool(_distance_matrix, graph, matrix_in, index)
+    )
+
+def _distance_matrix(
+    graph: GraphSnapshot, matrix_in: DistanceMatrixIn, index: reachability.ReachIndex
+) -> DistanceMatrixOut:
+    """
+    Ejecuta una búsqueda por origen distinto y arma la matriz. Los destinos
+    inalcanzables según el índice no se esperan: sin ellos la búsqueda se
+    detiene sin recorrer todo lo alcanzable.
+    """
+    sources = list(dict.fromkeys(matrix_in.sources))
+    targets = [graph.index[dst_id] for dst_id in matrix_in.targets]
     
-    return ShortestPathOut(path=path, distance=distances[dst_id])
\ No newline at end of file
+    rows = {}
+    if scipy_backend.SCIPY_ENABLED:
+        # Todas las búsquedas en una sola llamada a csgraph
+        all_distances, all_parents = scipy_backend.shortest_path_trees(
+            graph, [graph.index[src_id] for src_id in sources]
+        )
+        for src_id, distances, parent in zip(sources, all_distances, all_parents):
+            results = [tree_path(graph, distances, parent, dst) for dst in targets]
+            rows[src_id] = _matrix_row(results, matrix_in.include_paths)
+    else:
+        for src_id in sources:
+            target_indexes = {
+                graph.index[dst_id] for dst_id in matrix_in.targets
+                if index.check(src_id, dst_id) is not False
+            }
+            if not target_indexes:
+                rows[src_id] = _matrix_row([None] * len(targets), matrix_in.include_paths)
+                continue
+            distances, previous = single_source(graph, graph.index[src_id], target_indexes)
+            results = [
+                (build_path(graph, previous, dst), distances[dst]) if dst in distances else None
+                for dst in targets
+            ]
+            rows[src_id] = _matrix_row(results, matrix_in.include_paths)
+    
+    return DistanceMatrixOut(
+        sources=matrix_in.sources,
+        targets=matrix_in.targets,
+        distances=[rows[src_id][0] for src_id in matrix_in.sources],
+        paths=[rows[src_id][1] for src_id in matrix_in.sources] if matrix_in.include_paths else None,
+    )
+
+def _matrix_row(results: list, include_paths: bool) -> tuple[list, list]:
+    """Fila de distancias (y de caminos si se piden) a partir de los resultados"""
+    row = [None if result is None else result[1] for result in results]
+    path_row = []
+    if include_paths:
+        path_row = [
+            None if result is None else ShortestPathOut(path=result[0], distance=result[1])
+            for result in results
+        ]
+    return row, path_row
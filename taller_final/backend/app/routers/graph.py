@@ -1,24 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from app.db import get_session
-from app.models import Node, Edge, User
-from app.schemas import NodeIn, NodeOut, EdgeIn, EdgeOut
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import async_engine, get_async_session, insert_rows
+from app.models import Node, Edge
+from app.schemas import (
+    NodeIn, NodeOut, EdgeIn, EdgeOut, NodesColumnarOut, EdgesColumnarOut,
+    BulkIn, BulkOut, BulkItemError, NodesBulkOut, UserOut
+)
 from app.deps import get_current_user
+from app.graph_cache import bump_graph_version, forget_graph_version
+from app.http_cache import check_graph_etag, set_cache_headers
+from app.dynamic_sssp import hot_sources
+from app import reachability
+from app.responses import columnar, dumps, json_bytes_response, rows_payload
+from app.metrics import span
+from datetime import datetime
+from typing import Literal, Optional, Union
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 router = APIRouter(prefix="/graph", tags=["graph"])
 
+# Máximo de items aceptados por /graph/nodes:bulk y /graph/edges:bulk
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+# Paginación por cursor de /graph/nodes y /graph/edges: filas por página
+# por defecto y máximo aceptado en limit
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "1000"))
+LIST_PAGE_MAX = int(os.getenv("LIST_PAGE_MAX", "10000"))
+# Filas leídas por vuelta del cursor del servidor en la exportación (stream=true)
+LIST_STREAM_CHUNK = int(os.getenv("LIST_STREAM_CHUNK", "1000"))
+
 # ========== NODOS ==========
 
 @router.post("/nodes", response_model=NodeOut, status_code=status.HTTP_201_CREATED)
-def create_node(
+async def create_node(
     node_in: NodeIn,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """Crear un nuevo nodo (requiere autenticación)"""
     # Verificar si ya existe un nodo con ese nombre
     statement = select(Node).where(Node.name == node_in.name)
-    existing_node = session.exec(statement).first()
+    existing_node = (await session.exec(statement)).first()
     
     if existing_node:
         raise HTTPException(
@@ -27,33 +58,110 @@ def create_node(
         )
     
     # Crear nuevo nodo
-    new_node = Node(name=node_in.name)
+    new_node = Node(name=node_in.name, lat=node_in.lat, lon=node_in.lon)
     session.add(new_node)
-    session.commit()
-    session.refresh(new_node)
+    version = await session.run_sync(bump_graph_version)
+    await session.commit()
+    await session.refresh(new_node)
+    await _notify(version, [])
     
     return new_node
 
-@router.get("/nodes", response_model=list[NodeOut])
-def list_nodes(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+@router.post("/nodes:bulk", response_model=NodesBulkOut, status_code=status.HTTP_201_CREATED)
+async def create_nodes_bulk(
+    bulk_in: BulkIn,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Crear muchos nodos en una sola transacción (requiere autenticación)
+    - Los items inválidos o con nombre repetido se reportan en errors
+    - Los demás se insertan con INSERT de múltiples filas
+    """
+    _check_bulk_size(bulk_in)
+    errors = []
+    valid = []
+    for i, item in enumerate(bulk_in.items):
+        try:
+            valid.append((i, NodeIn.model_validate(item)))
+        except ValidationError as e:
+            errors.append(BulkItemError(index=i, detail=_validation_detail(e)))
+    
+    # Verificar con una sola consulta qué nombres ya existen
+    names = [node_in.name for _, node_in in valid]
+    existing = set((await session.exec(select(Node.name).where(Node.name.in_(names)))).all()) if names else set()
+    
+    rows = []
+    seen = set()
+    now = datetime.utcnow()
+    for i, node_in in valid:
+        if node_in.name in existing or node_in.name in seen:
+            errors.append(BulkItemError(
+                index=i, detail=f"Ya existe un nodo con el nombre '{node_in.name}'"
+            ))
+            continue
+        seen.add(node_in.name)
+        rows.append({"name": node_in.name, "lat": node_in.lat, "lon": node_in.lon, "created_at": now})
+    
+    nodes = []
+    if rows:
+        await session.run_sync(insert_rows, Node, rows)
+        version = await session.run_sync(bump_graph_version)
+        await _commit_bulk(session)
+        await _notify(version, [])
+        statement = select(Node.id, Node.name, Node.lat, Node.lon).where(Node.name.in_(seen)).order_by(Node.id)
+        nodes = [
+            NodeOut(id=node_id, name=name, lat=lat, lon=lon)
+            for node_id, name, lat, lon in (await session.exec(statement)).all()
+        ]
+    
+    errors.sort(key=lambda error: error.index)
+    return NodesBulkOut(created=len(rows), errors=errors, nodes=nodes)
+
+@router.get("/nodes", response_model=Union[list[NodeOut], NodesColumnarOut])
+async def list_nodes(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: retornar nodos con id mayor a este"),
+    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX, description="Nodos por página"),
+    stream: bool = Query(False, description="Exportar todos los nodos como NDJSON"),
+    result_format: Literal["rows", "columnar"] = Query(
+        "rows", alias="format", description="rows: lista de nodos; columnar: listas paralelas"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
-    """Listar todos los nodos (requiere autenticación)"""
-    statement = select(Node)
-    nodes = session.exec(statement).all()
-    return nodes
+    """
+    Listar los nodos por páginas, ordenados por id (requiere autenticación)
+    - after_id / limit: paginación por cursor; si la página quedó llena, el
+      header X-Next-After-Id trae el cursor de la siguiente
+    - stream=true exporta todos los nodos desde after_id como NDJSON (ignora limit)
+    - format=columnar responde {id: [...], name: [...], lat: [...], lon: [...]}
+    - ETag según la versión del grafo y la consulta (If-None-Match -> 304)
+    """
+    statement = select(Node.id, Node.name, Node.lat, Node.lon)
+    
+    # Sin cambios en el grafo desde la copia del cliente: 304 sin consultar
+    etag, cached = await check_graph_etag(request, session)
+    if cached is not None:
+        return cached
+    
+    if stream:
+        return set_cache_headers(_export_response(_keyset(statement, Node.id, after_id), NODE_COLUMNS), etag)
+    
+    page_size = limit or LIST_PAGE_SIZE
+    rows = (await session.exec(_keyset(statement, Node.id, after_id).limit(page_size))).all()
+    return set_cache_headers(await _listing_response(rows, NODE_COLUMNS, result_format, page_size), etag)
 
 @router.delete("/nodes/{node_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_node(
+async def delete_node(
     node_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """Eliminar un nodo y sus aristas asociadas (requiere autenticación)"""
     # Buscar el nodo
     statement = select(Node).where(Node.id == node_id)
-    node = session.exec(statement).first()
+    node = (await session.exec(statement)).first()
     
     if not node:
         raise HTTPException(
@@ -65,31 +173,33 @@ def delete_node(
     statement_edges = select(Edge).where(
         (Edge.src_id == node_id) | (Edge.dst_id == node_id)
     )
-    edges = session.exec(statement_edges).all()
+    edges = (await session.exec(statement_edges)).all()
     for edge in edges:
-        session.delete(edge)
+        await session.delete(edge)
     
     # Eliminar el nodo
-    session.delete(node)
-    session.commit()
+    await session.delete(node)
+    version = await session.run_sync(bump_graph_version)
+    await session.commit()
+    await _notify(version, [("delete_node", node_id)])
     
     return None
 
 # ========== ARISTAS ==========
 
 @router.post("/edges", response_model=EdgeOut, status_code=status.HTTP_201_CREATED)
-def create_edge(
+async def create_edge(
     edge_in: EdgeIn,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """Crear una nueva arista (requiere autenticación)"""
     # Verificar que los nodos existen
     statement_src = select(Node).where(Node.id == edge_in.src_id)
-    src_node = session.exec(statement_src).first()
+    src_node = (await session.exec(statement_src)).first()
     
     statement_dst = select(Node).where(Node.id == edge_in.dst_id)
-    dst_node = session.exec(statement_dst).first()
+    dst_node = (await session.exec(statement_dst)).first()
     
     if not src_node:
         raise HTTPException(
@@ -110,6 +220,17 @@ def create_edge(
             detail="El peso debe ser mayor que 0"
         )
     
+    # Verificar que no exista ya una arista entre los mismos nodos
+    statement_dup = select(Edge.id).where(
+        Edge.src_id == edge_in.src_id,
+        Edge.dst_id == edge_in.dst_id
+    )
+    if (await session.exec(statement_dup)).first() is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ya existe una arista de {edge_in.src_id} a {edge_in.dst_id}"
+        )
+    
     # Crear nueva arista
     new_edge = Edge(
         src_id=edge_in.src_id,
@@ -117,30 +238,126 @@ def create_edge(
         weight=edge_in.weight
     )
     session.add(new_edge)
-    session.commit()
-    session.refresh(new_edge)
+    version = await session.run_sync(bump_graph_version)
+    await session.commit()
+    await session.refresh(new_edge)
+    await _notify(version, [("insert", new_edge.src_id, new_edge.dst_id, new_edge.weight)])
     
     return new_edge
 
-@router.get("/edges", response_model=list[EdgeOut])
-def list_edges(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+@router.post("/edges:bulk", response_model=BulkOut, status_code=status.HTTP_201_CREATED)
+async def create_edges_bulk(
+    bulk_in: BulkIn,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
-    """Listar todas las aristas (requiere autenticación)"""
-    statement = select(Edge)
-    edges = session.exec(statement).all()
-    return edges
+    """
+    Crear muchas aristas en una sola transacción (requiere autenticación)
+    - La existencia de los nodos se verifica con una sola consulta
+    - Los items inválidos se reportan en errors
+    """
+    _check_bulk_size(bulk_in)
+    errors = []
+    valid = []
+    for i, item in enumerate(bulk_in.items):
+        try:
+            valid.append((i, EdgeIn.model_validate(item)))
+        except ValidationError as e:
+            errors.append(BulkItemError(index=i, detail=_validation_detail(e)))
+    
+    # Verificar con una sola consulta qué nodos existen
+    node_ids = {edge_in.src_id for _, edge_in in valid} | {edge_in.dst_id for _, edge_in in valid}
+    existing = set((await session.exec(select(Node.id).where(Node.id.in_(node_ids)))).all()) if node_ids else set()
+    
+    # Verificar con una sola consulta qué pares (origen, destino) ya existen
+    pairs = {(edge_in.src_id, edge_in.dst_id) for _, edge_in in valid}
+    existing_pairs = set()
+    if pairs:
+        statement = select(Edge.src_id, Edge.dst_id).where(tuple_(Edge.src_id, Edge.dst_id).in_(pairs))
+        existing_pairs = set((await session.exec(statement)).all())
+    
+    rows = []
+    now = datetime.utcnow()
+    for i, edge_in in valid:
+        pair = (edge_in.src_id, edge_in.dst_id)
+        if edge_in.src_id not in existing:
+            errors.append(BulkItemError(index=i, detail=f"Nodo origen con id {edge_in.src_id} no existe"))
+        elif edge_in.dst_id not in existing:
+            errors.append(BulkItemError(index=i, detail=f"Nodo destino con id {edge_in.dst_id} no existe"))
+        elif pair in existing_pairs:
+            errors.append(BulkItemError(
+                index=i, detail=f"Ya existe una arista de {edge_in.src_id} a {edge_in.dst_id}"
+            ))
+        else:
+            existing_pairs.add(pair)
+            rows.append({
+                "src_id": edge_in.src_id,
+                "dst_id": edge_in.dst_id,
+                "weight": edge_in.weight,
+                "created_at": now,
+            })
+    
+    if rows:
+        await session.run_sync(insert_rows, Edge, rows)
+        version = await session.run_sync(bump_graph_version)
+        await _commit_bulk(session)
+        await _notify(
+            version, [("insert", row["src_id"], row["dst_id"], row["weight"]) for row in rows]
+        )
+    
+    errors.sort(key=lambda error: error.index)
+    return BulkOut(created=len(rows), errors=errors)
+
+@router.get("/edges", response_model=Union[list[EdgeOut], EdgesColumnarOut])
+async def list_edges(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: retornar aristas con id mayor a este"),
+    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX, description="Aristas por página"),
+    src_id: Optional[int] = Query(None, description="Solo aristas que salen de este nodo"),
+    dst_id: Optional[int] = Query(None, description="Solo aristas que llegan a este nodo"),
+    stream: bool = Query(False, description="Exportar todas las aristas como NDJSON"),
+    result_format: Literal["rows", "columnar"] = Query(
+        "rows", alias="format", description="rows: lista de aristas; columnar: listas paralelas"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Listar las aristas por páginas, ordenadas por id (requiere autenticación)
+    - after_id / limit: paginación por cursor; si la página quedó llena, el
+      header X-Next-After-Id trae el cursor de la siguiente
+    - src_id / dst_id filtran por nodo origen / destino
+    - stream=true exporta todas las aristas desde after_id como NDJSON (ignora limit)
+    - format=columnar responde {id: [...], src_id: [...], dst_id: [...], weight: [...]}
+    - ETag según la versión del grafo y la consulta (If-None-Match -> 304)
+    """
+    statement = select(Edge.id, Edge.src_id, Edge.dst_id, Edge.weight)
+    if src_id is not None:
+        statement = statement.where(Edge.src_id == src_id)
+    if dst_id is not None:
+        statement = statement.where(Edge.dst_id == dst_id)
+    
+    # Sin cambios en el grafo desde la copia del cliente: 304 sin consultar
+    etag, cached = await check_graph_etag(request, session)
+    if cached is not None:
+        return cached
+    
+    if stream:
+        return set_cache_headers(_export_response(_keyset(statement, Edge.id, after_id), EDGE_COLUMNS), etag)
+    
+    page_size = limit or LIST_PAGE_SIZE
+    rows = (await session.exec(_keyset(statement, Edge.id, after_id).limit(page_size))).all()
+    return set_cache_headers(await _listing_response(rows, EDGE_COLUMNS, result_format, page_size), etag)
 
 @router.delete("/edges/{edge_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_edge(
+async def delete_edge(
     edge_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
 ):
     """Eliminar una arista (requiere autenticación)"""
     statement = select(Edge).where(Edge.id == edge_id)
-    edge = session.exec(statement).first()
+    edge = (await session.exec(statement)).first()
     
     if not edge:
         raise HTTPException(
@@ -148,7 +365,92 @@ def delete_edge(
             detail=f"Arista con id {edge_id} no encontrada"
         )
     
-    session.delete(edge)
-    session.commit()
+    src_id, dst_id = edge.src_id, edge.dst_id
+    await session.delete(edge)
+    version = await session.run_sync(bump_graph_version)
+    await session.commit()
+    await _notify(version, [("delete", src_id, dst_id)])
     
-    return None
\ No newline at end of file
+    return None
+
+# ========== LISTADOS ==========
+
+NODE_COLUMNS = ("id", "name", "lat", "lon")
+EDGE_COLUMNS = ("id", "src_id", "dst_id", "weight")
+
+def _keyset(statement, id_column, after_id: Optional[int]):
+    """
+    Paginación por cursor (keyset): WHERE id > after_id ORDER BY id.
+    Recorre el índice de la clave primaria sin OFFSET, así cada página
+    cuesta lo mismo sin importar qué tan lejos esté.
+    """
+    if after_id is not None:
+        statement = statement.where(id_column > after_id)
+    return statement.order_by(id_column)
+
+async def _listing_response(rows, columns: tuple[str, ...], result_format: str, page_size: int) -> Response:
+    """Serializa las filas (tuplas) con orjson fuera del event loop, sin modelos por fila"""
+    with span("serialize"):
+        if result_format == "columnar":
+            body = await run_in_threadpool(lambda: dumps(columnar(rows, columns)))
+        else:
+            body = await run_in_threadpool(lambda: dumps(rows_payload(rows, columns)))
+    response = json_bytes_response(body)
+    # Página llena: puede haber más filas después del último id
+    if len(rows) == page_size:
+        response.headers["X-Next-After-Id"] = str(rows[-1][0])
+    return response
+
+def _export_response(statement, columns: tuple[str, ...]) -> StreamingResponse:
+    return StreamingResponse(_ndjson_rows(statement, columns), media_type="application/x-ndjson")
+
+async def _ndjson_rows(statement, columns: tuple[str, ...]):
+    """
+    Exporta el resultado como NDJSON leyendo con un cursor del servidor
+    (stream_results): se tienen en memoria a lo sumo LIST_STREAM_CHUNK filas.
+    Usa su propia conexión porque la sesión de la petición se cierra antes
+    de terminar de enviar la respuesta.
+    """
+    async with async_engine.connect() as conn:
+        result = await conn.stream(statement.execution_options(yield_per=LIST_STREAM_CHUNK))
+        async for rows in result.partitions():
+            yield b"\n".join(dumps(dict(zip(columns, row))) for row in rows) + b"\n"
+
+# ========== ESTRUCTURAS DERIVADAS ==========
+
+async def _notify(version: int, changes: list) -> None:
+    """
+    Informa la mutación (ya confirmada) a la caché de la versión y a las
+    estructuras que se mantienen de forma incremental
+    """
+    forget_graph_version()
+    await hot_sources.notify(version, changes)
+    await reachability.notify(version, changes)
+
+# ========== CARGA MASIVA ==========
+
+def _check_bulk_size(bulk_in: BulkIn) -> None:
+    """Rechaza lotes más grandes que BULK_MAX_ITEMS"""
+    if len(bulk_in.items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote excede el máximo de {BULK_MAX_ITEMS} items"
+        )
+
+def _validation_detail(error: ValidationError) -> str:
+    """Resume los errores de validación de un item"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+async def _commit_bulk(session: AsyncSession) -> None:
+    """Confirma el lote; si otra petición insertó lo mismo a la vez, responde 409"""
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El lote entró en conflicto con otra modificación concurrente, reintente"
+        )
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
+from app.graph_cache import get_graph
+from app.schemas import JobIn, JobOut, UserOut
+from app.deps import get_current_user
+from app.jobs import JOBS_MAX_PER_USER, job_queue, list_jobs, read_job, result_path
+
+router = APIRouter(prefix="/graph", tags=["jobs"])
+
+# Parámetros requeridos por cada tipo de trabajo
+REQUIRED_PARAMS = {
+    "bfs": ("start_id",),
+    "sssp": ("src_id",),
+    "distance_matrix": ("sources", "targets"),
+    "components": (),
+}
+
+@router.post("/jobs", response_model=JobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_in: JobIn,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Encola un cálculo pesado (requiere autenticación)
+    - bfs: start_id, max_depth opcional
+    - sssp: src_id (árbol completo de caminos más cortos)
+    - distance_matrix: sources y targets
+    - components: componentes fuertemente conexas
+    El trabajo usa el snapshot del grafo vigente al encolarlo.
+    """
+    missing = [name for name in REQUIRED_PARAMS[job_in.kind] if getattr(job_in, name) is None]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Faltan parámetros para '{job_in.kind}': {', '.join(missing)}"
+        )
+    params = {name: getattr(job_in, name) for name in REQUIRED_PARAMS[job_in.kind]}
+    if job_in.kind == "bfs":
+        params["max_depth"] = job_in.max_depth
+
+    graph = await get_graph(session)
+
+    # Verificar que todos los nodos existen
+    node_ids = [params[name] for name in ("start_id", "src_id") if name in params]
+    node_ids += params.get("sources", []) + params.get("targets", [])
+    missing_nodes = sorted({node_id for node_id in node_ids if not graph.has_node(node_id)})
+    if missing_nodes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nodos con ids {missing_nodes} no encontrados"
+        )
+
+    job = await run_in_threadpool(job_queue.submit, current_user.id, job_in.kind, params, graph)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Ya tiene {JOBS_MAX_PER_USER} trabajos en curso, espere a que terminen",
+            headers={"Retry-After": "5"},
+        )
+    return job
+
+@router.get("/jobs", response_model=list[JobOut])
+async def get_jobs(current_user: UserOut = Depends(get_current_user)):
+    """Listar los trabajos del usuario (requiere autenticación)"""
+    return await run_in_threadpool(list_jobs, current_user.id)
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, current_user: UserOut = Depends(get_current_user)):
+    """Estado y avance de un trabajo (requiere autenticación)"""
+    return await _get_own_job(job_id, current_user)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: UserOut = Depends(get_current_user)):
+    """
+    Resultado de un trabajo terminado (requiere autenticación)
+    - Se sirve tal como quedó guardado, sin volver a serializarlo
+    """
+    job = await _get_own_job(job_id, current_user)
+    if job["status"] != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El trabajo está en estado '{job['status']}'"
+        )
+    return FileResponse(result_path(job_id), media_type="application/json")
+
+@router.delete("/jobs/{job_id}", response_model=JobOut)
+async def cancel_job(job_id: str, current_user: UserOut = Depends(get_current_user)):
+    """Cancelar un trabajo en cola o en ejecución (requiere autenticación)"""
+    job = await _get_own_job(job_id, current_user)
+    if job["status"] not in ("queued", "running"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El trabajo ya terminó en estado '{job['status']}'"
+        )
+    return await run_in_threadpool(job_queue.cancel, job_id)
+
+async def _get_own_job(job_id: str, current_user: UserOut) -> dict:
+    """Busca el trabajo; los de otros usuarios se reportan como inexistentes"""
+    job = await run_in_threadpool(read_job, job_id) if job_id.isalnum() else None
+    if job is None or job["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo {job_id} no encontrado"
+        )
+    return job
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from datetime import datetime
+from typing import Any, Literal, Optional
 
 class UserIn(BaseModel):
     username: str
@@ -15,10 +16,14 @@ class TokenOut(BaseModel):
 
 class NodeIn(BaseModel):
     name: str
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
 
 class NodeOut(BaseModel):
     id: int
     name: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 class EdgeIn(BaseModel):
     src_id: int
@@ -31,6 +36,34 @@ class EdgeOut(BaseModel):
     dst_id: int
     weight: float
 
+class NodesColumnarOut(BaseModel):
+    id: list[int]
+    name: list[str]
+    lat: list[Optional[float]]
+    lon: list[Optional[float]]
+
+class EdgesColumnarOut(BaseModel):
+    id: list[int]
+    src_id: list[int]
+    dst_id: list[int]
+    weight: list[float]
+
+class BulkIn(BaseModel):
+    # Cada item se valida por separado (NodeIn / EdgeIn) para reportar
+    # errores por item sin rechazar todo el lote
+    items: list[dict[str, Any]] = Field(min_length=1)
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+class BulkOut(BaseModel):
+    created: int
+    errors: list[BulkItemError]
+
+class NodesBulkOut(BulkOut):
+    nodes: list[NodeOut]
+
 class BFSTreeNode(BaseModel):
     node_id: int
     parent_id: Optional[int]
@@ -40,6 +73,88 @@ class BFSResult(BaseModel):
     order: list[int]
     tree: list[BFSTreeNode]
 
+class BFSColumnarOut(BaseModel):
+    # Listas paralelas en orden de visita (node_id equivale a order)
+    node_id: list[int]
+    parent_id: list[Optional[int]]
+    depth: list[int]
+
 class ShortestPathOut(BaseModel):
     path: list[int]
     distance: float
+
+class ReachedNode(BaseModel):
+    node_id: int
+    distance: float
+    # Predecesor en el camino más corto desde el origen
+    parent_id: int
+
+class WithinOut(BaseModel):
+    src_id: int
+    max_distance: float
+    # En orden de distancia, sin el origen
+    nodes: list[ReachedNode]
+
+class NearestOut(BaseModel):
+    src_id: int
+    k: int
+    # Los k más cercanos (o menos si no hay tantos alcanzables), sin el origen
+    nodes: list[ReachedNode]
+
+class ReachedColumnarOut(BaseModel):
+    node_id: list[int]
+    distance: list[float]
+    parent_id: list[int]
+
+class ReachableOut(BaseModel):
+    src_id: int
+    dst_id: int
+    reachable: bool
+    # index: respondido por el índice de componentes; search: con un BFS
+    method: Literal["index", "search"]
+
+class ComponentsOut(BaseModel):
+    version: int
+    nodes: int
+    components: int
+    largest: int
+    singletons: int
+    top_sizes: list[int]
+    condensation_edges: int
+    mode: Literal["bitset", "intervals"]
+    exact: bool
+
+class DistanceMatrixIn(BaseModel):
+    sources: list[int] = Field(min_length=1)
+    targets: list[int] = Field(min_length=1)
+    include_paths: bool = False
+
+class DistanceMatrixOut(BaseModel):
+    sources: list[int]
+    targets: list[int]
+    # distances[i][j]: distancia de sources[i] a targets[j] (null si no hay camino)
+    distances: list[list[Optional[float]]]
+    paths: Optional[list[list[Optional[ShortestPathOut]]]] = None
+
+class JobIn(BaseModel):
+    kind: Literal["bfs", "sssp", "distance_matrix", "components"]
+    # bfs
+    start_id: Optional[int] = None
+    max_depth: Optional[int] = Field(default=None, ge=0)
+    # sssp
+    src_id: Optional[int] = None
+    # distance_matrix
+    sources: Optional[list[int]] = Field(default=None, min_length=1)
+    targets: Optional[list[int]] = Field(default=None, min_length=1)
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    params: dict[str, Any]
+    status: Literal["queued", "running", "done", "failed", "cancelled"]
+    progress: float
+    graph_version: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
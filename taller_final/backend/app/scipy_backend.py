@@ -0,0 +1,111 @@
+from threading import Lock
+from typing import Iterator, Optional
+from app.graph_cache import GraphSnapshot
+import logging
+import math
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Backend opcional con SciPy/NumPy: el snapshot CSR se envuelve sin copiar
+# en un scipy.sparse.csr_matrix y los recorridos corren en C (csgraph).
+# GRAPH_BACKEND=python (por defecto) | scipy
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "python").lower()
+
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import breadth_first_order, connected_components
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # SciPy no instalado: se usa el backend de Python
+    np = None
+
+SCIPY_AVAILABLE = np is not None
+SCIPY_ENABLED = GRAPH_BACKEND == "scipy" and SCIPY_AVAILABLE
+
+if GRAPH_BACKEND == "scipy" and not SCIPY_AVAILABLE:
+    logger.warning("GRAPH_BACKEND=scipy pero numpy/scipy no están instalados; se usa el backend de Python")
+
+_matrix_lock = Lock()
+_matrix = None
+_matrix_version: Optional[int] = None
+
+def to_matrix(graph: GraphSnapshot):
+    """
+    Matriz dispersa del snapshot (una por versión). Comparte los buffers del
+    CSR y conserva el orden de las aristas, que define el orden del BFS.
+    """
+    global _matrix, _matrix_version
+    with _matrix_lock:
+        if _matrix_version != graph.version or _matrix is None:
+            n = graph.node_count
+            _matrix = csr_matrix(
+                (
+                    np.frombuffer(graph.weights, dtype=np.float64),
+                    np.frombuffer(graph.targets, dtype=np.int64),
+                    np.frombuffer(graph.offsets, dtype=np.int64),
+                ),
+                shape=(n, n),
+            )
+            _matrix_version = graph.version
+        return _matrix
+
+def shortest_path_trees(graph: GraphSnapshot, sources: list[int]):
+    """
+    Dijkstra desde varios índices densos en una sola llamada.
+    Retorna (distances, parent) de forma (len(sources), n): inf / -1 para
+    los nodos no alcanzables.
+    """
+    distances, predecessors = csgraph_dijkstra(
+        to_matrix(graph), directed=True, indices=sources, return_predecessors=True
+    )
+    parent = np.where(predecessors < 0, -1, predecessors).astype(np.int64)
+    return distances, parent
+
+def shortest_path_tree(graph: GraphSnapshot, src: int):
+    distances, parent = shortest_path_trees(graph, [src])
+    return distances[0], parent[0]
+
+def dijkstra(graph: GraphSnapshot, src_id: int, dst_id: int):
+    """Camino más corto punto a punto con csgraph.dijkstra"""
+    src, dst = graph.index[src_id], graph.index[dst_id]
+    distances, parent = shortest_path_tree(graph, src)
+    distance = distances[dst]
+    if distance == math.inf:
+        return None
+    path = []
+    current = dst
+    while current >= 0:
+        path.append(graph.node_ids[current])
+        current = parent[current]
+    path.reverse()
+    return path, float(distance)
+
+def bfs(graph: GraphSnapshot, start_id: int) -> Iterator[tuple[int, Optional[int], int]]:
+    """BFS completo con csgraph.breadth_first_order: (node_id, parent_id, depth)"""
+    order, predecessors = breadth_first_order(
+        to_matrix(graph), graph.index[start_id], directed=True, return_predecessors=True
+    )
+    node_ids = graph.node_ids
+    depth = {}
+    for current in order.tolist():
+        parent = int(predecessors[current])
+        if parent < 0:
+            depth[current] = 0
+            yield node_ids[current], None, 0
+        else:
+            depth[current] = depth[parent] + 1
+            yield node_ids[current], node_ids[parent], depth[current]
+
+def components(graph: GraphSnapshot, strong: bool = True) -> tuple[int, list[int]]:
+    """
+    Componentes fuerte (o débilmente) conexas.
+    Retorna (cantidad, etiqueta por índice denso)
+    """
+    count, labels = connected_components(
+        to_matrix(graph), directed=True, connection="strong" if strong else "weak"
+    )
+    return count, labels.tolist()
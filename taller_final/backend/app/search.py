@@ -0,0 +1,537 @@
+from array import array
+from typing import Callable, Iterator, Optional
+from app.graph_cache import GraphSnapshot
+from app.contraction import ch_shortest_path, get_fresh_index
+from app import scipy_backend
+from app.metrics import record_search
+import heapq
+import math
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Factor que convierte kilómetros de distancia geodésica a unidades de peso
+# de las aristas. La heurística de A* es admisible mientras ningún peso sea
+# menor que la distancia en línea recta multiplicada por este factor; en cada
+# snapshot se acota a la menor razón peso / km de sus aristas (astar_factor).
+ASTAR_KM_FACTOR = float(os.getenv("ASTAR_KM_FACTOR", "1.0"))
+
+EARTH_RADIUS_KM = 6371.0
+
+# Cada cuántos nodos avisan su avance las búsquedas largas (progress)
+PROGRESS_EVERY = 4096
+
+# Resultado de una búsqueda: (camino como ids de nodo, distancia total)
+PathResult = Optional[tuple[list[int], float]]
+
+def build_path(graph: GraphSnapshot, previous: dict, end: int) -> list[int]:
+    """Reconstruye el camino (ids de nodo) siguiendo los predecesores"""
+    path = []
+    current = end
+    while current is not None:
+        path.append(graph.node_ids[current])
+        current = previous[current]
+    path.reverse()
+    return path
+
+# ========== BFS ==========
+
+def bfs(
+    graph: GraphSnapshot,
+    start_id: int,
+    max_depth: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Iterator[tuple[int, Optional[int], int]]:
+    """
+    BFS desde start_id que genera (node_id, parent_id, depth) en orden de
+    visita, a medida que avanza la frontera.
+    - max_depth: no expande nodos más allá de esa profundidad
+    - limit: se detiene tras visitar esa cantidad de nodos
+    El estado vive en arreglos indexados por el índice denso del nodo.
+    Sin límites y con GRAPH_BACKEND=scipy el recorrido corre en csgraph.
+    """
+    if scipy_backend.SCIPY_ENABLED and max_depth is None and limit is None:
+        yield from scipy_backend.bfs(graph, start_id)
+        return
+
+    offsets, targets, node_ids = graph.offsets, graph.targets, graph.node_ids
+    n = graph.node_count
+    start = graph.index[start_id]
+
+    visited = bytearray(n)
+    parent = array("q", [-1]) * n
+    depth = array("q", [0]) * n
+
+    # La cola es el propio orden de visita (un arreglo con puntero de lectura)
+    queue = array("q", [start])
+    visited[start] = 1
+    head = 0
+
+    relaxed = 0
+    try:
+        while head < len(queue):
+            if limit is not None and head >= limit:
+                return
+            current = queue[head]
+            head += 1
+            current_depth = depth[current]
+            current_parent = parent[current]
+            yield (
+                node_ids[current],
+                node_ids[current_parent] if current_parent >= 0 else None,
+                current_depth,
+            )
+
+            if max_depth is not None and current_depth >= max_depth:
+                continue
+            relaxed += offsets[current + 1] - offsets[current]
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    parent[neighbor] = current
+                    depth[neighbor] = current_depth + 1
+                    queue.append(neighbor)
+    finally:
+        # También si el consumidor deja de iterar antes (limit, is_reachable)
+        record_search("bfs", head, len(queue), relaxed)
+
+def is_reachable(graph: GraphSnapshot, src_id: int, dst_id: int) -> bool:
+    """BFS que se detiene al encontrar dst_id"""
+    return any(node_id == dst_id for node_id, _, _ in bfs(graph, src_id))
+
+# ========== COMPONENTES ==========
+
+def strongly_connected_components(
+    graph: GraphSnapshot, progress: Optional[Callable[[int], None]] = None
+) -> tuple[int, list[int]]:
+    """
+    Componentes fuertemente conexas (Tarjan iterativo).
+    Retorna (cantidad, etiqueta de componente por índice denso); las
+    etiquetas salen en orden topológico inverso del grafo condensado.
+    progress(n) se llama cada PROGRESS_EVERY nodos terminados (puede lanzar
+    una excepción para cortar, p. ej. al cancelar un trabajo).
+    """
+    if scipy_backend.SCIPY_ENABLED:
+        return scipy_backend.components(graph, strong=True)
+
+    offsets, targets = graph.offsets, graph.targets
+    n = graph.node_count
+    order = array("q", [-1]) * n  # orden de descubrimiento
+    low = array("q", [0]) * n
+    labels = [-1] * n
+    on_stack = bytearray(n)
+    stack = []
+    counter = 0
+    count = 0
+    finished = 0
+
+    for root in range(n):
+        if order[root] >= 0:
+            continue
+        # Pila de llamadas: (nodo, próxima posición a revisar en el CSR)
+        calls = [(root, offsets[root])]
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while calls:
+            node, k = calls[-1]
+            if k < offsets[node + 1]:
+                calls[-1] = (node, k + 1)
+                neighbor = targets[k]
+                if order[neighbor] < 0:
+                    order[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack[neighbor] = 1
+                    calls.append((neighbor, offsets[neighbor]))
+                elif on_stack[neighbor] and order[neighbor] < low[node]:
+                    low[node] = order[neighbor]
+                continue
+
+            calls.pop()
+            if progress is not None:
+                finished += 1
+                if finished % PROGRESS_EVERY == 0:
+                    progress(PROGRESS_EVERY)
+            if calls:
+                parent = calls[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == order[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    labels[member] = count
+                    if member == node:
+                        break
+                count += 1
+
+    return count, labels
+
+# ========== DIJKSTRA ==========
+
+def single_source(graph: GraphSnapshot, src: int, targets: Optional[set] = None):
+    """
+    Dijkstra desde el índice denso src. Si se indican targets (índices
+    densos) se detiene en cuanto todos quedan asentados; en ese caso solo
+    las distancias de los targets son definitivas.
+    Retorna (distances, previous) solo con los nodos alcanzados.
+    """
+    offsets, targets_csr, weights = graph.offsets, graph.targets, graph.weights
+    pending = set(targets) if targets is not None else None
+
+    distances = {src: 0.0}
+    previous = {src: None}
+    visited = set()
+    pq = [(0.0, src)]
+    pushes = 1
+    relaxed = 0
+
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        if current in visited:
+            continue
+        visited.add(current)
+
+        if pending is not None:
+            pending.discard(current)
+            if not pending:
+                break
+
+        relaxed += offsets[current + 1] - offsets[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets_csr[k]
+            distance = current_dist + weights[k]
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                heapq.heappush(pq, (distance, neighbor))
+                pushes += 1
+
+    record_search("dijkstra", len(visited), pushes, relaxed)
+    return distances, previous
+
+def dijkstra(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    Dijkstra unidireccional con parada temprana al asentar el destino.
+    Las distancias y predecesores solo se guardan para los nodos alcanzados.
+    """
+    dst = graph.index[dst_id]
+    distances, previous = single_source(graph, graph.index[src_id], {dst})
+    if dst not in distances:
+        return None
+    return build_path(graph, previous, dst), distances[dst]
+
+def shortest_path_tree(
+    graph: GraphSnapshot, src: int, progress: Optional[Callable[[int], None]] = None
+) -> tuple[array, array]:
+    """
+    Árbol completo de caminos más cortos desde el índice denso src.
+    Retorna (distances, parent) como arreglos indexados por índice denso:
+    inf / -1 para los nodos no alcanzables.
+    progress(n) se llama cada PROGRESS_EVERY nodos asentados (puede lanzar
+    una excepción para cortar).
+    """
+    if scipy_backend.SCIPY_ENABLED:
+        return scipy_backend.shortest_path_tree(graph, src)
+
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    n = graph.node_count
+
+    distances = array("d", [math.inf]) * n
+    parent = array("q", [-1]) * n
+    settled = bytearray(n)
+    distances[src] = 0.0
+    pq = [(0.0, src)]
+    pushes = 1
+    relaxed = 0
+    settled_count = 0
+
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        if settled[current]:
+            continue
+        settled[current] = 1
+        if progress is not None:
+            settled_count += 1
+            if settled_count % PROGRESS_EVERY == 0:
+                progress(PROGRESS_EVERY)
+        relaxed += offsets[current + 1] - offsets[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            distance = current_dist + weights[k]
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                parent[neighbor] = current
+                heapq.heappush(pq, (distance, neighbor))
+                pushes += 1
+
+    record_search("sssp_tree", settled.count(1), pushes, relaxed)
+    return distances, parent
+
+def bounded_dijkstra(
+    graph: GraphSnapshot,
+    src: int,
+    max_distance: Optional[float] = None,
+    k: Optional[int] = None,
+) -> list[tuple[int, float, Optional[int]]]:
+    """
+    Dijkstra desde el índice denso src que se detiene cuando la distancia
+    asentada supera max_distance o cuando ya se asentaron k nodos (sin
+    contar el origen). Retorna (node_id, distancia, parent_id) de los nodos
+    asentados, sin el origen, en orden de distancia.
+    """
+    offsets, targets, weights, node_ids = graph.offsets, graph.targets, graph.weights, graph.node_ids
+    distances = {src: 0.0}
+    previous = {src: None}
+    settled = set()
+    reached = []
+    pq = [(0.0, src)]
+    pushes = 1
+    relaxed = 0
+
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        if current in settled:
+            continue
+        # Las distancias salen en orden: ninguna posterior cabe en el radio
+        if max_distance is not None and current_dist > max_distance:
+            break
+        settled.add(current)
+        if current != src:
+            reached.append((node_ids[current], current_dist, node_ids[previous[current]]))
+            if k is not None and len(reached) >= k:
+                break
+
+        relaxed += offsets[current + 1] - offsets[current]
+        for j in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[j]
+            distance = current_dist + weights[j]
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                heapq.heappush(pq, (distance, neighbor))
+                pushes += 1
+
+    record_search("bounded", len(settled), pushes, relaxed)
+    return reached
+
+def tree_path(graph: GraphSnapshot, distances: array, parent: array, dst: int) -> PathResult:
+    """Camino y distancia hacia dst leídos de un árbol de shortest_path_tree"""
+    if distances[dst] == math.inf:
+        return None
+    path = []
+    current = dst
+    while current >= 0:
+        path.append(graph.node_ids[current])
+        current = parent[current]
+    path.reverse()
+    return path, float(distances[dst])
+
+# ========== DIJKSTRA BIDIRECCIONAL ==========
+
+def bidirectional_dijkstra(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    Dijkstra bidireccional: una búsqueda hacia adelante desde el origen y otra
+    hacia atrás (sobre aristas entrantes) desde el destino. Termina cuando la
+    suma de los mínimos de ambas colas no puede mejorar el mejor encuentro.
+    """
+    src, dst = graph.index[src_id], graph.index[dst_id]
+    if src == dst:
+        return [src_id], 0.0
+
+    rev_offsets, rev_sources, rev_weights = graph.reverse()
+    sides = (
+        (graph.offsets, graph.targets, graph.weights),
+        (rev_offsets, rev_sources, rev_weights),
+    )
+    distances = ({src: 0.0}, {dst: 0.0})
+    previous = ({src: None}, {dst: None})
+    visited = (set(), set())
+    queues = ([(0.0, src)], [(0.0, dst)])
+
+    best = math.inf
+    meeting = None
+    pushes = 2
+    relaxed = 0
+
+    while queues[0] and queues[1]:
+        # Criterio de parada: ningún camino por explorar puede ser mejor
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+
+        # Expandir el lado cuya cola tenga el menor tamaño
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        other = 1 - side
+        offsets, targets, weights = sides[side]
+        dist, prev, done, pq = distances[side], previous[side], visited[side], queues[side]
+        other_dist = distances[other]
+
+        current_dist, current = heapq.heappop(pq)
+        if current in done:
+            continue
+        done.add(current)
+
+        relaxed += offsets[current + 1] - offsets[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            distance = current_dist + weights[k]
+            if distance < dist.get(neighbor, math.inf):
+                dist[neighbor] = distance
+                prev[neighbor] = current
+                heapq.heappush(pq, (distance, neighbor))
+                pushes += 1
+
+            # ¿Se encontró un camino a través de este vecino?
+            if neighbor in other_dist:
+                total = dist[neighbor] + other_dist[neighbor]
+                if total < best:
+                    best = total
+                    meeting = neighbor
+
+    record_search("bidirectional", len(visited[0]) + len(visited[1]), pushes, relaxed)
+    if meeting is None:
+        return None
+
+    # Mitad hacia adelante (origen -> encuentro) + mitad hacia atrás
+    path = build_path(graph, previous[0], meeting)
+    current = previous[1][meeting]
+    while current is not None:
+        path.append(graph.node_ids[current])
+        current = previous[1][current]
+
+    return path, best
+
+# ========== A* ==========
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia geodésica (km) entre dos coordenadas en grados"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _min_km_ratio(graph: GraphSnapshot) -> float:
+    """Menor peso / km geodésicos entre las aristas (inf si ninguna une puntos distintos)"""
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    lats, lons = graph.lats, graph.lons
+    ratio = math.inf
+    for u in range(graph.node_count):
+        lat, lon = lats[u], lons[u]
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            km = _haversine_km(lat, lon, lats[v], lons[v])
+            if km > 0 and weights[k] < ratio * km:
+                ratio = weights[k] / km
+    return ratio
+
+def astar_factor(graph: GraphSnapshot) -> float:
+    """
+    Factor km -> peso de la heurística de A* en este snapshot: ASTAR_KM_FACTOR
+    acotado por la menor razón peso / km de las aristas, así la heurística
+    nunca sobreestima (pesos que no son km lo bajan, hasta 0 = Dijkstra).
+    Sin coordenadas en todos los nodos es 0: un tramo que pasa por nodos sin
+    coordenadas no tiene cota geodésica. La razón se calcula una vez por snapshot.
+    """
+    if ASTAR_KM_FACTOR <= 0 or not graph.all_coords:
+        return 0.0
+    if graph.km_ratio is None:
+        graph.km_ratio = _min_km_ratio(graph)
+    return min(ASTAR_KM_FACTOR, graph.km_ratio)
+
+def astar(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    A* con heurística de distancia geodésica hacia el destino, escalada por
+    astar_factor para que sea admisible; un nodo puede reabrirse si se le
+    encuentra un costo menor. Con factor 0 se comporta como Dijkstra.
+    """
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    lats, lons = graph.lats, graph.lons
+    src, dst = graph.index[src_id], graph.index[dst_id]
+    dst_lat, dst_lon = lats[dst], lons[dst]
+    factor = astar_factor(graph)
+
+    heuristics = {}
+
+    def heuristic(i: int) -> float:
+        h = heuristics.get(i)
+        if h is None:
+            if factor > 0:
+                h = _haversine_km(lats[i], lons[i], dst_lat, dst_lon) * factor
+            else:
+                h = 0.0
+            heuristics[i] = h
+        return h
+
+    distances = {src: 0.0}
+    previous = {src: None}
+    pq = [(heuristic(src), 0.0, src)]
+    settled = 0
+    pushes = 1
+    relaxed = 0
+
+    while pq:
+        _, current_dist, current = heapq.heappop(pq)
+        if current_dist > distances[current]:
+            continue  # Entrada obsoleta
+        settled += 1
+
+        if current == dst:
+            record_search("astar", settled, pushes, relaxed)
+            return build_path(graph, previous, dst), current_dist
+
+        relaxed += offsets[current + 1] - offsets[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            distance = current_dist + weights[k]
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                previous[neighbor] = current
+                heapq.heappush(pq, (distance + heuristic(neighbor), distance, neighbor))
+                pushes += 1
+
+    record_search("astar", settled, pushes, relaxed)
+    return None
+
+# ========== CONTRACTION HIERARCHIES ==========
+
+def contraction_hierarchies(graph: GraphSnapshot, src_id: int, dst_id: int) -> PathResult:
+    """
+    Consulta sobre el índice CH si está al día con el snapshot; si está
+    desactualizado (o desactivado) usa Dijkstra bidireccional
+    """
+    index = get_fresh_index(graph)
+    if index is None:
+        return bidirectional_dijkstra(graph, src_id, dst_id)
+    return ch_shortest_path(index, graph, src_id, dst_id)
+
+# ========== SELECCIÓN DEL MOTOR ==========
+
+ENGINES: dict[str, Callable[[GraphSnapshot, int, int], PathResult]] = {
+    "dijkstra": dijkstra,
+    "bidirectional": bidirectional_dijkstra,
+    "astar": astar,
+    "ch": contraction_hierarchies,
+}
+if scipy_backend.SCIPY_AVAILABLE:
+    ENGINES["scipy"] = scipy_backend.dijkstra
+
+def choose_engine(graph: GraphSnapshot, src_id: int, dst_id: int) -> str:
+    """
+    Elige el motor por defecto: el índice CH si está al día; si no, csgraph
+    con GRAPH_BACKEND=scipy; si no, A* cuando todos los nodos tienen
+    coordenadas y ninguna arista pesa menos que su distancia geodésica por
+    ASTAR_KM_FACTOR (heurística admisible y útil en todo el grafo); si no,
+    Dijkstra bidireccional
+    """
+    if get_fresh_index(graph) is not None:
+        return "ch"
+    if scipy_backend.SCIPY_ENABLED:
+        return "scipy"
+    if ASTAR_KM_FACTOR > 0 and astar_factor(graph) >= ASTAR_KM_FACTOR:
+        return "astar"
+    return "bidirectional"
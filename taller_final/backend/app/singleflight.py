@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, Hashable
+import asyncio
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera ejecuta la
+    función y las demás esperan y reciben el mismo resultado (o excepción)
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            # La ejecución compartida es una tarea propia, no la del primer
+            # llamador: si él se desconecta, los demás siguen esperándola
+            task = loop.create_task(self._run(key, fn))
+            task.add_done_callback(_retrieve)
+            self._calls[key] = task
+        # shield: la cancelación de un llamador no cancela la tarea compartida
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            if self._calls.get(key) is asyncio.current_task():
+                del self._calls[key]
+
+def _retrieve(task: asyncio.Task) -> None:
+    """Marca la excepción como leída aunque todos los llamadores se hayan ido"""
+    if not task.cancelled():
+        task.exception()
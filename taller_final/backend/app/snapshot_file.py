@@ -0,0 +1,237 @@
+from array import array
+from pathlib import Path
+from typing import Optional
+from app.graph_cache import GraphSnapshot
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Snapshot binario del grafo, abierto con mmap: los N workers de uvicorn
+# comparten una sola copia de los arreglos CSR en el page cache del sistema
+# operativo en lugar de armar cada uno la suya desde MySQL.
+# Vacío = desactivado (cada worker construye su snapshot en memoria).
+GRAPH_SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", "")
+# Archivos de versiones anteriores que se conservan en el directorio
+GRAPH_SNAPSHOT_KEEP = int(os.getenv("GRAPH_SNAPSHOT_KEEP", "2"))
+# Segundos que un worker espera el archivo que otro está construyendo antes
+# de construirlo por su cuenta
+GRAPH_SNAPSHOT_WAIT_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_WAIT_SECONDS", "30"))
+
+# Formato (little-endian, secciones alineadas a 8 bytes):
+#   encabezado de 64 bytes: magic, versión del formato, versión del grafo,
+#   cantidad de nodos (n), de aristas (m) y bytes de la tabla de nombres
+#   node_ids int64[n] | offsets int64[n+1] | targets int64[m] | weights float64[m]
+#   edge_ids int64[m] | lats float64[n] | lons float64[n]
+#   name_offsets int64[n+1] | nombres UTF-8 concatenados
+MAGIC = b"PFGRAPH\x00"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sIxxxxQQQQ")
+
+class SnapshotFormatError(Exception):
+    pass
+
+class NameTable:
+    """Nombres de los nodos por índice denso, decodificados bajo demanda"""
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise SnapshotFormatError("El snapshot binario solo se soporta en plataformas little-endian")
+
+def _as_array(typecode: str, values) -> array:
+    return values if isinstance(values, array) else array(typecode, values)
+
+def write_snapshot(path: Path, graph: GraphSnapshot, names=None) -> None:
+    """
+    Escribe el snapshot en path de forma atómica (archivo temporal en el
+    mismo directorio + os.replace): los lectores ven el archivo anterior o
+    el nuevo completo, nunca uno a medias
+    """
+    _check_byteorder()
+    names = graph.names if names is None else names
+    encoded = [name.encode("utf-8") for name in names] if names is not None else [b""] * graph.node_count
+    name_offsets = array("q", [0]) * (graph.node_count + 1)
+    for i, name in enumerate(encoded):
+        name_offsets[i + 1] = name_offsets[i] + len(name)
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(
+                MAGIC, FORMAT_VERSION, graph.version, graph.node_count, graph.edge_count, name_offsets[-1]
+            ).ljust(HEADER_SIZE, b"\x00"))
+            for typecode, values in (
+                ("q", graph.node_ids), ("q", graph.offsets), ("q", graph.targets), ("d", graph.weights),
+                ("q", graph.edge_ids), ("d", graph.lats), ("d", graph.lons), ("q", name_offsets),
+            ):
+                f.write(_as_array(typecode, values))
+            for name in encoded:
+                f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def read_header(path: Path) -> dict:
+    with open(path, "rb") as f:
+        return _parse_header(f.read(HEADER_SIZE), path)
+
+def _parse_header(data: bytes, path: Path) -> dict:
+    if len(data) < HEADER_SIZE:
+        raise SnapshotFormatError(f"{path}: archivo truncado")
+    magic, format_version, version, n, m, names_size = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotFormatError(f"{path}: no es un snapshot del grafo")
+    if format_version != FORMAT_VERSION:
+        raise SnapshotFormatError(f"{path}: versión de formato {format_version} no soportada")
+    return {"version": version, "nodes": n, "edges": m, "names_bytes": names_size}
+
+def open_snapshot(path: Path) -> GraphSnapshot:
+    """
+    Abre el snapshot con mmap de solo lectura. Los arreglos son memoryviews
+    sobre el mapeo (no se copian); solo index (dict id -> índice denso) se
+    arma en la memoria del proceso.
+    """
+    _check_byteorder()
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = _parse_header(mapping[:HEADER_SIZE], path)
+    n, m = header["nodes"], header["edges"]
+
+    view = memoryview(mapping)
+    position = HEADER_SIZE
+
+    def section(typecode: str, count: int):
+        nonlocal position
+        end = position + 8 * count
+        if end > len(view):
+            raise SnapshotFormatError(f"{path}: archivo truncado")
+        values = view[position:end].cast(typecode)
+        position = end
+        return values
+
+    node_ids = section("q", n)
+    offsets = section("q", n + 1)
+    targets = section("q", m)
+    weights = section("d", m)
+    edge_ids = section("q", m)
+    lats = section("d", n)
+    lons = section("d", n)
+    name_offsets = section("q", n + 1)
+    if position + header["names_bytes"] > len(view):
+        raise SnapshotFormatError(f"{path}: archivo truncado")
+    names = NameTable(name_offsets, view[position:position + header["names_bytes"]])
+
+    return GraphSnapshot(
+        header["version"], node_ids, offsets, targets, weights, edge_ids, lats, lons,
+        names=names, source=str(path),
+    )
+
+class SnapshotStore:
+    """
+    Directorio compartido por los workers con un archivo por versión
+    (graph-<versión>.bin). El primer worker que necesita una versión la
+    construye desde la base de datos y la publica; los demás la abren.
+    """
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def path(self, version: int) -> Path:
+        return self.directory / f"graph-{version}.bin"
+
+    def _lock_path(self, version: int) -> Path:
+        return self.directory / f"graph-{version}.building"
+
+    def load(self, version: int) -> Optional[GraphSnapshot]:
+        """Abre el archivo de esa versión si ya fue publicado"""
+        path = self.path(version)
+        if not path.exists():
+            return None
+        try:
+            return open_snapshot(path)
+        except (OSError, SnapshotFormatError) as e:
+            logger.warning("No se pudo abrir %s: %s", path, e)
+            return None
+
+    def claim(self, version: int) -> bool:
+        """
+        Reserva la construcción de una versión (archivo de bloqueo creado con
+        O_EXCL). Retorna False si otro worker la está construyendo; un
+        bloqueo más viejo que GRAPH_SNAPSHOT_WAIT_SECONDS se considera abandonado.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = self._lock_path(version)
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime < GRAPH_SNAPSHOT_WAIT_SECONDS:
+                        return False
+                    lock.unlink()
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def release(self, version: int) -> None:
+        self._lock_path(version).unlink(missing_ok=True)
+
+    def publish(self, graph: GraphSnapshot) -> GraphSnapshot:
+        """
+        Escribe el snapshot y retorna la versión mapeada (la copia privada
+        se libera). Si la escritura falla se sigue usando la copia en memoria.
+        """
+        path = self.path(graph.version)
+        try:
+            write_snapshot(path, graph)
+            published = open_snapshot(path)
+        except (OSError, SnapshotFormatError) as e:
+            logger.warning("No se pudo publicar el snapshot %s: %s", path, e)
+            published = graph
+        finally:
+            self.release(graph.version)
+        self.prune()
+        return published
+
+    def prune(self) -> None:
+        """Elimina los archivos más viejos (los procesos que los tienen mapeados no se ven afectados)"""
+        files = sorted(
+            self.directory.glob("graph-*.bin"), key=lambda path: int(path.stem.split("-")[1])
+        )
+        for path in files[:-max(self.keep, 1)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+snapshot_store = SnapshotStore(GRAPH_SNAPSHOT_DIR, GRAPH_SNAPSHOT_KEEP) if GRAPH_SNAPSHOT_DIR else None
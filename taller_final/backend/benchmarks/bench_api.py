@@ -0,0 +1,129 @@
+"""
+Benchmarks de punta a punta: la app de FastAPI servida con TestClient
+sobre una base SQLite local cargada con un grafo sintético.
+
+Uso (desde la carpeta backend), ver también benchmarks.suite:
+    python -m benchmarks.bench_api --kind road --size 10k
+"""
+import os
+import tempfile
+
+# La app se importa después de fijar la base: siempre una SQLite local,
+# nunca la base configurada en .env
+BENCH_DB = os.path.join(tempfile.gettempdir(), "pathfinder_bench.db")
+os.environ["MYSQL_URL"] = f"sqlite:///{BENCH_DB}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import argparse
+import itertools
+import random
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+from app.db import engine, init_db, insert_rows
+from app.graph_cache import bump_graph_version
+from app.main import app
+from app.models import Edge, Node
+from benchmarks.generators import KINDS, SIZES, synthetic
+from benchmarks.harness import measure
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+
+def load_graph(node_ids, edges, coords) -> None:
+    """Reemplaza el contenido de la base por el grafo sintético"""
+    init_db()
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.exec(delete(Edge))
+        session.exec(delete(Node))
+        insert_rows(session, Node, [
+            {
+                "id": node_id,
+                "name": f"n{node_id}",
+                "lat": coords[node_id][0] if coords else None,
+                "lon": coords[node_id][1] if coords else None,
+                "created_at": now,
+            }
+            for node_id in node_ids
+        ])
+        insert_rows(session, Edge, [
+            {"src_id": src, "dst_id": dst, "weight": weight, "created_at": now}
+            for src, dst, weight in edges
+        ])
+        bump_graph_version(session)
+        session.commit()
+
+def login(client: TestClient) -> dict:
+    client.post("/auth/register", json={"username": BENCH_USER, "password": BENCH_PASSWORD})
+    response = client.post("/auth/login", data={"username": BENCH_USER, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def _request(client: TestClient, method: str, url: str, expected=(200,), **kwargs):
+    """Hace la petición y falla si el status no es el esperado"""
+    def call():
+        response = client.request(method, url() if callable(url) else url, **kwargs)
+        if response.status_code not in expected:
+            raise RuntimeError(f"{method} {response.url}: {response.status_code} {response.text[:200]}")
+        return response
+    return call
+
+def run_api(kind: str, size: str, seed: int, repeat: int, memory: bool = True) -> list[dict]:
+    """Carga el grafo, levanta la app y mide cada endpoint"""
+    node_ids, edges, coords = synthetic(kind, SIZES[size], seed=seed)
+    load_graph(node_ids, edges, coords)
+    info = {"kind": kind, "size": size, "nodes": len(node_ids), "edges": len(edges)}
+    print(f"🌐 {kind}/{size}: {len(node_ids)} nodos, {len(edges)} aristas en {BENCH_DB}")
+
+    rng = random.Random(seed)
+    count = max(repeat, 1) * 2
+    pairs = itertools.cycle([(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(count)])
+    nodes = itertools.cycle([rng.choice(node_ids) for _ in range(count)])
+    matrix = {"sources": rng.sample(node_ids, min(10, len(node_ids))), "targets": rng.sample(node_ids, min(10, len(node_ids)))}
+
+    results = []
+    with TestClient(app) as client:
+        headers = login(client)
+        # Primera petición: arma el snapshot del grafo (no se mide)
+        client.get(f"/graph/bfs?start_id={node_ids[0]}&limit=1", headers=headers).raise_for_status()
+
+        start_id = node_ids[0]
+        etag = client.get(f"/graph/bfs?start_id={start_id}", headers=headers).headers["etag"]
+
+        def shortest_path(algorithm: str):
+            def url():
+                src_id, dst_id = next(pairs)
+                return f"/graph/shortest-path?src_id={src_id}&dst_id={dst_id}&algorithm={algorithm}"
+            return url
+
+        benchmarks = {
+            "nodes.page": _request(client, "GET", "/graph/nodes?limit=1000", headers=headers),
+            "edges.page": _request(client, "GET", "/graph/edges?limit=1000&format=columnar", headers=headers),
+            "edges.by_src": _request(client, "GET", lambda: f"/graph/edges?src_id={next(nodes)}", headers=headers),
+            "bfs": _request(client, "GET", lambda: f"/graph/bfs?start_id={next(nodes)}", headers=headers),
+            "bfs.not_modified": _request(
+                client, "GET", f"/graph/bfs?start_id={start_id}", expected=(304,),
+                headers={**headers, "If-None-Match": etag},
+            ),
+            "shortest_path.auto": _request(client, "GET", shortest_path("auto"), expected=(200, 404), headers=headers),
+            "shortest_path.dijkstra": _request(
+                client, "GET", shortest_path("dijkstra"), expected=(200, 404), headers=headers
+            ),
+            "nearest.k10": _request(client, "GET", lambda: f"/graph/nearest?src_id={next(nodes)}&k=10", headers=headers),
+        "distance_matrix.10x10": _request(client, "POST", "/graph/distance-matrix", json=matrix, headers=headers),
+        }
+        for name, fn in benchmarks.items():
+            result = measure(fn, repeat, memory=memory)
+            print(f"   • {name:<24} p50 {result['p50_ms']:9.3f} ms   p99 {result['p99_ms']:9.3f} ms")
+            results.append({"suite": "api", "name": name, "graph": info, **result})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", default="road", choices=KINDS)
+    parser.add_argument("--size", default="10k", choices=tuple(SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run_api(args.kind, args.size, args.seed, args.repeat)
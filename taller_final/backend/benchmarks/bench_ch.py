@@ -0,0 +1,57 @@
+"""
+Compara el tiempo de consulta de contraction hierarchies contra Dijkstra
+sobre grafos sintéticos tipo red vial.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_ch --rows 60 --cols 60 --queries 200
+"""
+import argparse
+import random
+import time
+from app.contraction import build_ch, ch_shortest_path
+from app.search import bidirectional_dijkstra, dijkstra
+from benchmarks.generators import road_like, to_snapshot
+
+def run(rows: int, cols: int, queries: int, seed: int) -> None:
+    node_ids, edges, coords = road_like(rows, cols, seed=seed)
+    graph = to_snapshot(node_ids, edges, coords)
+    print(f"📊 Grafo: {graph.node_count} nodos, {graph.edge_count} aristas")
+
+    started = time.perf_counter()
+    index = build_ch(graph)
+    print(f"🏗️  Preprocesamiento CH: {time.perf_counter() - started:.2f}s ({index.shortcut_count} atajos)")
+
+    rng = random.Random(seed)
+    pairs = [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(queries)]
+
+    engines = {
+        "dijkstra": lambda s, d: dijkstra(graph, s, d),
+        "bidirectional": lambda s, d: bidirectional_dijkstra(graph, s, d),
+        "ch": lambda s, d: ch_shortest_path(index, graph, s, d),
+    }
+    results = {}
+    timings = {}
+    for name, engine in engines.items():
+        started = time.perf_counter()
+        results[name] = [engine(s, d) for s, d in pairs]
+        timings[name] = (time.perf_counter() - started) / queries
+
+    # Verificar que todas las distancias coinciden con Dijkstra
+    for name, values in results.items():
+        for expected, got in zip(results["dijkstra"], values):
+            assert (expected is None) == (got is None), name
+            if expected is not None:
+                assert abs(expected[1] - got[1]) < 1e-6, name
+
+    base = timings["dijkstra"]
+    for name, seconds in timings.items():
+        print(f"   • {name:<14} {seconds * 1000:8.3f} ms/consulta  (x{base / seconds:.1f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=60)
+    parser.add_argument("--cols", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.rows, args.cols, args.queries, args.seed)
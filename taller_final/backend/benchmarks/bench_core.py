@@ -0,0 +1,59 @@
+"""
+Micro-benchmarks de los núcleos de app.search (BFS, Dijkstra y variantes)
+sobre grafos sintéticos, sin base de datos ni HTTP.
+
+Uso (desde la carpeta backend), ver también benchmarks.suite:
+    python -m benchmarks.bench_core --kind road --size 100k
+"""
+import argparse
+import itertools
+import random
+import time
+from app.graph_cache import GraphSnapshot
+from app.search import astar, bfs, bidirectional_dijkstra, bounded_dijkstra, dijkstra, shortest_path_tree
+from benchmarks.generators import KINDS, SIZES, synthetic, to_snapshot
+from benchmarks.harness import measure
+
+def graph_info(kind: str, size: str, graph: GraphSnapshot) -> dict:
+    return {"kind": kind, "size": size, "nodes": graph.node_count, "edges": graph.edge_count}
+
+def run_core(kind: str, size: str, seed: int, repeat: int, memory: bool = True) -> list[dict]:
+    """Retorna un resultado de measure() por benchmark, con el grafo y el nombre"""
+    node_ids, edges, coords = synthetic(kind, SIZES[size], seed=seed)
+    started = time.perf_counter()
+    graph = to_snapshot(node_ids, edges, coords)
+    build_ms = (time.perf_counter() - started) * 1000
+    info = graph_info(kind, size, graph)
+    print(f"📊 {kind}/{size}: {graph.node_count} nodos, {graph.edge_count} aristas (CSR en {build_ms:.0f} ms)")
+
+    # Pares fijos por semilla: la misma secuencia en cada corrida
+    rng = random.Random(seed)
+    pairs = itertools.cycle([(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(max(repeat, 1) * 2)])
+    sources = itertools.cycle([rng.choice(node_ids) for _ in range(max(repeat, 1))])
+
+    benchmarks = {
+        "bfs.full": lambda: sum(1 for _ in bfs(graph, next(sources))),
+        "bfs.depth3": lambda: sum(1 for _ in bfs(graph, next(sources), max_depth=3)),
+        "dijkstra.p2p": lambda: dijkstra(graph, *next(pairs)),
+        "bidirectional.p2p": lambda: bidirectional_dijkstra(graph, *next(pairs)),
+        "sssp.tree": lambda: shortest_path_tree(graph, graph.index[next(sources)]),
+        "nearest.k10": lambda: bounded_dijkstra(graph, graph.index[next(sources)], k=10),
+    }
+    if graph.all_coords:
+        benchmarks["astar.p2p"] = lambda: astar(graph, *next(pairs))
+
+    results = []
+    for name, fn in benchmarks.items():
+        result = measure(fn, repeat, memory=memory)
+        print(f"   • {name:<18} p50 {result['p50_ms']:9.3f} ms   p99 {result['p99_ms']:9.3f} ms")
+        results.append({"suite": "core", "name": name, "graph": info, **result})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", default="road", choices=KINDS)
+    parser.add_argument("--size", default="10k", choices=tuple(SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run_core(args.kind, args.size, args.seed, args.repeat)
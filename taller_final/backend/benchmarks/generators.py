@@ -0,0 +1,168 @@
+from array import array
+from app.graph_cache import GraphSnapshot, _build_csr
+from app.search import _haversine_km
+import math
+import random
+
+# Origen aproximado de las coordenadas sintéticas (Cali)
+BASE_LAT = 3.45
+BASE_LON = -76.53
+
+def to_snapshot(node_ids, edges, coords=None, version: int = 0) -> GraphSnapshot:
+    """
+    Convierte una lista de aristas (src_id, dst_id, weight) en un GraphSnapshot
+    sin pasar por la base de datos
+    """
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    dense = [
+        (index[src], index[dst], weight, edge_id)
+        for edge_id, (src, dst, weight) in enumerate(edges, start=1)
+    ]
+    offsets, targets, weights, edge_ids = _build_csr(len(node_ids), dense, len(dense))
+    nan = float("nan")
+    lats = array("d", (coords[node_id][0] if coords else nan for node_id in node_ids))
+    lons = array("d", (coords[node_id][1] if coords else nan for node_id in node_ids))
+    return GraphSnapshot(version, list(node_ids), offsets, targets, weights, edge_ids, lats, lons)
+
+def road_like(rows: int, cols: int, seed: int = 0, spacing_km: float = 2.0, drop: float = 0.1):
+    """
+    Grafo tipo red vial: grilla con coordenadas perturbadas, vías en ambos
+    sentidos, una fracción de tramos eliminados y pesos >= distancia geodésica
+    (la heurística de A* sigue siendo admisible)
+
+    Retorna (node_ids, edges, coords)
+    """
+    rng = random.Random(seed)
+    step = spacing_km / 111.0  # grados aproximados por km
+    node_ids = list(range(1, rows * cols + 1))
+    coords = {}
+    for r in range(rows):
+        for c in range(cols):
+            coords[r * cols + c + 1] = (
+                BASE_LAT + (r + rng.uniform(-0.3, 0.3)) * step,
+                BASE_LON + (c + rng.uniform(-0.3, 0.3)) * step,
+            )
+
+    edges = []
+
+    def connect(a: int, b: int, speed: float) -> None:
+        km = _haversine_km(*coords[a], *coords[b])
+        weight = round(km * speed * rng.uniform(1.0, 1.3), 3) + 0.001
+        edges.append((a, b, weight))
+        edges.append((b, a, weight))
+
+    for r in range(rows):
+        for c in range(cols):
+            node = r * cols + c + 1
+            if c + 1 < cols and rng.random() > drop:
+                connect(node, node + 1, 1.0)
+            if r + 1 < rows and rng.random() > drop:
+                connect(node, node + cols, 1.0)
+
+    return node_ids, edges, coords
+
+def grid(rows: int, cols: int, seed: int = 0):
+    """
+    Grilla regular con vías en ambos sentidos y pesos aleatorios en [1, 10)
+    (aprox. 4 * rows * cols aristas). Retorna (node_ids, edges, coords)
+    """
+    rng = random.Random(seed)
+    step = 1.0 / 111.0
+    node_ids = list(range(1, rows * cols + 1))
+    coords = {
+        r * cols + c + 1: (BASE_LAT + r * step, BASE_LON + c * step)
+        for r in range(rows) for c in range(cols)
+    }
+    edges = []
+    for r in range(rows):
+        for c in range(cols):
+            node = r * cols + c + 1
+            for neighbor in ((node + 1) if c + 1 < cols else None, (node + cols) if r + 1 < rows else None):
+                if neighbor is not None:
+                    weight = round(rng.uniform(1.0, 10.0), 3)
+                    edges.append((node, neighbor, weight))
+                    edges.append((neighbor, node, weight))
+    return node_ids, edges, coords
+
+def random_geometric(n: int, avg_degree: float = 6.0, seed: int = 0, side_km: float = 100.0):
+    """
+    Grafo geométrico aleatorio: n puntos uniformes en un cuadrado de side_km
+    unidos (en ambos sentidos) si están a menos de un radio elegido para
+    obtener avg_degree vecinos en promedio. El peso es la distancia en km
+    (A* admisible). Retorna (node_ids, edges, coords)
+    """
+    rng = random.Random(seed)
+    radius = side_km * math.sqrt(avg_degree / (n * math.pi))
+    points = [(rng.uniform(0, side_km), rng.uniform(0, side_km)) for _ in range(n)]
+    node_ids = list(range(1, n + 1))
+    coords = {
+        i + 1: (BASE_LAT + y / 111.0, BASE_LON + x / 111.0) for i, (x, y) in enumerate(points)
+    }
+
+    # Celdas de lado radius: solo se comparan puntos de celdas vecinas
+    cells = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((int(x // radius), int(y // radius)), []).append(i)
+
+    edges = []
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                others = cells.get((cx + dx, cy + dy))
+                if not others:
+                    continue
+                for i in members:
+                    xi, yi = points[i]
+                    for j in others:
+                        if j <= i:
+                            continue
+                        xj, yj = points[j]
+                        if (xi - xj) ** 2 + (yi - yj) ** 2 <= radius * radius:
+                            weight = round(_haversine_km(*coords[i + 1], *coords[j + 1]), 3) + 0.001
+                            edges.append((i + 1, j + 1, weight))
+                            edges.append((j + 1, i + 1, weight))
+    return node_ids, edges, coords
+
+def scale_free(n: int, links: int = 3, seed: int = 0):
+    """
+    Grafo libre de escala (Barabási-Albert): cada nodo nuevo se une a links
+    nodos existentes elegidos con probabilidad proporcional a su grado, con
+    aristas en ambos sentidos y pesos en [1, 10). No tiene coordenadas.
+    Retorna (node_ids, edges, None)
+    """
+    rng = random.Random(seed)
+    node_ids = list(range(1, n + 1))
+    edges = []
+    # Cada nodo aparece una vez por arista incidente (muestreo por grado)
+    endpoints = list(range(1, min(links, n) + 1))
+    for node in range(links + 1, n + 1):
+        targets = set()
+        while len(targets) < links:
+            targets.add(rng.choice(endpoints))
+        for target in targets:
+            weight = round(rng.uniform(1.0, 10.0), 3)
+            edges.append((node, target, weight))
+            edges.append((target, node, weight))
+            endpoints.extend((node, target))
+    return node_ids, edges, None
+
+# Tamaños (aristas aproximadas) aceptados por synthetic()
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+KINDS = ("grid", "geometric", "scale_free", "road")
+
+def synthetic(kind: str, edges: int, seed: int = 0):
+    """
+    Genera un grafo del tipo pedido con aproximadamente edges aristas.
+    Retorna (node_ids, edges, coords)
+    """
+    if kind == "grid":
+        side = max(int(math.sqrt(edges / 4)), 2)
+        return grid(side, side, seed=seed)
+    if kind == "road":
+        side = max(int(math.sqrt(edges / 3.6)), 2)
+        return road_like(side, side, seed=seed)
+    if kind == "geometric":
+        return random_geometric(max(edges // 6, 10), avg_degree=6.0, seed=seed)
+    if kind == "scale_free":
+        return scale_free(max(edges // 6, 10), links=3, seed=seed)
+    raise ValueError(f"Tipo de grafo desconocido: '{kind}'")
@@ -0,0 +1,104 @@
+"""
+Medición y comparación de benchmarks: percentiles de tiempo, memoria pico
+(tracemalloc) y detección de regresiones contra una línea base en JSON.
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+# Diferencias de tiempo por debajo de este umbral se consideran ruido
+NOISE_FLOOR_MS = 0.05
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal sobre valores ordenados"""
+    if not values:
+        return math.nan
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1, memory: bool = True) -> dict:
+    """
+    Ejecuta fn warmup + repeat veces y resume los tiempos en ms. La memoria
+    pico se mide en una ejecución aparte (tracemalloc la hace más lenta).
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    result = {
+        "repeat": repeat,
+        "mean_ms": sum(timings) / len(timings),
+        "min_ms": timings[0],
+        "p50_ms": percentile(timings, 50),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "max_ms": timings[-1],
+        "peak_kb": None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+def result_key(entry: dict) -> str:
+    return f"{entry['suite']}/{entry['graph']['kind']}/{entry['graph']['size']}/{entry['name']}"
+
+def metadata(args: dict) -> dict:
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "args": args,
+    }
+
+def save_results(path: Path, meta: dict, results: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+
+def load_results(path: Path) -> dict[str, dict]:
+    with open(path, encoding="utf-8") as f:
+        return {result_key(entry): entry for entry in json.load(f)["results"]}
+
+def compare(baseline: dict[str, dict], current: dict[str, dict], threshold: float) -> list[dict]:
+    """
+    Compara p50 y memoria pico de cada benchmark presente en ambos archivos.
+    Es regresión si el valor actual supera al base en más de threshold
+    (fracción, p. ej. 0.1 = 10%) y, para tiempos, en más de NOISE_FLOOR_MS.
+    """
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        base, now = baseline[key], current[key]
+        time_ratio = now["p50_ms"] / base["p50_ms"] if base["p50_ms"] > 0 else 1.0
+        slower = time_ratio > 1 + threshold and now["p50_ms"] - base["p50_ms"] > NOISE_FLOOR_MS
+        memory_ratio = None
+        heavier = False
+        if base.get("peak_kb") and now.get("peak_kb") is not None:
+            memory_ratio = now["peak_kb"] / base["peak_kb"]
+            heavier = memory_ratio > 1 + threshold
+        rows.append({
+            "key": key,
+            "base_p50_ms": base["p50_ms"],
+            "p50_ms": now["p50_ms"],
+            "time_ratio": time_ratio,
+            "memory_ratio": memory_ratio,
+            "regression": slower or heavier,
+        })
+    return rows
@@ -0,0 +1,88 @@
+"""
+Suite de benchmarks: corre los micro-benchmarks (core) y/o los de punta a
+punta (api) sobre grafos sintéticos y guarda los resultados en JSON; compare
+marca las regresiones contra una línea base.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.suite run --suite all --kinds road,grid --sizes 1k,10k --output bench.json
+    python -m benchmarks.suite compare baseline.json bench.json --threshold 0.1
+"""
+# bench_api fija la base SQLite local antes de que se importe la app
+from benchmarks.bench_api import run_api
+from benchmarks.bench_core import run_core
+from benchmarks.generators import KINDS, SIZES
+from benchmarks.harness import compare, load_results, metadata, save_results
+from pathlib import Path
+import argparse
+import sys
+
+def _split(value: str, allowed) -> list[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"valores desconocidos: {', '.join(unknown)} (válidos: {', '.join(allowed)})")
+    return items
+
+def run(args) -> None:
+    results = []
+    for kind in args.kinds:
+        for size in args.sizes:
+            if args.suite in ("core", "all"):
+                results.extend(run_core(kind, size, args.seed, args.repeat, memory=not args.no_memory))
+            if args.suite in ("api", "all"):
+                results.extend(run_api(kind, size, args.seed, args.repeat, memory=not args.no_memory))
+    save_results(args.output, metadata({
+        "suite": args.suite, "kinds": args.kinds, "sizes": args.sizes,
+        "repeat": args.repeat, "seed": args.seed,
+    }), results)
+    print(f"\n✅ {len(results)} resultados guardados en {args.output}")
+
+def run_compare(args) -> None:
+    rows = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+    if not rows:
+        print("⚠️  Los archivos no tienen benchmarks en común")
+        sys.exit(2)
+    regressions = [row for row in rows if row["regression"]]
+    for row in rows:
+        icon = "❌" if row["regression"] else "✅"
+        memory = f"  mem x{row['memory_ratio']:.2f}" if row["memory_ratio"] is not None else ""
+        print(
+            f"{icon} {row['key']:<55} {row['base_p50_ms']:9.3f} -> {row['p50_ms']:9.3f} ms"
+            f"  (x{row['time_ratio']:.2f}){memory}"
+        )
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresiones (umbral {args.threshold:.0%})")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones (umbral {args.threshold:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Ejecuta los benchmarks y guarda el JSON")
+    run_parser.add_argument("--suite", choices=("core", "api", "all"), default="core")
+    run_parser.add_argument(
+        "--kinds", type=lambda value: _split(value, KINDS), default=["road"],
+        help=f"Tipos de grafo separados por comas ({', '.join(KINDS)})"
+    )
+    run_parser.add_argument(
+        "--sizes", type=lambda value: _split(value, tuple(SIZES)), default=["1k", "10k"],
+        help=f"Aristas aproximadas separadas por comas ({', '.join(SIZES)})"
+    )
+    run_parser.add_argument("--repeat", type=int, default=20, help="Ejecuciones medidas por benchmark")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--no-memory", action="store_true", help="No medir memoria pico (más rápido)")
+    run_parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+
+    compare_parser = commands.add_parser("compare", help="Compara contra una línea base")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Aumento tolerado en p50 y memoria (default: 0.1 = 10%%)"
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        run_compare(args)
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+# Agregar la carpeta padre al path para poder importar app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import scipy_backend
+from tests.test_parity import check_graph, random_graph
+import argparse
+import random
+
+# Las comparaciones viven en tests/test_parity.py (pytest); este script
+# corre las mismas con más grafos o con otros tamaños
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara el backend de Python con el de SciPy sobre grafos aleatorios"
+    )
+    parser.add_argument("--graphs", type=int, default=50, help="Grafos a generar (default: 50)")
+    parser.add_argument("--nodes", type=int, default=200, help="Nodos por grafo (default: 200)")
+    parser.add_argument("--edges", type=int, default=800, help="Aristas por grafo (default: 800)")
+    parser.add_argument("--queries", type=int, default=20, help="Consultas por grafo (default: 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--int-weights", action="store_true",
+        help="Pesos enteros: con empates solo se exige igual distancia y camino válido"
+    )
+    args = parser.parse_args()
+
+    if not scipy_backend.SCIPY_AVAILABLE:
+        print("❌ numpy/scipy no están instalados")
+        sys.exit(2)
+
+    # Las funciones de app.search usan el backend de Python; el de SciPy se
+    # llama directamente
+    scipy_backend.SCIPY_ENABLED = False
+
+    rng = random.Random(args.seed)
+    errors = []
+    for version in range(1, args.graphs + 1):
+        # Una versión por grafo para no reutilizar la matriz en caché
+        graph = random_graph(version, args.nodes, args.edges, rng, args.int_weights)
+        errors.extend(check_graph(graph, args.queries, rng, exact_paths=not args.int_weights))
+
+    if errors:
+        print(f"❌ {len(errors)} diferencias:")
+        for error in errors[:20]:
+            print(f"   • {error}")
+        sys.exit(1)
+    print(f"✅ {args.graphs} grafos x {args.queries} consultas: ambos backends coinciden")
+
+if __name__ == "__main__":
+    main()
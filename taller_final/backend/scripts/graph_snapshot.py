@@ -0,0 +1,136 @@
+import sys
+from pathlib import Path
+
+# Agregar la carpeta padre al path para poder importar app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlmodel import Session, delete, select
+from app.db import engine, init_db, upsert_rows
+from app.models import Node, Edge
+from app.graph_cache import build_snapshot, bump_graph_version, read_graph_version
+from app.snapshot_file import open_snapshot, read_header, snapshot_store, write_snapshot
+from datetime import datetime
+import argparse
+import math
+import time
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+def export_snapshot(output: Path) -> None:
+    """Escribe el grafo actual de la base de datos en un snapshot binario"""
+    init_db()
+    started = time.perf_counter()
+    with Session(engine) as session:
+        version = read_graph_version(session)
+        graph = build_snapshot(session, version, with_names=True)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_snapshot(output, graph)
+    print(f"✅ Snapshot versión {version} escrito en {output}")
+    print(f"   • {graph.node_count} nodos, {graph.edge_count} aristas")
+    print(f"   • {output.stat().st_size:,} bytes en {time.perf_counter() - started:.2f}s")
+
+def publish_snapshot() -> None:
+    """Publica la versión actual en GRAPH_SNAPSHOT_DIR para que los workers arranquen sin leer la BD"""
+    if snapshot_store is None:
+        print("❌ GRAPH_SNAPSHOT_DIR no está configurado")
+        sys.exit(2)
+    snapshot_store.directory.mkdir(parents=True, exist_ok=True)
+    with Session(engine) as session:
+        version = read_graph_version(session)
+    export_snapshot(snapshot_store.path(version))
+    snapshot_store.prune()
+
+def import_snapshot(source: Path, batch_size: int, replace: bool) -> None:
+    """
+    Carga un snapshot en la base de datos. Los nodos se identifican por
+    nombre (se actualizan sus coordenadas) y las aristas por el par
+    (origen, destino) (se actualiza el peso), igual que load_seed.py
+    """
+    graph = open_snapshot(source)
+    names = graph.names
+    if graph.node_count and not names[0]:
+        print("❌ El snapshot no tiene la tabla de nombres de los nodos")
+        sys.exit(2)
+
+    init_db()
+    started = time.perf_counter()
+    with Session(engine) as session:
+        if replace:
+            print("🗑️  Eliminando nodos y aristas existentes...")
+            session.exec(delete(Edge))
+            session.exec(delete(Node))
+
+        print(f"\n📍 Importando {graph.node_count} nodos...")
+        now = datetime.utcnow()
+        for start in range(0, graph.node_count, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, graph.node_count)):
+                has_coords = not math.isnan(graph.lats[i])
+                rows.append({
+                    "name": names[i],
+                    "lat": graph.lats[i] if has_coords else None,
+                    "lon": graph.lons[i] if has_coords else None,
+                    "created_at": now,
+                })
+            upsert_rows(session, Node, rows, ["name"], update_columns=("lat", "lon"), chunk_size=batch_size)
+
+        # Ids asignados por esta base de datos para cada nombre
+        node_map = dict(session.exec(select(Node.name, Node.id)).all())
+        ids = [node_map[names[i]] for i in range(graph.node_count)]
+
+        print(f"🔗 Importando {graph.edge_count} aristas...")
+        rows = []
+        for u in range(graph.node_count):
+            for k in range(graph.offsets[u], graph.offsets[u + 1]):
+                rows.append({
+                    "src_id": ids[u],
+                    "dst_id": ids[graph.targets[k]],
+                    "weight": graph.weights[k],
+                    "created_at": now,
+                })
+                if len(rows) >= batch_size:
+                    upsert_rows(session, Edge, rows, ["src_id", "dst_id"], update_columns=("weight",), chunk_size=batch_size)
+                    rows = []
+        if rows:
+            upsert_rows(session, Edge, rows, ["src_id", "dst_id"], update_columns=("weight",), chunk_size=batch_size)
+
+        # Una sola invalidación de la caché del grafo por importación
+        bump_graph_version(session)
+        session.commit()
+
+    print(f"\n✅ Snapshot importado en {time.perf_counter() - started:.2f}s")
+
+def show_info(source: Path) -> None:
+    header = read_header(source)
+    print(f"📦 {source}")
+    print(f"   • Versión del grafo: {header['version']}")
+    print(f"   • Nodos: {header['nodes']}")
+    print(f"   • Aristas: {header['edges']}")
+    print(f"   • Tamaño: {source.stat().st_size:,} bytes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta e importa el grafo como snapshot binario")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Base de datos -> archivo")
+    export_parser.add_argument("--output", type=Path, default=DATA_DIR / "graph.bin", help="Archivo de salida")
+
+    commands.add_parser("publish", help="Publica la versión actual en GRAPH_SNAPSHOT_DIR")
+
+    import_parser = commands.add_parser("import", help="Archivo -> base de datos")
+    import_parser.add_argument("source", type=Path, help="Snapshot a importar")
+    import_parser.add_argument("--batch-size", type=int, default=1000, help="Filas por bloque (default: 1000)")
+    import_parser.add_argument("--replace", action="store_true", help="Eliminar nodos y aristas antes de importar")
+
+    info_parser = commands.add_parser("info", help="Muestra el encabezado de un snapshot")
+    info_parser.add_argument("source", type=Path)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(args.output)
+    elif args.command == "publish":
+        publish_snapshot()
+    elif args.command == "import":
+        import_snapshot(args.source, args.batch_size, args.replace)
+    else:
+        show_info(args.source)
@@ -5,120 +5,214 @@ from pathlib import Path
 # Agregar la carpeta padre al path para poder importar app
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sqlalchemy import func
 from sqlmodel import Session, select
-from app.db import engine, init_db
+from app.db import engine, init_db, upsert_rows
 from app.models import Node, Edge
+from app.graph_cache import bump_graph_version
+from datetime import datetime
+from itertools import islice
+import argparse
 import csv
+import math
+import time
 
-def load_seed_data():
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+def read_chunks(path: Path, batch_size: int):
+    """Lee un CSV de forma incremental y lo entrega en bloques de filas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        while True:
+            chunk = list(islice(reader, batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+def count_rows(session: Session, model) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+class VersionBump:
+    """
+    Sube la versión del grafo en la transacción del primer bloque que lo
+    modifica (si la carga se corta, las filas ya confirmadas no quedan bajo
+    la versión vieja) y una vez más al terminar si después cambiaron otros
+    bloques: los workers vuelven a leer el grafo sin una versión por bloque
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.bumped = False
+        self.pending = False
+
+    def changed(self) -> None:
+        """Llamar antes del commit de un bloque que creó o modificó filas"""
+        if not self.bumped:
+            bump_graph_version(self.session)
+            self.bumped = True
+        else:
+            self.pending = True
+
+    def finish(self) -> None:
+        """Cierra la carga (también si falló a mitad de camino)"""
+        if self.pending:
+            # Descartar el bloque a medio escribir si la carga falló
+            self.session.rollback()
+            bump_graph_version(self.session)
+            self.session.commit()
+            self.pending = False
+
+def load_nodes(session: Session, nodes_file: Path, batch_size: int, bump: VersionBump) -> int:
+    """Inserta los nodos por bloques; los nombres existentes se omiten"""
+    processed = 0
+    for chunk in read_chunks(nodes_file, batch_size):
+        now = datetime.utcnow()
+        names = [name for name in dict.fromkeys(row['name'].strip() for row in chunk) if name]
+        existing = set(session.exec(select(Node.name).where(Node.name.in_(names))).all())
+        rows = [{"name": name, "created_at": now} for name in names if name not in existing]
+        if rows:
+            upsert_rows(session, Node, rows, ["name"], chunk_size=batch_size)
+            bump.changed()
+        session.commit()
+        processed += len(chunk)
+    return processed
+
+def classify_edges(session: Session, rows: list[dict]) -> tuple[int, int]:
+    """
+    Retorna (pares nuevos, pares que ya existen con otro peso) de un bloque.
+    El peso se compara con tolerancia: en MySQL la columna es FLOAT de
+    precisión simple y el peso leído no es exactamente el del CSV.
+    """
+    weights = {(row["src_id"], row["dst_id"]): row["weight"] for row in rows}
+    statement = select(Edge.src_id, Edge.dst_id, Edge.weight).where(
+        Edge.src_id.in_({src for src, _ in weights}),
+        Edge.dst_id.in_({dst for _, dst in weights}),
+    )
+    existing = 0
+    changed = 0
+    for src_id, dst_id, weight in session.exec(statement).all():
+        if (src_id, dst_id) in weights:
+            existing += 1
+            if not math.isclose(weights[(src_id, dst_id)], weight, rel_tol=1e-6):
+                changed += 1
+    return len(weights) - existing, changed
+
+def load_edges(session: Session, edges_file: Path, batch_size: int, bump: VersionBump) -> tuple[int, int, int]:
+    """
+    Inserta las aristas por bloques resolviendo nombres -> ids con una sola
+    consulta por bloque. Si el par (origen, destino) ya existe se actualiza
+    el peso. Retorna (filas procesadas, filas omitidas, pesos actualizados).
+    """
+    processed = 0
+    skipped = 0
+    updated = 0
+    for chunk in read_chunks(edges_file, batch_size):
+        names = {row['src_name'].strip() for row in chunk} | {row['dst_name'].strip() for row in chunk}
+        statement = select(Node.name, Node.id).where(Node.name.in_(names))
+        node_map = dict(session.exec(statement).all())
+
+        now = datetime.utcnow()
+        rows = []
+        for row in chunk:
+            src_name = row['src_name'].strip()
+            dst_name = row['dst_name'].strip()
+
+            if src_name not in node_map:
+                print(f"   ⚠️  Advertencia: Nodo '{src_name}' no encontrado, omitiendo arista")
+                skipped += 1
+                continue
+
+            if dst_name not in node_map:
+                print(f"   ⚠️  Advertencia: Nodo '{dst_name}' no encontrado, omitiendo arista")
+                skipped += 1
+                continue
+
+            rows.append({
+                "src_id": node_map[src_name],
+                "dst_id": node_map[dst_name],
+                "weight": float(row['weight']),
+                "created_at": now,
+            })
+
+        if rows:
+            created, changed = classify_edges(session, rows)
+            upsert_rows(session, Edge, rows, ["src_id", "dst_id"], update_columns=("weight",), chunk_size=batch_size)
+            if created or changed:
+                bump.changed()
+            updated += changed
+        session.commit()
+        processed += len(chunk)
+    return processed, skipped, updated
+
+def throughput(rows: int, seconds: float) -> str:
+    rate = rows / seconds if seconds > 0 else float('inf')
+    return f"{rows} filas en {seconds:.2f}s ({rate:,.0f} filas/s)"
+
+def load_seed_data(nodes_file: Path, edges_file: Path, batch_size: int):
     """
     Carga los datos desde los archivos CSV a la base de datos
     Es idempotente: si los datos ya existen, no los duplica
     """
     print("🌱 Iniciando carga de datos semilla...")
-    
+
     # Inicializar base de datos (crear tablas si no existen)
     init_db()
-    
-    # Rutas a los archivos CSV
-    data_dir = Path(__file__).parent.parent / "data"
-    nodes_file = data_dir / "nodes.csv"
-    edges_file = data_dir / "edges.csv"
-    
+
     if not nodes_file.exists():
         print(f"❌ Error: No se encontró el archivo {nodes_file}")
         return
-    
+
     if not edges_file.exists():
         print(f"❌ Error: No se encontró el archivo {edges_file}")
         return
-    
+
+    started = time.perf_counter()
     with Session(engine) as session:
-        # ========== CARGAR NODOS ==========
-        print("\n📍 Cargando nodos...")
-        
-        # Leer nodos del CSV
-        with open(nodes_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            nodes_data = [row for row in reader]
-        
-        # Mapeo de nombre -> id
-        node_map = {}
-        nodes_created = 0
-        nodes_skipped = 0
-        
-        for row in nodes_data:
-            name = row['name'].strip()
-            if not name:
-                continue
-            
-            # Verificar si ya existe
-            statement = select(Node).where(Node.name == name)
-            existing = session.exec(statement).first()
-            
-            if existing:
-                node_map[name] = existing.id
-                nodes_skipped += 1
-            else:
-                new_node = Node(name=name)
-                session.add(new_node)
-                session.flush()  # Para obtener el ID
-                node_map[name] = new_node.id
-                nodes_created += 1
-        
-        session.commit()
-        print(f"   ✅ Nodos creados: {nodes_created}")
-        print(f"   ⏭️  Nodos existentes (omitidos): {nodes_skipped}")
-        
-        # ========== CARGAR ARISTAS ==========
-        print("\n🔗 Cargando aristas...")
-        
-        # Leer aristas del CSV
-        with open(edges_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            edges_data = [row for row in reader]
-        
-        edges_created = 0
-        edges_skipped = 0
-        
-        for row in edges_data:
-            src_name = row['src_name'].strip()
-            dst_name = row['dst_name'].strip()
-            weight = float(row['weight'])
-            
-            if src_name not in node_map:
-                print(f"   ⚠️  Advertencia: Nodo '{src_name}' no encontrado, omitiendo arista")
-                continue
-            
-            if dst_name not in node_map:
-                print(f"   ⚠️  Advertencia: Nodo '{dst_name}' no encontrado, omitiendo arista")
-                continue
-            
-            src_id = node_map[src_name]
-            dst_id = node_map[dst_name]
-            
-            # Verificar si ya existe la arista
-            statement = select(Edge).where(
-                Edge.src_id == src_id,
-                Edge.dst_id == dst_id
-            )
-            existing = session.exec(statement).first()
-            
-            if existing:
-                edges_skipped += 1
-            else:
-                new_edge = Edge(src_id=src_id, dst_id=dst_id, weight=weight)
-                session.add(new_edge)
-                edges_created += 1
-        
-        session.commit()
-        print(f"   ✅ Aristas creadas: {edges_created}")
-        print(f"   ⏭️  Aristas existentes (omitidas): {edges_skipped}")
-    
+        nodes_before = count_rows(session, Node)
+        edges_before = count_rows(session, Edge)
+        bump = VersionBump(session)
+
+        try:
+            # ========== CARGAR NODOS ==========
+            print(f"\n📍 Cargando nodos (bloques de {batch_size})...")
+            t0 = time.perf_counter()
+            nodes_processed = load_nodes(session, nodes_file, batch_size, bump)
+            nodes_created = count_rows(session, Node) - nodes_before
+            print(f"   ✅ Nodos creados: {nodes_created}")
+            print(f"   ⏭️  Nodos existentes (omitidos): {nodes_processed - nodes_created}")
+            print(f"   ⏱️  {throughput(nodes_processed, time.perf_counter() - t0)}")
+
+            # ========== CARGAR ARISTAS ==========
+            print(f"\n🔗 Cargando aristas (bloques de {batch_size})...")
+            t0 = time.perf_counter()
+            edges_processed, edges_skipped, edges_updated = load_edges(session, edges_file, batch_size, bump)
+            edges_total = count_rows(session, Edge)
+            edges_created = edges_total - edges_before
+            print(f"   ✅ Aristas creadas: {edges_created}")
+            print(f"   🔄 Aristas con peso actualizado: {edges_updated}")
+            print(f"   ⏭️  Aristas existentes (omitidas): {edges_processed - edges_skipped - edges_created - edges_updated}")
+            print(f"   ⏱️  {throughput(edges_processed, time.perf_counter() - t0)}")
+        finally:
+            # Si algún bloque cambió el grafo, la versión sube aunque la carga
+            # falle a mitad de camino; volver a cargar la semilla sin cambios
+            # no descarta las cachés
+            bump.finish()
+
+        if not bump.bumped:
+            print("\n⏭️  Sin cambios: la versión del grafo se mantiene")
+
+        nodes_total = count_rows(session, Node)
+
     print("\n✅ Carga de datos completada exitosamente!")
     print(f"\n📊 Resumen:")
-    print(f"   • Total nodos: {len(node_map)}")
-    print(f"   • Total aristas: {edges_created + edges_skipped}")
+    print(f"   • Total nodos: {nodes_total}")
+    print(f"   • Total aristas: {edges_total}")
+    print(f"   • {throughput(nodes_processed + edges_processed, time.perf_counter() - started)}")
 
 if __name__ == "__main__":
-    load_seed_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Carga nodes.csv y edges.csv en la base de datos")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Filas por bloque (default: 1000)")
+    parser.add_argument("--nodes", type=Path, default=DATA_DIR / "nodes.csv", help="CSV de nodos")
+    parser.add_argument("--edges", type=Path, default=DATA_DIR / "edges.csv", help="CSV de aristas")
+    args = parser.parse_args()
+    load_seed_data(args.nodes, args.edges, args.batch_size)
@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+# La app lee la configuración al importarse: los tests usan una base SQLite
+# propia (nunca la de .env) y sin snapshots compartidos ni perfiles
+_DB_DIR = tempfile.mkdtemp(prefix="pathfinder_tests_")
+os.environ["MYSQL_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["JOBS_DIR"] = os.path.join(_DB_DIR, "jobs")
+os.environ.pop("GRAPH_SNAPSHOT_DIR", None)
+os.environ.pop("PROFILE_ADMIN_TOKEN", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    client.post("/auth/register", json={"username": "tests", "password": "tests"})
+    response = client.post("/auth/login", data={"username": "tests", "password": "tests"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
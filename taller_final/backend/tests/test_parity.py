@@ -0,0 +1,109 @@
+from array import array
+from app import scipy_backend
+from app.graph_cache import GraphSnapshot, _build_csr
+from app.search import bfs, dijkstra, shortest_path_tree, tree_path
+import random
+import pytest
+
+# Paridad entre el backend de Python y el de SciPy (GRAPH_BACKEND=scipy)
+# sobre grafos dirigidos aleatorios: mismas distancias, mismos caminos (sin
+# empates), mismos árboles completos y el mismo recorrido BFS.
+# scripts/check_parity.py corre las mismas comparaciones con más grafos.
+
+pytestmark = pytest.mark.skipif(
+    not scipy_backend.SCIPY_AVAILABLE, reason="numpy/scipy no están instalados"
+)
+
+def random_graph(version: int, nodes: int, edges: int, rng: random.Random, int_weights: bool) -> GraphSnapshot:
+    """Grafo dirigido aleatorio con ids no contiguos y aristas en orden aleatorio"""
+    node_ids = sorted(rng.sample(range(1, nodes * 10), nodes))
+    pairs = {}
+    while len(pairs) < edges:
+        u, v = rng.randrange(nodes), rng.randrange(nodes)
+        if u != v:
+            pairs[(u, v)] = rng.randint(1, 5) if int_weights else rng.uniform(0.1, 10.0)
+    rows = [(u, v, float(w), k) for k, ((u, v), w) in enumerate(pairs.items())]
+    rng.shuffle(rows)
+    offsets, targets, weights, edge_ids = _build_csr(nodes, rows, len(rows))
+    nan = array("d", [float("nan")]) * nodes
+    return GraphSnapshot(version, node_ids, offsets, targets, weights, edge_ids, nan, array("d", nan))
+
+def path_cost(graph: GraphSnapshot, path: list[int]) -> float:
+    """Costo de un camino sumando las aristas en orden (o None si no es válido)"""
+    total = 0.0
+    for u, v in zip(path, path[1:]):
+        i, j = graph.index[u], graph.index[v]
+        costs = [
+            graph.weights[k] for k in range(graph.offsets[i], graph.offsets[i + 1])
+            if graph.targets[k] == j
+        ]
+        if not costs:
+            return None
+        total += min(costs)
+    return total
+
+def check_graph(graph: GraphSnapshot, queries: int, rng: random.Random, exact_paths: bool) -> list[str]:
+    """
+    Compara ambos backends sobre un grafo; retorna las diferencias encontradas.
+    Las funciones de app.search deben correr con el backend de Python
+    (scipy_backend.SCIPY_ENABLED = False); el de SciPy se llama directamente.
+    """
+    errors = []
+    for _ in range(queries):
+        src_id, dst_id = rng.choice(graph.node_ids), rng.choice(graph.node_ids)
+
+        # Camino más corto punto a punto
+        expected = dijkstra(graph, src_id, dst_id)
+        actual = scipy_backend.dijkstra(graph, src_id, dst_id)
+        if (expected is None) != (actual is None):
+            errors.append(f"dijkstra {src_id}->{dst_id}: {expected} != {actual}")
+        elif expected is not None:
+            if expected[1] != actual[1]:
+                errors.append(f"distancia {src_id}->{dst_id}: {expected[1]} != {actual[1]}")
+            elif exact_paths and expected[0] != actual[0]:
+                errors.append(f"camino {src_id}->{dst_id}: {expected[0]} != {actual[0]}")
+            elif path_cost(graph, actual[0]) is None or actual[0][0] != src_id or actual[0][-1] != dst_id:
+                errors.append(f"camino inválido {src_id}->{dst_id}: {actual[0]}")
+
+        # Árbol completo (caché de árboles y matriz de distancias)
+        src = graph.index[src_id]
+        py_tree = shortest_path_tree(graph, src)
+        sp_tree = scipy_backend.shortest_path_tree(graph, src)
+        for dst in range(graph.node_count):
+            a, b = tree_path(graph, *py_tree, dst), tree_path(graph, *sp_tree, dst)
+            if (a is None) != (b is None) or (a is not None and a[1] != b[1]):
+                errors.append(f"árbol {src_id}->{graph.node_ids[dst]}: {a} != {b}")
+                break
+
+        # BFS: mismo orden y mismo árbol
+        py_bfs = list(bfs(graph, src_id))
+        sp_bfs = list(scipy_backend.bfs(graph, src_id))
+        if py_bfs != sp_bfs:
+            errors.append(f"bfs desde {src_id}: difieren")
+    return errors
+
+@pytest.fixture(autouse=True)
+def python_search(monkeypatch):
+    """app.search con el backend de Python; el de SciPy se llama directamente"""
+    monkeypatch.setattr(scipy_backend, "SCIPY_ENABLED", False)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_backends_match(seed):
+    # Una versión por grafo para no reutilizar la matriz en caché
+    rng = random.Random(seed)
+    graph = random_graph(seed + 1, 200, 800, rng, int_weights=False)
+    assert check_graph(graph, 20, rng, exact_paths=True) == []
+
+@pytest.mark.parametrize("seed", range(10))
+def test_backends_match_with_ties(seed):
+    # Pesos enteros: con empates solo se exige igual distancia y camino válido
+    rng = random.Random(seed)
+    graph = random_graph(1000 + seed, 200, 800, rng, int_weights=True)
+    assert check_graph(graph, 20, rng, exact_paths=False) == []
+
+@pytest.mark.parametrize("nodes, edges", [(1, 0), (50, 10), (30, 600)])
+def test_backends_match_sparse_and_dense(nodes, edges):
+    # Un solo nodo, casi sin aristas (muchos pares sin camino) y casi completo
+    rng = random.Random(nodes)
+    graph = random_graph(2000 + nodes, nodes, edges, rng, int_weights=False)
+    assert check_graph(graph, 10, rng, exact_paths=True) == []
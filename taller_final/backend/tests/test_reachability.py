@@ -0,0 +1,37 @@
+# Índice de alcanzabilidad frente a las mutaciones del grafo (vía la API)
+
+def _create_node(client, headers, name: str) -> int:
+    response = client.post("/graph/nodes", json={"name": name}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_components_after_creating_node(client, auth_headers):
+    a = _create_node(client, auth_headers, "reach-A")
+    b = _create_node(client, auth_headers, "reach-B")
+    response = client.post("/graph/edges", json={"src_id": a, "dst_id": b, "weight": 1}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    before = client.get("/graph/components", headers=auth_headers).json()
+
+    # Crear un nodo no envía cambios de aristas, pero el índice debe incluirlo
+    c = _create_node(client, auth_headers, "reach-C")
+    after = client.get("/graph/components", headers=auth_headers).json()
+    assert after["version"] > before["version"]
+    assert after["nodes"] == before["nodes"] + 1
+    assert after["components"] == before["components"] + 1
+
+    response = client.get(f"/graph/reachable?src_id={a}&dst_id={c}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["reachable"] is False
+
+def test_reachable_from_new_node(client, auth_headers):
+    a = _create_node(client, auth_headers, "reach-D")
+    b = _create_node(client, auth_headers, "reach-E")
+    client.get("/graph/components", headers=auth_headers)
+    c = _create_node(client, auth_headers, "reach-F")
+    response = client.post("/graph/edges", json={"src_id": c, "dst_id": a, "weight": 1}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    client.post("/graph/edges", json={"src_id": a, "dst_id": b, "weight": 1}, headers=auth_headers)
+
+    response = client.get(f"/graph/reachable?src_id={c}&dst_id={b}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["reachable"] is True
@@ -0,0 +1,42 @@
+from app.singleflight import SingleFlight
+import asyncio
+import pytest
+
+def test_leader_cancellation_does_not_fail_followers():
+    async def scenario():
+        flights = SingleFlight()
+        runs = 0
+
+        async def work():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.05)
+            return 42
+
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        # El cliente del primer llamador se desconecta
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result, runs, flights.coalesced, flights.in_flight()
+
+    assert asyncio.run(scenario()) == (42, 1, 1, 0)
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("falló")
+
+        return await asyncio.gather(
+            flights.do("key", work), flights.do("key", work), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
@@ -7,6 +7,28 @@ const api = axios.create({
   baseURL: API_URL,
 });
 
+// ==================== CACHÉ POR ETAG ====================
+
+// Respuestas GET guardadas por URL: { etag, data, headers }. El backend
+// responde 304 mientras el grafo no cambie y se reutiliza el cuerpo guardado.
+const ETAG_CACHE_MAX_ENTRIES = 100;
+const etagCache = new Map();
+
+const cacheKey = (config) => api.getUri(config);
+
+const rememberResponse = (key, response) => {
+  etagCache.delete(key);
+  etagCache.set(key, {
+    etag: response.headers.etag,
+    data: response.data,
+    headers: { ...response.headers },
+  });
+  // Descartar las entradas más antiguas (el Map conserva el orden de inserción)
+  while (etagCache.size > ETAG_CACHE_MAX_ENTRIES) {
+    etagCache.delete(etagCache.keys().next().value);
+  }
+};
+
 // Interceptor para agregar el token a todas las peticiones
 api.interceptors.request.use(
   (config) => {
@@ -14,6 +36,14 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // GET condicional si ya hay una copia de esta URL
+    if ((config.method || 'get') === 'get') {
+      const cached = etagCache.get(cacheKey(config));
+      if (cached) {
+        config.headers['If-None-Match'] = cached.etag;
+      }
+      config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+    }
     return config;
   },
   (error) => {
@@ -23,7 +53,22 @@ api.interceptors.request.use(
 
 // Interceptor para manejar errores 401 (token inválido)
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    if (response.config.method !== 'get') {
+      return response;
+    }
+    const key = cacheKey(response.config);
+    if (response.status === 304) {
+      // Sin cambios: el cuerpo y los headers (p. ej. el cursor) son los guardados
+      const cached = etagCache.get(key);
+      if (cached) {
+        return { ...response, status: 200, data: cached.data, headers: cached.headers };
+      }
+    } else if (response.headers.etag) {
+      rememberResponse(key, response);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
@@ -60,11 +105,38 @@ export const getMe = async () => {
   return response.data;
 };
 
+// ==================== PAGINACIÓN ====================
+
+// Filas por página de /graph/nodes y /graph/edges
+export const PAGE_SIZE = 200;
+
+// Una página del listado: { items, nextAfterId } (nextAfterId es null en la última)
+const getPage = async (url, params) => {
+  const response = await api.get(url, { params });
+  const next = response.headers['x-next-after-id'];
+  return { items: response.data, nextAfterId: next ? parseInt(next) : null };
+};
+
+// Recorre todas las páginas (para selects que necesitan la lista completa)
+const getAllPages = async (url, params = {}) => {
+  const items = [];
+  let afterId = null;
+  do {
+    const page = await getPage(url, { ...params, after_id: afterId ?? undefined, limit: 1000 });
+    items.push(...page.items);
+    afterId = page.nextAfterId;
+  } while (afterId !== null);
+  return items;
+};
+
 // ==================== NODES ====================
 
+export const getNodesPage = async (afterId = null, limit = PAGE_SIZE) => {
+  return getPage('/graph/nodes', { after_id: afterId ?? undefined, limit });
+};
+
 export const getNodes = async () => {
-  const response = await api.get('/graph/nodes');
-  return response.data;
+  return getAllPages('/graph/nodes');
 };
 
 export const createNode = async (name) => {
@@ -78,9 +150,12 @@ export const deleteNode = async (id) => {
 
 // ==================== EDGES ====================
 
-export const getEdges = async () => {
-  const response = await api.get('/graph/edges');
-  return response.data;
+export const getEdgesPage = async (afterId = null, limit = PAGE_SIZE, filters = {}) => {
+  return getPage('/graph/edges', { ...filters, after_id: afterId ?? undefined, limit });
+};
+
+export const getEdges = async (filters = {}) => {
+  return getAllPages('/graph/edges', filters);
 };
 
 export const createEdge = async (src_id, dst_id, weight) => {
@@ -110,4 +185,16 @@ export const runDijkstra = async (src_id, dst_id) => {
   return response.data;
 };
 
+export const runWithin = async (src_id, max_distance) => {
+  const response = await api.get(
+    `/graph/within?src_id=${src_id}&max_distance=${max_distance}`
+  );
+  return response.data;
+};
+
+export const runNearest = async (src_id, k) => {
+  const response = await api.get(`/graph/nearest?src_id=${src_id}&k=${k}`);
+  return response.data;
+};
+
 export default api;
\ No newline at end of file
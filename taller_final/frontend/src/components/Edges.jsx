@@ -1,9 +1,10 @@
 import { useState, useEffect } from 'react';
-import { getEdges, createEdge, deleteEdge, getNodes } from '../api';
+import { getEdgesPage, createEdge, deleteEdge, getNodes } from '../api';
 import './CrudSection.css';
 
 function Edges() {
   const [edges, setEdges] = useState([]);
+  const [nextAfterId, setNextAfterId] = useState(null);
   const [nodes, setNodes] = useState([]);
   const [srcId, setSrcId] = useState('');
   const [dstId, setDstId] = useState('');
@@ -16,10 +17,12 @@ function Edges() {
     fetchNodes();
   }, []);
 
-  const fetchEdges = async () => {
+  // Carga la primera página, o la siguiente si se pasa el cursor
+  const fetchEdges = async (afterId = null) => {
     try {
-      const data = await getEdges();
-      setEdges(data);
+      const page = await getEdgesPage(afterId);
+      setEdges((prev) => (afterId === null ? page.items : [...prev, ...page.items]));
+      setNextAfterId(page.nextAfterId);
     } catch (err) {
       setError('Error al cargar aristas');
       console.error(err);
@@ -41,11 +44,14 @@ function Edges() {
     setLoading(true);
 
     try {
-      await createEdge(srcId, dstId, weight);
+      const edge = await createEdge(srcId, dstId, weight);
       setSrcId('');
       setDstId('');
       setWeight('');
-      fetchEdges();
+      // Los ids son crecientes: solo se muestra si ya se cargó la última página
+      if (nextAfterId === null) {
+        setEdges((prev) => [...prev, edge]);
+      }
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al crear arista');
     } finally {
@@ -60,7 +66,7 @@ function Edges() {
 
     try {
       await deleteEdge(id);
-      fetchEdges();
+      setEdges((prev) => prev.filter((edge) => edge.id !== id));
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al eliminar arista');
     }
@@ -75,7 +81,9 @@ function Edges() {
     <div className="crud-section">
       <div className="section-header">
         <h3>🔗 Gestión de Aristas</h3>
-        <span className="badge">{edges.length} aristas</span>
+        <span className="badge">
+          {edges.length}{nextAfterId !== null ? '+' : ''} aristas
+        </span>
       </div>
 
       {error && (
@@ -162,6 +170,12 @@ function Edges() {
             ))}
           </div>
         )}
+
+        {nextAfterId !== null && (
+          <button onClick={() => fetchEdges(nextAfterId)} className="btn-create">
+            ⬇️ Cargar más
+          </button>
+        )}
       </div>
     </div>
   );
@@ -1,9 +1,10 @@
 import { useState, useEffect } from 'react';
-import { getNodes, createNode, deleteNode } from '../api';
+import { getNodesPage, createNode, deleteNode } from '../api';
 import './CrudSection.css';
 
 function Nodes() {
   const [nodes, setNodes] = useState([]);
+  const [nextAfterId, setNextAfterId] = useState(null);
   const [newNodeName, setNewNodeName] = useState('');
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
@@ -12,10 +13,12 @@ function Nodes() {
     fetchNodes();
   }, []);
 
-  const fetchNodes = async () => {
+  // Carga la primera página, o la siguiente si se pasa el cursor
+  const fetchNodes = async (afterId = null) => {
     try {
-      const data = await getNodes();
-      setNodes(data);
+      const page = await getNodesPage(afterId);
+      setNodes((prev) => (afterId === null ? page.items : [...prev, ...page.items]));
+      setNextAfterId(page.nextAfterId);
     } catch (err) {
       setError('Error al cargar nodos');
       console.error(err);
@@ -28,9 +31,12 @@ function Nodes() {
     setLoading(true);
 
     try {
-      await createNode(newNodeName);
+      const node = await createNode(newNodeName);
       setNewNodeName('');
-      fetchNodes();
+      // Los ids son crecientes: solo se muestra si ya se cargó la última página
+      if (nextAfterId === null) {
+        setNodes((prev) => [...prev, node]);
+      }
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al crear nodo');
     } finally {
@@ -45,7 +51,7 @@ function Nodes() {
 
     try {
       await deleteNode(id);
-      fetchNodes();
+      setNodes((prev) => prev.filter((node) => node.id !== id));
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al eliminar nodo');
     }
@@ -55,7 +61,9 @@ function Nodes() {
     <div className="crud-section">
       <div className="section-header">
         <h3>📍 Gestión de Nodos</h3>
-        <span className="badge">{nodes.length} nodos</span>
+        <span className="badge">
+          {nodes.length}{nextAfterId !== null ? '+' : ''} nodos
+        </span>
       </div>
 
       {error && (
@@ -107,6 +115,12 @@ function Nodes() {
             ))}
           </div>
         )}
+
+        {nextAfterId !== null && (
+          <button onClick={() => fetchNodes(nextAfterId)} className="btn-create">
+            ⬇️ Cargar más
+          </button>
+        )}
       </div>
     </div>
   );